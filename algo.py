@@ -3,11 +3,24 @@
 
 """algo.py
 
+The scalar functions work on single QPointF/QLineF/QRectF arguments. The
+functions ending in Batch are their NumPy counterparts, they take arrays of
+points, segments, arcs and rectangles and test all of them in one call:
+ * points -- (n, 2) float arrays
+ * line segments -- two (n, 2) arrays of start and end points
+ * arcs -- (n, 2) centers plus (n,) start angles, spans and radii, angles
+           in degrees as in Arc
+ * rectangles -- (n, 4) arrays of [x, y, width, height] as in QRectF
+Arguments broadcast, so one point can be tested against many segments. The
+epsilon handling matches the scalar functions.
+
 Saturday, March 30 2013
 """
 
 from math import pi, fmod, degrees, atan2, sqrt
 
+import numpy as np
+
 from PyQt4.QtCore import QPointF, QLineF
 from PyQt4.QtGui import QVector2D
 
@@ -240,13 +253,14 @@ def xsectArcRect1(arc, rect):
     cx = arc.centerX()
     cy = arc.centerY()
     r = arc.radius()
+    cp = QPointF(cx, cy)
     for l in [QLineF(tl, tr),
               QLineF(tr, br),
               QLineF(br, bl),
               QLineF(bl, tl)]:
         for x, y in xsectLineCir(l, cx, cy, r):
             p = QPointF(x, y)
-            if isPointOnArc(p, arc.center(), arc.start(), arc.span()):
+            if isPointOnArc(p, cp, arc.start(), arc.span()):
                 if isPointOnLineSeg(p, l):
                     xsectPoints.append(p)
     if len(xsectPoints) == 1:
@@ -254,3 +268,157 @@ def xsectArcRect1(arc, rect):
     else:
         return None
         
+
+
+def _arr(a):
+    return np.asarray(a, dtype=np.float64)
+
+def pointOnLineBatch(p, sp, ep):
+    """Find the points on the lines closest to the reference points.
+
+    p -- (n, 2) reference points
+    sp, ep -- (n, 2) line start and end points
+
+    Return an (n, 2) array, see pointOnLine().
+    """
+    p, sp, ep = _arr(p), _arr(sp), _arr(ep)
+    u = ep - sp
+    u = u / np.hypot(u[..., 0], u[..., 1])[..., np.newaxis]
+    t = ((p - sp) * u).sum(axis=-1)
+    return sp + t[..., np.newaxis] * u
+
+def isPointOnArcBatch(p, cp, start, span, r=None, eps=1e-3):
+    """Find if the points are ON the arcs.
+
+    p -- (n, 2) points
+    cp -- (n, 2) arc center points
+    start, span -- (n,) signed start and sweep angles, in degrees
+    r -- (n,) arc radii, or None to check only the angles. As in
+         isPointOnArc() a radius of 0.0 only checks the angle.
+    eps -- epsilon value for radius equality check
+
+    Return a bool array.
+    """
+    v = _arr(p) - _arr(cp)
+    start, span = _arr(start), _arr(span)
+    sa = start % 360.0
+    ea = (start + span) % 360.0
+    cw = span < 0.0
+    sa, ea = np.where(cw, ea, sa), np.where(cw, sa, ea)
+    pa = np.degrees(np.arctan2(v[..., 1], v[..., 0])) % 360.0
+    result = np.where(ea < sa,
+                      (pa >= sa) | (pa <= ea),
+                      (pa >= sa) & (pa <= ea))
+    if r is not None:
+        r = _arr(r)
+        d = np.abs(np.hypot(v[..., 0], v[..., 1]) - r)
+        result &= (r == 0.0) | (d <= eps)
+    return result
+
+def isPointOnLineSegBatch(p, sp, ep, eps=1e-3):
+    """Find if the points are ON the line segments.
+
+    p -- (n, 2) points
+    sp, ep -- (n, 2) segment start and end points
+
+    Return a bool array.
+    """
+    p, sp, ep = _arr(p), _arr(sp), _arr(ep)
+    d1 = p - sp
+    d2 = p - ep
+    d3 = ep - sp
+    diff = np.abs(np.hypot(d1[..., 0], d1[..., 1])
+                  + np.hypot(d2[..., 0], d2[..., 1])
+                  - np.hypot(d3[..., 0], d3[..., 1]))
+    return diff < eps
+
+def xsectLineCirBatch(sp, ep, c, r):
+    """Find the intersection points of 2d lines and 2d circles.
+
+    sp, ep -- (n, 2) start and end points of the lines. The segments define
+              infinite lines as in xsectLineCir().
+    c -- (n, 2) circle center points
+    r -- (n,) circle radii
+
+    Return (points, count). points is an (n, 2, 2) array of the first and
+    second intersection point of each line, NaN where there is none. count
+    is an int array of the number of intersections, 0, 1 or 2. Zero length
+    lines have no intersections.
+    """
+    sp, ep, c, r = _arr(sp), _arr(ep), _arr(c), _arr(r)
+    d = ep - sp
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fg = d / np.hypot(d[..., 0], d[..., 1])[..., np.newaxis]
+        f, g = fg[..., 0], fg[..., 1]
+        dx = c[..., 0] - sp[..., 0]
+        dy = c[..., 1] - sp[..., 1]
+        b = f * f + g * g
+        cross = f * dy - g * dx
+        root = r * r * b - cross * cross
+        a = f * dx + g * dy
+        one = root == 0.0
+        two = root > 0.0
+        sq = np.sqrt(np.where(two, root, 0.0))
+        t1 = np.where(one | two, (a - sq) / b, np.nan)
+        t2 = np.where(two, (a + sq) / b, np.nan)
+    x, y = sp[..., 0], sp[..., 1]
+    points = np.stack([np.stack([x + f * t1, y + g * t1], axis=-1),
+                       np.stack([x + f * t2, y + g * t2], axis=-1)],
+                      axis=-2)
+    count = one.astype(np.int64) + 2 * two.astype(np.int64)
+    return points, count
+
+def rectEdgesBatch(rects):
+    """Find the edges of rectangles.
+
+    rects -- (n, 4) array of [x, y, width, height]
+
+    Return (sp, ep), (n, 4, 2) arrays of the edge start and end points in
+    the order xsectArcRect1() tests them, top, right, bottom and left.
+    """
+    rects = _arr(rects)
+    x, y, w, h = rects[..., 0], rects[..., 1], rects[..., 2], rects[..., 3]
+    tl = np.stack([x, y], axis=-1)
+    tr = np.stack([x + w, y], axis=-1)
+    br = np.stack([x + w, y + h], axis=-1)
+    bl = np.stack([x, y + h], axis=-1)
+    sp = np.stack([tl, tr, br, bl], axis=-2)
+    ep = np.stack([tr, br, bl, tl], axis=-2)
+    return sp, ep
+
+def xsectArcRectBatch(cp, r, start, span, rects):
+    """Find the single intersection point of each arc and rectangle.
+
+    cp -- (n, 2) arc center points
+    r -- (n,) arc radii
+    start, span -- (n,) arc start and sweep angles, in degrees
+    rects -- (n, 4) array of [x, y, width, height]
+
+    See xsectArcRect1().
+
+    Return (points, found). points is an (n, 2) array, found a bool array
+    that is True where the arc exits the rectangle exactly once. points is
+    NaN where found is False.
+    """
+    cp, r, start, span = _arr(cp), _arr(r), _arr(start), _arr(span)
+    sp, ep = rectEdgesBatch(rects)
+    # broadcast each arc over its rectangle's 4 edges
+    cp4 = cp[..., np.newaxis, :]
+    r4 = r[..., np.newaxis]
+    points, _ = xsectLineCirBatch(sp, ep, cp4, r4)
+    # (n, 4 edges, 2 points, 2)
+    cp8 = cp4[..., np.newaxis, :]
+    with np.errstate(invalid='ignore'):
+        hit = isPointOnArcBatch(points, cp8, start[..., np.newaxis, np.newaxis],
+                                span[..., np.newaxis, np.newaxis])
+        hit &= isPointOnLineSegBatch(points, sp[..., np.newaxis, :],
+                                     ep[..., np.newaxis, :])
+    hit &= ~np.isnan(points[..., 0])
+    flatHit = hit.reshape(hit.shape[:-2] + (-1,))
+    flatPoints = points.reshape(points.shape[:-3] + (-1, 2))
+    found = flatHit.sum(axis=-1) == 1
+    first = np.argmax(flatHit, axis=-1)
+    result = np.take_along_axis(flatPoints, first[..., np.newaxis, np.newaxis],
+                                axis=-2)[..., 0, :]
+    result[~found] = np.nan
+    return result, found
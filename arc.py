@@ -6,154 +6,186 @@
 Thursday, August 22 2013
 """
 
-import os
-import sys
-import re
 from math import degrees, radians, sin, cos, atan2
-from copy import copy
 
-from PyQt4.QtCore import QPointF
-from PyQt4.QtGui import QVector2D
+import numpy as np
 
 class ArcException(Exception): pass
 
+def _xy(v):
+    """Return (x, y) of a QPointF/QVector2D or an (x, y) sequence.
+    """
+    if hasattr(v, 'x'):
+        return float(v.x()), float(v.y())
+    x, y = v
+    return float(x), float(y)
+
 class Arc(object):
     """Define a 2D arc in the right-handed cartesian plane.
 
-    The internal map is defined as follows:
-    'center' -- QPointF, arc center point
-    'radius' -- arc radius
-    'start' -- start angle in degrees
-    'span' -- Signed sweep angle from start. A positive span will create a
-              counter-clockwise arc.
+    center -- (x, y) arc center point, or a QPointF
+    radius -- arc radius
+    start -- start angle in degrees
+    span -- Signed sweep angle from start. A positive span will create a
+            counter-clockwise arc.
+
+    Arcs are immutable. Points and vectors are (x, y) tuples of floats,
+    computed the first time they're asked for. Use withCenter() to move an
+    arc.
     """
-    def __init__(self, m={'center': QPointF(0.0, 0.0),
-                          'radius': 0.5,
-                          'start': 0.0,
-                          'span': 90.0}):
-        r = m.get('radius', None)
-        if r is not None and r <= 0.0:
-            raise ArcException("radius must be > 0.0")
-        self.m = copy(m)
-    def config(self, m={}):
-        self.m.update(m)
-        r = self.m.get('radius', None)
-        if r is not None and r <= 0.0:
+    __slots__ = ('_cx', '_cy', '_r', '_start', '_span',
+                 '_sp', '_ep', '_sv', '_ev', '_bis')
+    def __init__(self, center=(0.0, 0.0), radius=0.5, start=0.0, span=90.0):
+        if radius <= 0.0:
             raise ArcException("radius must be > 0.0")
-    def center(self, value=None):
-        if value:
-            self.m['center'] = value
-        else:
-            return self.m['center']
-    def centerX(self, value=None):
-        if value:
-            self.m['center'] = QPointF(value, self.m['center'].y())
-        else:
-            return self.m['center'].x()
-    def centerY(self, value=None):
-        if value:
-            self.m['center'] = QPointF(self.m['center'].x(), value)
-        else:
-            return self.m['center'].y()
-    def radius(self, value=None):
-        if value:
-            self.m['radius'] = value
-        else:
-            return self.m['radius']
-    def start(self, value=None):
-        if value:
-            self.m['start'] = value
-        else:
-            return self.m['start']
-    def span(self, value=None):
-        if value:
-            self.m['span'] = value
-        else:
-            return self.m['span']
+        self._cx, self._cy = _xy(center)
+        self._r = float(radius)
+        self._start = float(start)
+        self._span = float(span)
+        # cached start/end points and vectors, and the bisector
+        self._sp = self._ep = self._sv = self._ev = self._bis = None
+    def __repr__(self):
+        return 'Arc(({}, {}), {}, {}, {})'.format(self._cx, self._cy, self._r,
+                                                 self._start, self._span)
+    def __eq__(self, other):
+        return isinstance(other, Arc) and self._key() == other._key()
+    def __ne__(self, other):
+        return not self == other
+    def __hash__(self):
+        return hash(self._key())
+    def _key(self):
+        return (self._cx, self._cy, self._r, self._start, self._span)
+    def withCenter(self, center):
+        """Return a copy of this arc moved to center.
+        """
+        return Arc(center, self._r, self._start, self._span)
+    def center(self):
+        return (self._cx, self._cy)
+    def centerX(self):
+        return self._cx
+    def centerY(self):
+        return self._cy
+    def radius(self):
+        return self._r
+    def start(self):
+        return self._start
+    def span(self):
+        return self._span
     def startAngle(self):
-        return self.m['start']
+        return self._start
     def endAngle(self):
-        return self.m['start'] + self.m['span']
-    def startPoint(self):
-        r = self.m['radius']
-        s = radians(self.m['start'])
-        return self.m['center'] + QPointF(cos(s) * r, sin(s) * r)
-    def endPoint(self):
-        r = self.m['radius']
-        e = radians(self.endAngle())
-        return self.m['center'] + QPointF(cos(e) * r, sin(e) * r)
+        return self._start + self._span
     def startAngleVector(self):
-        return QVector2D(self.startPoint() - self.m['center']).normalized()
+        if self._sv is None:
+            s = radians(self._start)
+            self._sv = (cos(s), sin(s))
+        return self._sv
     def endAngleVector(self):
-        return QVector2D(self.endPoint() - self.m['center']).normalized()
+        if self._ev is None:
+            e = radians(self.endAngle())
+            self._ev = (cos(e), sin(e))
+        return self._ev
+    def startPoint(self):
+        if self._sp is None:
+            x, y = self.startAngleVector()
+            self._sp = (self._cx + x * self._r, self._cy + y * self._r)
+        return self._sp
+    def endPoint(self):
+        if self._ep is None:
+            x, y = self.endAngleVector()
+            self._ep = (self._cx + x * self._r, self._cy + y * self._r)
+        return self._ep
     def bisector(self):
         """Find the arc bisector.
 
         Raise ArcException if this arc is a circle.
-        
-        Return a normalized QVector2D.
+
+        Return a normalized (x, y) vector.
         """
-        span = self.m['span']
-        if abs(span) == 360.0:
-            raise ArcException('Arc of 360 degrees has no bisector')
-        a = radians(self.m['start'] + span / 2.0)
-        return QVector2D(cos(a), sin(a))
+        if self._bis is None:
+            if abs(self._span) == 360.0:
+                raise ArcException('Arc of 360 degrees has no bisector')
+            a = radians(self._start + self._span / 2.0)
+            self._bis = (cos(a), sin(a))
+        return self._bis
     @staticmethod
-    def fromAngles(a1, a2, radius, cclw=True):
-        """Construct an arc centered @ (0, 0) from a1 to a2.
-        
+    def fromAngles(a1, a2, radius, cclw=True, center=(0.0, 0.0)):
+        """Construct an arc from a1 to a2.
+
         a1, a2 -- signed angles in degrees
         radius -- arc radius
         cclw -- If True, return a counter-clockwise arc (positive span angle)
                 from a1 to a2, else a clockwise arc (negative span angle).
+        center -- (x, y) or QPointF
 
         If a1 and a2 are equal, the arc will span +/-360.0 degrees.
 
         Return an Arc.
         """
-        a = Arc()
         if a1 == a2:
-            a.config({'radius': radius,
-                      'start': 0.0,
-                      'span': 360.0 if cclw else -360.0})
+            return Arc(center, radius, 0.0, 360.0 if cclw else -360.0)
+        a1 %= 360.0
+        a2 %= 360.0
+        if cclw:
+            span = (a2 + 360.0 if a2 < a1 else a2) - a1
         else:
-            a1 %= 360.0
-            a2 %= 360.0
-            if cclw:
-                a.config({'radius': radius,
-                          'start': a1,
-                          'span': (a2 + 360.0 if a2 < a1 else a2) - a1})
-            else:
-                a.config({'radius': radius,
-                          'start': a1,
-                          'span': -((a1 + 360.0 if a1 < a2 else a1) - a2)})
-        return a
+            span = -((a1 + 360.0 if a1 < a2 else a1) - a2)
+        return Arc(center, radius, a1, span)
     @staticmethod
-    def fromVectors(v1, v2, radius, cclw=True):
-        """Construct an arc centered @ (0, 0) from v1 to v2.
+    def fromVectors(v1, v2, radius, cclw=True, center=(0.0, 0.0)):
+        """Construct an arc from v1 to v2.
 
-        v1, v2 -- QVector2D (do not have to be normalized)
+        v1, v2 -- (x, y) or QVector2D (do not have to be normalized)
         radius -- arc radius
         cclw -- if True, the arc will span counter-clockwise from v1 to v2
+        center -- (x, y) or QPointF
 
         Return an Arc
         """
-        a1 = degrees(atan2(v1.y(), v1.x()))
-        a2 = degrees(atan2(v2.y(), v2.x()))
-        return Arc.fromAngles(a1, a2, radius, cclw)
-        
+        x1, y1 = _xy(v1)
+        x2, y2 = _xy(v2)
+        a1 = degrees(atan2(y1, x1))
+        a2 = degrees(atan2(y2, x2))
+        return Arc.fromAngles(a1, a2, radius, cclw, center)
+    @staticmethod
+    def fromArrays(centers, radii, starts, spans):
+        """Construct many arcs at once.
+
+        centers -- (n, 2) center points
+        radii, starts, spans -- (n,) radii and angles in degrees
+
+        The start and end points and vectors are computed for every arc in
+        one pass.
+
+        Return a list of Arc.
+        """
+        centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+        radii = np.asarray(radii, dtype=np.float64)
+        starts = np.asarray(starts, dtype=np.float64)
+        spans = np.asarray(spans, dtype=np.float64)
+        if (radii <= 0.0).any():
+            raise ArcException("radius must be > 0.0")
+        sa = np.radians(starts)
+        ea = np.radians(starts + spans)
+        sv = np.column_stack([np.cos(sa), np.sin(sa)])
+        ev = np.column_stack([np.cos(ea), np.sin(ea)])
+        sp = centers + sv * radii[:, np.newaxis]
+        ep = centers + ev * radii[:, np.newaxis]
+        arcs = []
+        for c, r, s, w, a, b, p, q in zip(centers.tolist(), radii.tolist(),
+                                          starts.tolist(), spans.tolist(),
+                                          sv.tolist(), ev.tolist(),
+                                          sp.tolist(), ep.tolist()):
+            arc = Arc(c, r, s, w)
+            arc._sv = tuple(a)
+            arc._ev = tuple(b)
+            arc._sp = tuple(p)
+            arc._ep = tuple(q)
+            arcs.append(arc)
+        return arcs
+
 
 if __name__ == '__main__':
-    # a1 = Arc()
-    # a1.config({'span': -100})
-    # print 'start angle', a1.startAngle()
-    # print '  end angle', a1.endAngle()
-    # print ' angle diff', a1.angleDiff()
-    # p1 = QPointF(-1, 1)
-    # p2 = QPointF(1, -1)
-    # print Arc.fromPoints(p1, p2, cclw=True).m
     a1 = -120
     a2 = 90
-    print Arc.fromAngles(a1, a2, 1, cclw=False).m
-
-    
+    print Arc.fromAngles(a1, a2, 1, cclw=False)
@@ -0,0 +1,328 @@
+#!/usr/bin/python -t
+# -*- coding: utf-8 -*-
+
+"""assembly.py
+
+Many tool meshes in one scene, a turret or a tool magazine.
+
+An Assembly holds instances, each a mesh and a placement matrix. Instances of
+the same tool share one RevolvedMesh (library tools with the same profile get
+the same mesh from the profile cache, see libraryToolMesh()) and the mesh's
+arrays are uploaded once to buffer objects. Each frame the instances outside
+the view are culled by their bounding spheres, then every remaining instance
+of a mesh is drawn from the same bound buffers, one draw call per instance
+with only the modelview matrix changing in between.
+
+An Assembly has the parts of the Mesh interface MeshView uses, so it can be
+handed to MeshView.setMesh().
+
+Sunday, October 18 2026
+"""
+
+from math import pi, sin, cos
+
+import numpy as np
+import OpenGL.GL as gl
+from OpenGL.arrays import vbo
+
+import matvec
+from bbox import BBox
+from mesh import RevolvedMesh
+
+# shank color of tool meshes
+SHANK_COLOR = (0.5, 0.5, 0.5, 1.0)
+
+
+class AssemblyException(Exception):
+    pass
+
+
+def libraryToolMesh(toolClass, specs, sweep=360.0):
+    """Return the mesh of a library tool without creating the tool.
+
+    toolClass -- the ToolDef subclass of the tool
+    specs -- valid tool specs
+    sweep -- degrees revolved
+
+    The mesh is cached with the shared profile, MainWindow.toolMesh() uses
+    this too, so a tool already shown in the mesh view isn't meshed again and
+    tools with the same geometry get the same mesh.
+    """
+    entry, inch, cutter, shank = toolClass.sharedInchProfile(specs)
+    def build():
+        mesh = RevolvedMesh(sweep=sweep)
+        mesh.addProfile(inch.part(*cutter), joints=inch.joints(*cutter))
+        mesh.addProfile(inch.part(*shank), SHANK_COLOR,
+                        joints=inch.joints(*shank))
+        return mesh
+    return entry.derived(('mesh', specs.get('metric', False), sweep), build)
+
+def ringLayout(count, radius, radial=False):
+    """Place count tools evenly around a ring.
+
+    count -- number of tools
+    radius -- ring radius
+    radial -- if True, tools point out from the center like a turret in the
+              X/Y plane, else they stand parallel to Y around a ring in the
+              X/Z plane like a magazine
+
+    Return a list of 4x4 matrices, see matvec.py.
+    """
+    matrices = []
+    for i in range(count):
+        a = 360.0 * i / count
+        r = a * pi / 180.0
+        if radial:
+            # the tool's +Y axis rotated to point away from the center
+            m = matvec.rotation(a - 90.0, 0.0, 0.0, 1.0) \
+                .dot(matvec.translation(radius * cos(r), radius * sin(r),
+                                        0.0))
+        else:
+            m = matvec.rotation(a, 0.0, 1.0, 0.0) \
+                .dot(matvec.translation(radius * sin(r), 0.0,
+                                        radius * cos(r)))
+        matrices.append(m)
+    return matrices
+
+
+class _MeshBuffers(object):
+    """A mesh's batch arrays in buffer objects.
+
+    Vertices, normals and colors are interleaved, 40 bytes per vertex.
+    """
+    def __init__(self, mesh):
+        self.batch = mesh._batchArrays()
+        vertices, normals, colors, indices = self.batch
+        self.data = vbo.VBO(np.column_stack([vertices, normals, colors])
+                            .astype(np.float32))
+        self.indices = vbo.VBO(indices, target=gl.GL_ELEMENT_ARRAY_BUFFER)
+        self.count = len(indices)
+        # byte offset and index count of each patch, for mixed surface modes
+        counts = [p._nTris * 3 for p in mesh._patches]
+        offsets = np.cumsum([0] + counts[:-1]) * 4
+        self.patches = zip(offsets.tolist(), counts)
+    def bind(self):
+        self.data.bind()
+        self.indices.bind()
+        gl.glVertexPointer(3, gl.GL_FLOAT, 40, self.data)
+        gl.glNormalPointer(gl.GL_FLOAT, 40, self.data + 12)
+        gl.glColorPointer(4, gl.GL_FLOAT, 40, self.data + 24)
+    def unbind(self):
+        self.data.unbind()
+        self.indices.unbind()
+    def delete(self):
+        self.data.delete()
+        self.indices.delete()
+
+
+class Assembly(object):
+    """Placed instances of shared meshes.
+    """
+    def __init__(self):
+        # [(mesh, matrix, name), ...]
+        self._instances = []
+        # id(mesh) -> _MeshBuffers
+        self._buffers = {}
+        # world bounding spheres, (n, 3) centers and (n,) radii
+        self._centers = None
+        self._radii = None
+        # visible instance flags from the last cull()
+        self._visible = None
+        self._bbox = None
+        # instances culled by the last cull()
+        self.culled = 0
+    def __len__(self):
+        return len(self._instances)
+    def addInstance(self, mesh, matrix=None, name=None):
+        """Place a mesh.
+
+        mesh -- Mesh, share it between instances of the same tool
+        matrix -- 4x4 placement, see matvec.py, identity if None
+        name -- optional label
+        """
+        if matrix is None:
+            matrix = matvec.identity()
+        self._instances.append((mesh, np.asarray(matrix, dtype=np.float64),
+                                name))
+        self._centers = self._radii = self._visible = self._bbox = None
+    def instances(self):
+        return list(self._instances)
+    def meshes(self):
+        """Return each distinct mesh once, in the order first placed.
+        """
+        seen = set()
+        meshes = []
+        for mesh, m, name in self._instances:
+            if id(mesh) not in seen:
+                seen.add(id(mesh))
+                meshes.append(mesh)
+        return meshes
+    def _bounds(self):
+        """Find the world bounding sphere of each instance.
+        """
+        if self._centers is None:
+            centers = []
+            radii = []
+            for mesh, m, name in self._instances:
+                bbox = mesh.bbox()
+                # the largest axis scale of the placement
+                scale = np.sqrt((m[:3, :3] ** 2).sum(-1)).max()
+                centers.append(matvec.mxv(m, bbox.center()))
+                radii.append(np.sqrt(np.dot(bbox.size(), bbox.size()))
+                             * 0.5 * scale)
+            self._centers = np.array(centers).reshape(-1, 3)
+            self._radii = np.array(radii)
+        return self._centers, self._radii
+    def sharedVertices(self):
+        """Return the world corners of every instance's bounding box, an
+        (8n, 3) array.
+        """
+        corners = [matvec.mxvs(m, mesh.bbox().vertices())
+                   for mesh, m, name in self._instances]
+        return np.concatenate(corners) if corners else np.zeros((0, 3))
+    def bbox(self):
+        if self._bbox is None:
+            if not self._instances:
+                raise AssemblyException('empty assembly has no bbox')
+            self._bbox = BBox.fromVertices(self.sharedVertices())
+        return self._bbox
+    def cull(self, modelview, projection):
+        """Find the instances in view.
+
+        modelview, projection -- 4x4 matrices, see matvec.py
+
+        The six clip planes are taken from the combined matrix and every
+        bounding sphere is tested against them at once.
+
+        Return an (n,) bool array, also kept for the render methods.
+        """
+        centers, radii = self._bounds()
+        clip = np.dot(modelview, projection)
+        # with row vectors each clip coordinate is a column of clip
+        w = clip[:, 3]
+        planes = np.array([w + clip[:, 0], w - clip[:, 0],
+                           w + clip[:, 1], w - clip[:, 1],
+                           w + clip[:, 2], w - clip[:, 2]])
+        planes /= np.sqrt((planes[:, :3] ** 2).sum(-1))[:, np.newaxis]
+        dist = centers.dot(planes[:, :3].T) + planes[:, 3]
+        self._visible = (dist >= -radii[:, np.newaxis]).all(axis=1)
+        self.culled = int(len(self._visible) - self._visible.sum())
+        return self._visible
+    def _visibleGroups(self):
+        """Return [(mesh, [matrix, ...]), ...] of the instances in view.
+        """
+        visible = self._visible
+        if visible is None:
+            visible = np.ones(len(self._instances), dtype=bool)
+        groups = {}
+        order = []
+        for (mesh, m, name), show in zip(self._instances, visible.tolist()):
+            if not show:
+                continue
+            if id(mesh) not in groups:
+                groups[id(mesh)] = (mesh, [])
+                order.append(id(mesh))
+            groups[id(mesh)][1].append(m)
+        return [groups[k] for k in order]
+    def _meshBuffers(self, mesh):
+        """Return the mesh's buffers, uploaded again if it was rebuilt or
+        recolored.
+        """
+        buffers = self._buffers.get(id(mesh))
+        if buffers is None or buffers.batch is not mesh._batchArrays():
+            if buffers is not None:
+                buffers.delete()
+            buffers = self._buffers[id(mesh)] = _MeshBuffers(mesh)
+        return buffers
+    def renderBatched(self, shader):
+        """Render the instances in view with a MeshShader.
+
+        shader -- meshshader.MeshShader, bound
+
+        Return the number of draw calls made.
+        """
+        calls = 0
+        gl.glEnableClientState(gl.GL_VERTEX_ARRAY)
+        gl.glEnableClientState(gl.GL_NORMAL_ARRAY)
+        gl.glEnableClientState(gl.GL_COLOR_ARRAY)
+        for mesh, matrices in self._visibleGroups():
+            buffers = self._meshBuffers(mesh)
+            if not buffers.count:
+                continue
+            buffers.bind()
+            mode = mesh.surfaceMode()
+            if mode is not None:
+                shader.setMode(mode)
+            for m in matrices:
+                gl.glPushMatrix()
+                gl.glMultMatrixd(m)
+                if mode is not None:
+                    gl.glDrawElements(gl.GL_TRIANGLES, buffers.count,
+                                      gl.GL_UNSIGNED_INT, None)
+                    calls += 1
+                else:
+                    for patch, (offset, count) in zip(mesh._patches,
+                                                      buffers.patches):
+                        shader.setMode(patch._surfaceMode)
+                        gl.glDrawElements(gl.GL_TRIANGLES, count,
+                                          gl.GL_UNSIGNED_INT,
+                                          buffers.indices + offset)
+                        calls += 1
+                gl.glPopMatrix()
+            buffers.unbind()
+        gl.glDisableClientState(gl.GL_VERTEX_ARRAY)
+        gl.glDisableClientState(gl.GL_NORMAL_ARRAY)
+        gl.glDisableClientState(gl.GL_COLOR_ARRAY)
+        return calls
+    def render(self):
+        """Render the instances in view, fixed-function.
+
+        Return the number of draw calls made.
+        """
+        calls = 0
+        for mesh, matrices in self._visibleGroups():
+            for m in matrices:
+                gl.glPushMatrix()
+                gl.glMultMatrixd(m)
+                calls += mesh.render()
+                gl.glPopMatrix()
+        return calls
+    def renderNormals(self):
+        for mesh, matrices in self._visibleGroups():
+            for m in matrices:
+                gl.glPushMatrix()
+                gl.glMultMatrixd(m)
+                mesh.renderNormals()
+                gl.glPopMatrix()
+    def releaseBuffers(self):
+        """Delete the buffer objects, the GL context must be current.
+        """
+        for buffers in self._buffers.values():
+            buffers.delete()
+        self._buffers = {}
+    def toggleNormals(self, state=None):
+        for mesh in self.meshes():
+            mesh.toggleNormals(state)
+    def setWireFrame(self):
+        for mesh in self.meshes():
+            mesh.setWireFrame()
+    def setSmoothShaded(self):
+        for mesh in self.meshes():
+            mesh.setSmoothShaded()
+    def setFlatShaded(self):
+        for mesh in self.meshes():
+            mesh.setFlatShaded()
+    def triangleCount(self):
+        """Return the triangles drawn, of the instances in view.
+        """
+        return sum(mesh.triangleCount() * len(matrices)
+                   for mesh, matrices in self._visibleGroups())
+    def vertexCount(self):
+        """Return the vertices stored, each shared mesh counted once.
+        """
+        return sum(mesh.vertexCount() for mesh in self.meshes())
+    def patchCount(self):
+        return sum(mesh.patchCount() for mesh in self.meshes())
+    @property
+    def buildMs(self):
+        return sum(mesh.buildMs for mesh in self.meshes())
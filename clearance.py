@@ -0,0 +1,239 @@
+#!/usr/bin/python -t
+# -*- coding: utf-8 -*-
+
+"""clearance.py
+
+Reach and clearance queries answered from tool profiles.
+
+Every tool is a surface of revolution, so the question "how wide is the tool
+anywhere from the tip up to height h" has an exact answer in the profile. The
+Envelope of a profile is that answer as a function of h, the largest radius
+at or below h. It never decreases, so it can also be inverted: reach(d) is how
+deep the tool goes beside a wall at distance d from its axis before anything
+touches it.
+
+An Envelope is a table of intervals of height, each with a floor (the largest
+radius already passed) and at most one rising line or arc. A query finds its
+interval with a binary search (np.searchsorted) and evaluates one line or arc,
+whole arrays of queries at once. Nothing is tessellated.
+
+Heights are measured up from the tool tip, Y0 of the profile. Lengths are in
+the profile's units, inches for InchProfiles and assemblies.
+
+Envelopes are cached with the shared profile, see toolEnvelope() and
+assemblyEnvelope().
+
+Sunday, October 18 2026
+"""
+
+from math import atan2, pi, sqrt, cos, sin
+
+import numpy as np
+
+from path2d import KIND_POINT, KIND_CCLW
+
+# Envelope interval curve kinds
+CURVE_NONE = 0
+CURVE_LINE = 1
+CURVE_ARC = 2
+
+
+class ClearanceException(Exception):
+    pass
+
+
+def _arcPieces(p0, p1, center, kind):
+    """Split an arc where it turns in x or y.
+
+    Return a list of ((xa, ya), (xb, yb)) end points of sub-arcs, each in a
+    single quadrant about the center.
+    """
+    cx, cy = center
+    r = sqrt((p1[0] - cx) ** 2 + (p1[1] - cy) ** 2)
+    sign = 1.0 if kind == KIND_CCLW else -1.0
+    a0 = atan2(p0[1] - cy, p0[0] - cx)
+    sweep = (sign * (atan2(p1[1] - cy, p1[0] - cx) - a0)) % (2.0 * pi)
+    if sweep == 0.0:
+        sweep = 2.0 * pi
+    # the quadrant boundaries crossed, as distances along the sweep
+    cuts = sorted(t for t in (sign * (q * pi * 0.5 - a0) % (2.0 * pi)
+                              for q in range(4))
+                  if 1e-12 < t < sweep - 1e-12)
+    ts = [0.0] + cuts + [sweep]
+    pts = [(cx + r * cos(a0 + sign * t), cy + r * sin(a0 + sign * t))
+           for t in ts]
+    pts[0] = tuple(p0)
+    pts[-1] = tuple(p1)
+    return zip(pts[:-1], pts[1:]), r
+
+
+class Envelope(object):
+    """The largest radius of a profile at or below each height.
+
+    points, centers, kinds -- the profile's arrays, see Path2d.toArrays()
+
+    The profile must not cross itself.
+    """
+    def __init__(self, points, centers, kinds):
+        # floors: (y, x) constant from y up
+        # rising: (yl, yh, kind, params), x grows with y from yl to yh
+        floors = []
+        rising = []
+        for i in range(1, len(kinds)):
+            p0 = points[i - 1]
+            if kinds[i] == KIND_POINT:
+                pieces = [(tuple(p0), tuple(points[i]))]
+                arc = None
+            else:
+                pieces, r = _arcPieces(p0, points[i], centers[i], kinds[i])
+                arc = (float(centers[i][0]), float(centers[i][1]), r)
+            for (xa, ya), (xb, yb) in pieces:
+                if ya > yb:
+                    xa, ya, xb, yb = xb, yb, xa, ya
+                if yb - ya <= 0.0 or xb <= xa:
+                    # flat, falling or vertical, its widest point is at
+                    # the bottom (the top of a flat piece is its widest)
+                    floors.append((ya, max(xa, xb) if yb == ya else xa))
+                    continue
+                floors.append((yb, xb))
+                if arc is None:
+                    b = (xb - xa) / (yb - ya)
+                    rising.append((ya, yb, CURVE_LINE,
+                                   (xa - b * ya, b, 0.0, 0.0)))
+                else:
+                    cx, cy, r = arc
+                    s = 1.0 if (xa + xb) * 0.5 >= cx else -1.0
+                    rising.append((ya, yb, CURVE_ARC, (cx, cy, r, s)))
+        if not floors:
+            raise ClearanceException('profile has no extent')
+        breaks = sorted(set([y for y, x in floors]
+                            + [y for r in rising for y in r[:2]]))
+        n = len(breaks)
+        self.y0 = np.array(breaks)
+        self.floor = np.zeros(n)
+        self.kind = np.zeros(n, dtype=np.int8)
+        # line: x = p0 + p1 * y, arc: x = p0 + p3 * sqrt(p2^2 - (y - p1)^2)
+        self.params = np.zeros((n, 4))
+        floors.sort()
+        f = 0
+        floor = 0.0
+        for i, y in enumerate(breaks):
+            while f < len(floors) and floors[f][0] <= y:
+                floor = max(floor, floors[f][1])
+                f += 1
+            self.floor[i] = floor
+            if i + 1 == n:
+                break
+            # the widest rising piece spanning the interval, the profile
+            # doesn't cross itself so it's the widest across the interval
+            mid = (y + breaks[i + 1]) * 0.5
+            best = None
+            for yl, yh, kind, params in rising:
+                if yl <= y and yh >= breaks[i + 1]:
+                    x = self._curve(kind, params, mid)
+                    if best is None or x > best[0]:
+                        best = (x, kind, params)
+            if best is not None:
+                self.kind[i] = best[1]
+                self.params[i] = best[2]
+        # the envelope at the start of each interval and just before its
+        # end, interleaved, never decreasing
+        i = np.arange(n)
+        start = self._eval(i, self.y0)
+        end = np.append(self._eval(i[:-1], self.y0[1:]), self.floor[-1])
+        self._steps = np.column_stack([start, end]).ravel()
+    @staticmethod
+    def _curve(kind, params, y):
+        if kind == CURVE_LINE:
+            return params[0] + params[1] * y
+        cx, cy, r, s = params
+        return cx + s * sqrt(max(r * r - (y - cy) ** 2, 0.0))
+    def height(self):
+        """Return the height of the profile's top.
+        """
+        return self.y0[-1]
+    def maxRadius(self):
+        return self.floor[-1]
+    def breakRadii(self):
+        """Return the radii where reach() goes from one step, line or arc to
+        the next, sorted.
+        """
+        return np.unique(self._steps)
+    def _eval(self, i, h):
+        """Return the envelope of interval(s) i at height(s) h.
+        """
+        kind = self.kind[i]
+        p = self.params[i]
+        line = p[..., 0] + p[..., 1] * h
+        arc = p[..., 0] + p[..., 3] * np.sqrt(
+            np.maximum(p[..., 2] ** 2 - (h - p[..., 1]) ** 2, 0.0))
+        curve = np.where(kind == CURVE_LINE, line,
+                         np.where(kind == CURVE_ARC, arc, 0.0))
+        return np.maximum(self.floor[i], curve)
+    def radius(self, h):
+        """Find the largest radius from the tip up to height h.
+
+        h -- height or array of heights
+
+        Return a float or array, 0.0 below the tip.
+        """
+        h = np.asarray(h, dtype=np.float64)
+        i = np.searchsorted(self.y0, h, side='right') - 1
+        r = np.where(i < 0, 0.0, self._eval(np.maximum(i, 0), h))
+        return r if r.ndim else float(r)
+    def reach(self, d):
+        """Find how deep the tool goes beside a wall.
+
+        d -- distance from the tool's axis to the wall, or an array of them
+
+        Return the height above the tip where the tool first touches the
+        wall, inf if it never does. A float or array.
+        """
+        d = np.asarray(d, dtype=np.float64)
+        k = np.searchsorted(self._steps, d, side='left')
+        never = k >= len(self._steps)
+        j = np.minimum(k // 2, len(self.y0) - 1)
+        p = self.params[j]
+        kind = self.kind[j]
+        # the rising line or arc reaches d inside the interval
+        with np.errstate(divide='ignore', invalid='ignore'):
+            line = (d - p[..., 0]) / p[..., 1]
+            arc = p[..., 1] - p[..., 3] * np.sqrt(
+                np.maximum(p[..., 2] ** 2 - (d - p[..., 0]) ** 2, 0.0))
+        solved = np.where(kind == CURVE_LINE, line,
+                          np.where(kind == CURVE_ARC, arc, self.y0[j]))
+        # an even k is reached at the interval's start, by a step
+        h = np.where(never, np.inf, np.where(k % 2 == 0, self.y0[j], solved))
+        return h if h.ndim else float(h)
+    def clears(self, d, depth):
+        """Find if the tool clears a wall.
+
+        d -- distance from the tool's axis to the wall
+        depth -- how far the tip goes below the top of the wall
+
+        Arrays broadcast. Return True, or a bool array, where nothing from
+        the tip up to depth reaches the wall.
+        """
+        return np.asarray(self.radius(depth)) < d
+
+
+def toolEnvelope(toolClass, specs):
+    """Return the Envelope of a tool's whole profile, in inches.
+
+    toolClass -- the ToolDef subclass of the tool
+    specs -- valid tool specs
+
+    Built once per profile and units.
+    """
+    entry, inch, cutter, shank = toolClass.sharedInchProfile(specs)
+    return entry.derived(('envelope', specs.get('metric', False)),
+                         lambda: Envelope(*inch.arrays()))
+
+def assemblyEnvelope(assembly):
+    """Return the Envelope of a holder.ToolAssembly, in inches.
+
+    The tip is height 0.0, the gauge line assembly.gaugeLength().
+    """
+    entry = assembly.profileEntry()
+    return entry.derived('envelope',
+                         lambda: Envelope(*entry.path2d.arrays()))
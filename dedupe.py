@@ -0,0 +1,198 @@
+#!/usr/bin/python -t
+# -*- coding: utf-8 -*-
+
+"""dedupe.py
+
+Find duplicate and near duplicate tools in a library.
+
+Tools are compared by their geometry specs only. The name and metric flag are
+ignored, lengths are converted to inches and every value is divided by its
+tolerance, so two tools are near duplicates when no spec differs by more than
+one unit.
+
+The index is a locality-sensitive grid hash. Each tool is projected onto the
+mean of its scaled specs and bucketed by the integer part. Two tools within
+tolerance can't be more than one unit apart in the projection, so only the
+tool's bucket and its two neighbors need to be searched, and the search stays
+near linear in the library size.
+
+Sunday, October 18 2026
+"""
+
+from math import floor
+
+import numpy as np
+
+from strutil import toInch
+
+# specs that are not part of the geometry
+IGNORED_SPECS = ('name', 'metric')
+# specs that are not lengths, they are not converted or scaled by the length
+# tolerance
+ANGLE_SPECS = ('angle',)
+
+
+class DedupeException(Exception):
+    pass
+
+
+def geometryVector(specs, tol=0.0001, angTol=0.01):
+    """Find the normalized geometry of a tool.
+
+    specs -- tool specs dict
+    tol -- length tolerance in inches
+    angTol -- angle tolerance in degrees
+
+    Return (keys, vector). keys is the sorted tuple of geometry spec names,
+    vector a numpy array of their values in tolerance units.
+    """
+    if tol <= 0.0 or angTol <= 0.0:
+        raise DedupeException('tolerances must be > 0.0')
+    keys = tuple(sorted(k for k in specs if k not in IGNORED_SPECS))
+    lenScale = toInch(1.0, specs.get('metric')) / tol
+    angScale = 1.0 / angTol
+    vec = np.array([specs[k] * (angScale if k in ANGLE_SPECS else lenScale)
+                    for k in keys], dtype=np.float64)
+    return keys, vec
+
+
+class ToolIndex(object):
+    """Index tools by geometry for exact and near duplicate lookups.
+
+    family -- Tools only match tools of the same family. The family is the
+              shape the specs describe, so a spot drill can match a twist
+              drill, but a ball mill can't match a flat end mill with the same
+              numbers. If None, the category is used.
+    """
+    def __init__(self, tol=0.0001, angTol=0.01):
+        self.tol = tol
+        self.angTol = angTol
+        # id -> [category, family, specs, keys, vector, exactKey, cell]
+        self._items = {}
+        # (family, keys, cell) -> set of ids
+        self._cells = {}
+        # (family, keys, rounded vector) -> set of ids
+        self._exact = {}
+        # id(specs) -> id
+        self._bySpecs = {}
+        self._nextId = 0
+    def __len__(self):
+        return len(self._items)
+    def _key(self, family, specs):
+        keys, vec = geometryVector(specs, self.tol, self.angTol)
+        # exact duplicates round to the same tolerance unit
+        exactKey = (family, keys, tuple(np.rint(vec).astype(np.int64)))
+        cell = (family, keys, int(floor(vec.sum() / max(len(vec), 1))))
+        return keys, vec, exactKey, cell
+    def add(self, category, specs, family=None):
+        """Add a tool.
+
+        category -- library category
+        specs -- tool specs dict, kept by reference
+        family -- see the class doc string
+
+        Return the tool's id.
+        """
+        family = family or category
+        keys, vec, exactKey, cell = self._key(family, specs)
+        toolId = self._nextId
+        self._nextId += 1
+        self._items[toolId] = [category, family, specs, keys, vec, exactKey,
+                               cell]
+        self._cells.setdefault(cell, set()).add(toolId)
+        self._exact.setdefault(exactKey, set()).add(toolId)
+        self._bySpecs[id(specs)] = toolId
+        return toolId
+    def remove(self, toolId):
+        """Remove the tool with the given id.
+        """
+        item = self._items.pop(toolId)
+        del self._bySpecs[id(item[2])]
+        for m, k in ((self._cells, item[6]), (self._exact, item[5])):
+            ids = m[k]
+            ids.discard(toolId)
+            if not ids:
+                del m[k]
+    def find(self, specs):
+        """Return the id of the tool whose specs dict is specs, or None.
+        """
+        return self._bySpecs.get(id(specs))
+    def tool(self, toolId):
+        """Return [category, specs] of the tool with the given id.
+        """
+        item = self._items[toolId]
+        return [item[0], item[2]]
+    def exactMatches(self, specs, family):
+        """Return the ids of tools with the same rounded geometry.
+        """
+        _, _, exactKey, _ = self._key(family, specs)
+        return sorted(self._exact.get(exactKey, ()))
+    def nearMatches(self, specs, family):
+        """Find tools whose geometry is within tolerance.
+
+        Return a list of (id, maxDiff) sorted by maxDiff. maxDiff is the
+        largest spec difference in tolerance units (<= 1.0).
+        """
+        _, vec, _, (f, k, c) = self._key(family, specs)
+        return self._near(vec, f, k, c)
+    def _near(self, vec, family, cellKeys, cell):
+        found = []
+        for cc in (cell - 1, cell, cell + 1):
+            for toolId in self._cells.get((family, cellKeys, cc), ()):
+                diff = np.abs(self._items[toolId][4] - vec).max() \
+                    if len(vec) else 0.0
+                if diff <= 1.0:
+                    found.append((toolId, diff))
+        found.sort(key=lambda x: x[1])
+        return found
+    def duplicates(self):
+        """Group every tool with its near duplicates.
+
+        Matches are not chained. Tools are visited in the order they were
+        added and each tool not already grouped starts a group of itself and
+        its ungrouped near matches. A series of tools that each differ from
+        the next by just under the tolerance (wire gauge drills for
+        instance) is not collapsed into one group.
+
+        Return a list of groups, each a list of ids with at least two
+        entries. The first id is the tool that started the group.
+        """
+        grouped = set()
+        groups = []
+        for toolId in sorted(self._items):
+            if toolId in grouped:
+                continue
+            vec = self._items[toolId][4]
+            f, k, c = self._items[toolId][6]
+            group = [toolId]
+            for otherId, _ in self._near(vec, f, k, c):
+                if otherId != toolId and otherId not in grouped:
+                    group.append(otherId)
+            if len(group) > 1:
+                grouped.update(group)
+                groups.append(group)
+        return groups
+    def isExactGroup(self, group):
+        """Return True if every tool in the group has the same rounded
+        geometry.
+        """
+        return len(set(self._items[i][5] for i in group)) == 1
+    def report(self, groups=None):
+        """Describe the duplicate groups.
+
+        groups -- as returned by duplicates(), if None duplicates() is called
+
+        Return a multi-line string.
+        """
+        if groups is None:
+            groups = self.duplicates()
+        lines = ['{} duplicate group(s), tolerance {}" / {} deg'
+                 .format(len(groups), self.tol, self.angTol)]
+        for n, group in enumerate(groups):
+            lines.append('')
+            lines.append('Group {} ({})'.format(
+                    n + 1, 'exact' if self.isExactGroup(group) else 'near'))
+            for toolId in group:
+                category, specs = self.tool(toolId)
+                lines.append(u'  {} / {}'.format(category, specs['name']))
+        return u'\n'.join(lines)
@@ -0,0 +1,124 @@
+#!/usr/bin/python -t
+# -*- coding: utf-8 -*-
+
+"""dedupedialog.py
+
+Review and merge duplicate tools.
+
+Sunday, October 18 2026
+"""
+
+from PyQt4.QtCore import *
+from PyQt4.QtGui import *
+from PyQt4.QtCore import Qt as qt
+
+
+class DedupeDialog(QDialog):
+    """List the duplicate groups found in a ToolBrowserView's library.
+
+    The first tool of each group is kept, the rest are checked for removal.
+    Merge removes every checked tool from the library.
+    """
+    def __init__(self, toolBrowser, parent=None):
+        super(DedupeDialog, self).__init__(parent)
+        self.setWindowTitle('machtool - Duplicate Tools')
+        self.toolBrowser = toolBrowser
+        self.index = None
+        self.groups = []
+        # tolerance
+        tolLayout = QHBoxLayout()
+        tolLayout.addWidget(QLabel('Tolerance (in)', self))
+        self.tolSpinBox = QDoubleSpinBox(self)
+        self.tolSpinBox.setDecimals(4)
+        self.tolSpinBox.setRange(0.0001, 0.1)
+        self.tolSpinBox.setSingleStep(0.0005)
+        self.tolSpinBox.setValue(toolBrowser.index.tol)
+        tolLayout.addWidget(self.tolSpinBox)
+        self.findButton = QPushButton('Find', self)
+        self.connect(self.findButton, SIGNAL('clicked()'), self.find)
+        tolLayout.addWidget(self.findButton)
+        tolLayout.insertStretch(3, 1)
+        # groups
+        self.tree = QTreeWidget(self)
+        self.tree.setColumnCount(1)
+        self.tree.header().close()
+        # buttons
+        buttonLayout = QHBoxLayout()
+        self.reportButton = QPushButton('Save Report', self)
+        self.connect(self.reportButton, SIGNAL('clicked()'), self.saveReport)
+        buttonLayout.addWidget(self.reportButton)
+        buttonLayout.insertStretch(1, 1)
+        self.mergeButton = QPushButton('Merge', self)
+        self.connect(self.mergeButton, SIGNAL('clicked()'), self.merge)
+        buttonLayout.addWidget(self.mergeButton)
+        closeButton = QPushButton('Close', self)
+        self.connect(closeButton, SIGNAL('clicked()'), self.accept)
+        buttonLayout.addWidget(closeButton)
+        vLayout = QVBoxLayout(self)
+        vLayout.addLayout(tolLayout)
+        vLayout.addWidget(self.tree)
+        vLayout.addLayout(buttonLayout)
+        self.find()
+    def sizeHint(self):
+        return QSize(400, 500)
+    def find(self):
+        """Search the library and fill the tree with the duplicate groups.
+        """
+        self.index, self.groups = \
+            self.toolBrowser.findDuplicates(self.tolSpinBox.value())
+        self.tree.clear()
+        for n, group in enumerate(self.groups):
+            kind = 'exact' if self.index.isExactGroup(group) else 'near'
+            groupItem = QTreeWidgetItem(['Group {} ({})'.format(n + 1, kind)])
+            for i, toolId in enumerate(group):
+                category, specs = self.index.tool(toolId)
+                item = QTreeWidgetItem(groupItem,
+                                       [u'{} / {}'.format(category,
+                                                          specs['name'])])
+                item.setFlags(item.flags() | qt.ItemIsUserCheckable)
+                # keep the first one
+                item.setCheckState(0, qt.Checked if i else qt.Unchecked)
+                item.setData(0, qt.UserRole, toolId)
+            self.tree.addTopLevelItem(groupItem)
+        self.tree.expandAll()
+        self.mergeButton.setEnabled(bool(self.groups))
+        self.reportButton.setEnabled(bool(self.groups))
+    def checkedTools(self):
+        """Return [category, specs] for every checked tool.
+        """
+        tools = []
+        for i in range(self.tree.topLevelItemCount()):
+            groupItem = self.tree.topLevelItem(i)
+            for j in range(groupItem.childCount()):
+                item = groupItem.child(j)
+                if item.checkState(0) == qt.Checked:
+                    toolId = item.data(0, qt.UserRole).toInt()[0]
+                    tools.append(self.index.tool(toolId))
+        return tools
+    def merge(self):
+        """Remove the checked tools from the library.
+        """
+        tools = self.checkedTools()
+        if not tools:
+            return
+        result = QMessageBox.question(self,
+                                      'machtool',
+                                      'Remove {} tool(s) from the library?' \
+                                          .format(len(tools)),
+                                      QMessageBox.Yes | QMessageBox.No)
+        if result == QMessageBox.No:
+            return
+        for category, specs in tools:
+            self.toolBrowser.removeTool(category, specs)
+        self.find()
+    def saveReport(self):
+        """Write the duplicate groups to a text file.
+        """
+        fname = unicode(QFileDialog.getSaveFileName(self,
+                                                    'Save Duplicate Report',
+                                                    self.toolBrowser.lastDir,
+                                                    'Text files (*.txt)'))
+        if fname:
+            f = open(fname, 'w')
+            f.write(self.index.report(self.groups).encode('utf-8'))
+            f.close()
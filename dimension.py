@@ -732,10 +732,8 @@ class RadiusDim(Dimension):
     """
     def __init__(self, parent=None, specMap={'value': 0.5,
                                              'pos': QPointF(3.5, 3.5),
-                                             'arc': Arc({'center': QPointF(),
-                                                         'radius': 0.5,
-                                                         'start': 0.0,
-                                                         'span': 90.0}),
+                                             'arc': Arc((0.0, 0.0), 0.5,
+                                                        0.0, 90.0),
                                              'outside': True,
                                              'format': FMTRIN}):
         if specMap['arc'].radius() <= 0:
@@ -750,7 +748,7 @@ class RadiusDim(Dimension):
         arcRadius = self.specMap['arc'].radius()
         pos = self.specMap['pos']
         pp = QPainterPath()
-        arcCenter = self.specMap['arc'].center()
+        arcCenter = QPointF(*self.specMap['arc'].center())
         # is the label outside the arc
         labelOutside = QVector2D(pos - arcCenter).length() > arcRadius
         # is the label to the right of the arc's y axis?
@@ -824,14 +822,14 @@ class RadiusDim(Dimension):
             # arc rect
             p = QPointF(arcRadius, arcRadius)
             r = QRectF(arcCenter - p, arcCenter + p)
-            bisV = arc.bisector()
+            bisV = QVector2D(*arc.bisector())
             # arc center to arrow tip vector
             apV = QVector2D(ap - arcCenter).normalized()
             # bisector rotated 90
             bis90V = QVector2D(-bisV.y(), bisV.x())
-            spV = arc.startAngleVector()
+            spV = QVector2D(*arc.startAngleVector())
             spLeftOfBisector = spV.dotProduct(spV, bis90V) >= 0.0
-            epV = arc.endAngleVector()
+            epV = QVector2D(*arc.endAngleVector())
             # is the arrow tip to the left of the bisector?
             if bis90V.dotProduct(apV, bis90V) >= 0.0:
                 # is the start point left of the bisector?
@@ -967,13 +965,12 @@ class AngleDim(Dimension):
         if dp(labelV, lVperp) > 0.0:
             if outside:
                 # leader from lable to left arrow
-                arc = Arc.fromVectors(labelV, lV, radius, False)
-                arc.center(xsectP)
+                arc = Arc.fromVectors(labelV, lV, radius, False,
+                                      center=xsectP)
                 clipP = xsectArcRect1(arc, tb)
                 if clipP:
                     arc = Arc.fromVectors(QVector2D(clipP - xsectP), lV,
-                                         radius, False)
-                    arc.center(xsectP)
+                                          radius, False, center=xsectP)
                     pp.arcMoveTo(rect, arc.start())
                     pp.arcTo(rect, arc.start(), arc.span())
                 # fixed leader from right arrow
@@ -982,26 +979,23 @@ class AngleDim(Dimension):
                 pp.arcTo(rect, sa, -fixedLeaderSpan)
             else:
                 # leader from label, through left arrow, to right arrow
-                arc = Arc.fromVectors(labelV, rV, radius, False)
-                arc.center(xsectP)
+                arc = Arc.fromVectors(labelV, rV, radius, False,
+                                      center=xsectP)
                 clipP = xsectArcRect1(arc, tb)
                 if clipP:
                     arc = Arc.fromVectors(QVector2D(clipP - xsectP), rV,
-                                         radius, False)
-                    arc.center(xsectP)
+                                          radius, False, center=xsectP)
                     pp.arcMoveTo(rect, arc.start())
                     pp.arcTo(rect, arc.start(), arc.span())
         # label right of quad
         elif dp(labelV, rVperp) > 0.0:
             if outside:
                 # leader from label to right arrow
-                arc = Arc.fromVectors(labelV, rV, radius)
-                arc.center(xsectP)
+                arc = Arc.fromVectors(labelV, rV, radius, center=xsectP)
                 clipP = xsectArcRect1(arc, tb)
                 if clipP:
                     arc = Arc.fromVectors(QVector2D(clipP - xsectP), rV,
-                                         radius)
-                    arc.center(xsectP)
+                                          radius, center=xsectP)
                     pp.arcMoveTo(rect, arc.start())
                     pp.arcTo(rect, arc.start(), arc.span())
                 # fixed length leader from left arrow
@@ -1010,13 +1004,11 @@ class AngleDim(Dimension):
                 pp.arcTo(rect, sa, fixedLeaderSpan)
             else:
                 # leader from label, through right arrow, to left arrow
-                arc = Arc.fromVectors(labelV, lV, radius)
-                arc.center(xsectP)
+                arc = Arc.fromVectors(labelV, lV, radius, center=xsectP)
                 clipP = xsectArcRect1(arc, tb)
                 if clipP:
                     arc = Arc.fromVectors(QVector2D(clipP - xsectP), lV,
-                                         radius)
-                    arc.center(xsectP)
+                                          radius, center=xsectP)
                     pp.arcMoveTo(rect, arc.start())
                     pp.arcTo(rect, arc.start(), arc.span())
         # label inside quad
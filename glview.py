@@ -6,7 +6,6 @@
 Saturday, September 14 2013
 """
 
-from copy import copy
 from math import sqrt
 
 from PyQt4.QtGui import *
@@ -14,9 +13,11 @@ from PyQt4.QtCore import *
 from PyQt4.QtCore import Qt as qt
 from PyQt4.QtOpenGL import *
 import OpenGL.GL as gl
-import OpenGL.GLU as glu
+from OpenGL.arrays import vbo
 import numpy as np
 
+import matvec
+
 class GLView(QGLWidget):
     """An OpenGL viewer with pan/rotate/zoom + fixed orientation views.
 
@@ -41,8 +42,11 @@ class GLView(QGLWidget):
                            
     A single light is provided at the fixed point (50, 50, 170).
 
-    A basic xyz axis indicator is rendered in a seperate viewport in the lower
-    left corner. red=X+, green=Y+, blue=Z+.
+    A basic xyz axis indicator is rendered in the lower left corner.
+    red=X+, green=Y+, blue=Z+.
+
+    The view and projection matrices are kept on the CPU (see matvec.py) and
+    loaded at the start of each paintGL(). Nothing is read back from GL.
 
     A fit method is supplied. The two [x, y] points define the corners of
     the rectangle to fit. The coordinates should be relative to the default
@@ -52,6 +56,10 @@ class GLView(QGLWidget):
     ================
     * Initial view orientation is the default OpenGL X/Y plane. This is the
       'front' view.
+    * Mouse drags and the wheel don't repaint per event. Their deltas are
+      accumulated and applied by one frame, scheduled no sooner than
+      frameInterval ms (or the last frame's paint time, if longer) after the
+      previous frame.
     * Mouse wheel zooms in (with shift) and out (with no shift).
     * Left button rotates the scene about rotCenter.
     * Middle button pans the scene.
@@ -70,10 +78,20 @@ class GLView(QGLWidget):
     # Length of one leg of the axis indicator. The subwindow's scene size
     # will be twice this.
     axisLen = 5.0
+    # minimum milliseconds between mouse driven frames, about 60 Hz
+    frameInterval = 16
     def __init__(self, parent):
         super(GLView, self).__init__(parent)
         self.rotCenter = [0.0, 0.0, 0.0]
         self.modelviewMatrix = np.identity(4)
+        self.projMatrix = np.identity(4)
+        # modelviewMatrix without its translation, and the projection that
+        # puts the axis indicator in the lower left corner
+        self.axisMatrix = np.identity(4)
+        self.axisProjMatrix = np.identity(4)
+        # interleaved vertex, normal, color VBO and its vertex count
+        self.axisVbo = None
+        self.axisVertexCount = 0
         self.sceneCenter = [0.0, 0.0]
         self.sceneWidth = 10.0
         self.sceneHeight = 10.0
@@ -84,8 +102,61 @@ class GLView(QGLWidget):
         self.maxZoom = 100.0
         self.setMouseTracking(True)
         self.createContextMenu()
+        # mouse deltas waiting for the next frame
+        self._pendingRotate = [0, 0]
+        self._pendingPan = [0, 0]
+        self._frameTimer = QTimer(self)
+        self._frameTimer.setSingleShot(True)
+        self.connect(self._frameTimer, SIGNAL('timeout()'), self._flushFrame)
+        # time since the last frame finished, and how long it took
+        self._frameClock = QElapsedTimer()
+        self._frameClock.start()
+        self._lastPaintMs = 0
+    def scheduleUpdate(self):
+        """Repaint once the frame budget allows it.
+
+        Calls made while a frame is already scheduled are merged into it.
+        """
+        if self._frameTimer.isActive():
+            return
+        budget = max(self.frameInterval, self._lastPaintMs)
+        self._frameTimer.start(max(0, budget - self._frameClock.elapsed()))
+    def _flushFrame(self):
+        """Apply the accumulated mouse deltas and repaint.
+        """
+        dx, dy = self._pendingRotate
+        if dx or dy:
+            self.mouseRotate(dx, dy)
+        self._pendingRotate = [0, 0]
+        dx, dy = self._pendingPan
+        if dx or dy:
+            self._pan(dx, dy)
+        self._pendingPan = [0, 0]
+        self.update()
+    def glDraw(self):
+        """Time each frame for scheduleUpdate().
+        """
+        clock = QElapsedTimer()
+        clock.start()
+        super(GLView, self).glDraw()
+        self._lastPaintMs = clock.elapsed()
+        self._frameClock.restart()
     def setRotCenter(self, p):
         self.rotCenter = p
+    def setModelview(self, m):
+        """Set the view's modelview matrix.
+
+        m -- 4x4 array, see matvec.py
+        """
+        self.modelviewMatrix = m
+        self.axisMatrix = matvec.rotationOnly(m)
+    def loadMatrices(self):
+        """Load the projection and modelview matrices into GL.
+        """
+        gl.glMatrixMode(gl.GL_PROJECTION)
+        gl.glLoadMatrixd(self.projMatrix)
+        gl.glMatrixMode(gl.GL_MODELVIEW)
+        gl.glLoadMatrixd(self.modelviewMatrix)
     # TODO: too lazy
     def createContextMenu(self):
         self.setContextMenuPolicy(qt.ActionsContextMenu)
@@ -126,51 +197,88 @@ class GLView(QGLWidget):
 
         Return (x, y)
         """
-        pw, ph = self.pixelSize(gl.glGetFloat(gl.GL_PROJECTION_MATRIX))
+        pw, ph = self.pixelSize(self.projMatrix)
         return (self.sceneCenter[0] - self.sceneWidth * 0.5 + pw * x,
                 self.sceneCenter[1] + self.sceneHeight * 0.5 + ph * -y)
     def ortho(self):
         """Set up the scene's visible bounds.
         """
-        gl.glMatrixMode(gl.GL_PROJECTION)
-        gl.glLoadIdentity()
         self.sceneWidth = self.sceneHeight * self.aspect
         cx, cy = self.sceneCenter
-        gl.glOrtho(cx - self.sceneWidth * 0.5,
-                   cx + self.sceneWidth * 0.5,
-                   cy - self.sceneHeight * 0.5,
-                   cy + self.sceneHeight * 0.5,
-                   -1000, 1000)
-        gl.glMatrixMode(gl.GL_MODELVIEW)
+        self.projMatrix = matvec.ortho(cx - self.sceneWidth * 0.5,
+                                       cx + self.sceneWidth * 0.5,
+                                       cy - self.sceneHeight * 0.5,
+                                       cy + self.sceneHeight * 0.5,
+                                       -1000, 1000)
     def resizeGL(self, w, h):
         if w == 0 or h == 0:
             return
         self.aspect = float(w) / h
         gl.glViewport(0, 0, w, h)
         self.ortho()
+        # 1/8 the view width with a minimum of 100 pixels, the indicator's
+        # scene is scaled and shifted into that corner of the view
+        size = max(w / 8, 100)
+        sx = float(size) / w
+        sy = float(size) / h
+        l = GLView.axisLen
+        corner = np.identity(4)
+        corner[0, 0] = sx
+        corner[1, 1] = sy
+        corner[3, :2] = (sx - 1.0, sy - 1.0)
+        self.axisProjMatrix = matvec.ortho(-l, l, -l, l, -2.0 * l, 2.0 * l) \
+            .dot(corner)
         self.updateGL()
     def buildAxisIndicator(self):
-        """Assemble the axis indicator into a display list.
+        """Assemble the axis indicator into a vertex buffer.
         """
         # single axis specs
         bodyLen = GLView.axisLen * 0.75
         tipLen = GLView.axisLen * 0.25
         majDia = GLView.axisLen * 0.125
         slices = 8
-        stacks = 2
-        # build one axis
-        axisId = gl.glGenLists(1)
-        quadric = glu.gluNewQuadric()
-        gl.glNewList(axisId, gl.GL_COMPILE)
-        glu.gluCylinder(quadric, 0.0, majDia, bodyLen, slices, stacks)
-        gl.glPushMatrix()
-        gl.glTranslate(0, 0, bodyLen)
-        glu.gluCylinder(quadric, majDia, 0, tipLen, slices, stacks)
-        gl.glPopMatrix()
-        gl.glEndList()
-        # now assemble all three
-        self.axisIndicatorId = gl.glGenLists(1)
-        gl.glNewList(self.axisIndicatorId, gl.GL_COMPILE)
+        # one axis along Z+, a cone widening to majDia then the tip
+        a = np.linspace(0.0, 2.0 * np.pi, slices + 1)
+        ring = np.column_stack([np.cos(a), np.sin(a), np.zeros_like(a)])
+        def cone(r1, z1, r2, z2):
+            # side normal, perpendicular to the slant
+            slope = (r1 - r2) / (z2 - z1)
+            n = np.column_stack([ring[:, :2], np.full(len(ring), slope)])
+            n /= np.sqrt((n * n).sum(-1))[:, np.newaxis]
+            p1 = ring * r1 + (0.0, 0.0, z1)
+            p2 = ring * r2 + (0.0, 0.0, z2)
+            tris = []
+            for i in range(slices):
+                tris += [(p1[i], n[i]), (p1[i + 1], n[i + 1]),
+                         (p2[i + 1], n[i + 1]),
+                         (p1[i], n[i]), (p2[i + 1], n[i + 1]), (p2[i], n[i])]
+            return tris
+        axis = cone(0.0, 0.0, majDia, bodyLen) + \
+            cone(majDia, bodyLen, 0.0, bodyLen + tipLen)
+        pts = np.array([p for p, n in axis])
+        nrms = np.array([n for p, n in axis])
+        data = []
+        # X red, Y green, Z blue, the Z axis rotated into place
+        for m, color in ((matvec.rotation(90, 0, 1, 0), (0.7, 0.0, 0.0, 1.0)),
+                         (matvec.rotation(-90, 1, 0, 0), (0.0, 0.7, 0.0, 1.0)),
+                         (np.identity(4), (0.0, 0.0, 0.7, 1.0))):
+            data.append(np.column_stack([pts.dot(m[:3, :3]),
+                                         nrms.dot(m[:3, :3]),
+                                         np.tile(color, (len(pts), 1))]))
+        data = np.concatenate(data).astype(np.float32)
+        self.axisVertexCount = len(data)
+        self.axisVbo = vbo.VBO(data)
+    def renderAxisIndicator(self):
+        """Render an axis orientation aid.
+
+        The indicator is drawn in front of the scene, in the lower left
+        corner, with the rotation of the modelview matrix. Leaves the
+        indicator's matrices loaded.
+        """
+        gl.glMatrixMode(gl.GL_PROJECTION)
+        gl.glLoadMatrixd(self.axisProjMatrix)
+        gl.glMatrixMode(gl.GL_MODELVIEW)
+        gl.glLoadMatrixd(self.axisMatrix)
         # always lit and smooth shaded with a bit a spec
         gl.glEnable(gl.GL_LIGHTING)
         gl.glPolygonMode(gl.GL_FRONT, gl.GL_FILL)
@@ -178,113 +286,62 @@ class GLView(QGLWidget):
         gl.glMaterialfv(gl.GL_FRONT_AND_BACK, gl.GL_SPECULAR,
                         [1.0, 1.0, 1.0, 1.0])
         gl.glMaterialfv(gl.GL_FRONT_AND_BACK, gl.GL_SHININESS, 64)
-        # X axis, red
-        gl.glMaterialfv(gl.GL_FRONT_AND_BACK, gl.GL_AMBIENT_AND_DIFFUSE,
-                        [0.7, 0.0, 0.0, 1.0])
-        gl.glPushMatrix()
-        gl.glRotate(90, 0, 1, 0)
-        gl.glCallList(axisId)
-        gl.glPopMatrix()
-        # Y axis, green
-        gl.glMaterialfv(gl.GL_FRONT_AND_BACK, gl.GL_AMBIENT_AND_DIFFUSE,
-                        [0.0, 0.7, 0.0, 1.0])
-        gl.glPushMatrix()
-        gl.glRotate(-90, 1, 0, 0)
-        gl.glCallList(axisId)
-        gl.glPopMatrix()
-        # Z axis, blue
-        gl.glMaterialfv(gl.GL_FRONT_AND_BACK, gl.GL_AMBIENT_AND_DIFFUSE,
-                        [0.0, 0.0, 0.7, 1.0])
-        gl.glCallList(axisId)
-        gl.glEndList()
-    def renderAxisIndicator(self):
-        """Render an axis orientation aid.
-
-        A small square viewport is created in the lower left corner of the
-        view to render into.
-        """
-        # 1/8 the view width with a minimum of 100 pixels.
-        viewportSize = max(self.width() / 8, 100)
-        gl.glViewport(0, 0, viewportSize, viewportSize)
-        # Set up an orthographic projection whoes size depends on the size of
-        # the axis indicator.
-        gl.glMatrixMode(gl.GL_PROJECTION)
-        gl.glPushMatrix()
-        gl.glLoadIdentity()
-        # TODO: understand the near/far clip plane vs the depth buffer
-        gl.glOrtho(-GLView.axisLen, GLView.axisLen,
-                    -GLView.axisLen, GLView.axisLen,
-                    -10000.0 - GLView.axisLen, .0)
-        # now render into that viewport
-        gl.glMatrixMode(gl.GL_MODELVIEW)
-        gl.glPushMatrix()
-        gl.glLoadIdentity()
-        # Move the indicators origin far away from the origin. This is the
-        # only way I know to keep the mesh from clipping it. Probably need
-        # some sort of overlay buffer.
-        gl.glTranslatef(0.0, 0.0, 10000.0)
-        # only need the rotation of the global matrix, no translation
-        m = copy(self.modelviewMatrix)
-        m[3] = [0.0, 0.0, 0.0, 1.0]
-        gl.glMultMatrixf(m)
-        # render the indicator
-        gl.glCallList(self.axisIndicatorId)
-        # pop the global modelview
-        gl.glPopMatrix()
-        gl.glMatrixMode(gl.GL_PROJECTION)
-        # pop the main viewports projection matrix
-        gl.glPopMatrix()
-        # after these two, we should be back where we started, maybe!
-        gl.glMatrixMode(gl.GL_MODELVIEW)
-        gl.glViewport(0, 0, self.width(), self.height())
+        gl.glColorMaterial(gl.GL_FRONT_AND_BACK, gl.GL_AMBIENT_AND_DIFFUSE)
+        gl.glEnable(gl.GL_COLOR_MATERIAL)
+        # in front of everything already drawn
+        gl.glDepthRange(0.0, 0.01)
+        self.axisVbo.bind()
+        gl.glEnableClientState(gl.GL_VERTEX_ARRAY)
+        gl.glEnableClientState(gl.GL_NORMAL_ARRAY)
+        gl.glEnableClientState(gl.GL_COLOR_ARRAY)
+        gl.glVertexPointer(3, gl.GL_FLOAT, 40, self.axisVbo)
+        gl.glNormalPointer(gl.GL_FLOAT, 40, self.axisVbo + 12)
+        gl.glColorPointer(4, gl.GL_FLOAT, 40, self.axisVbo + 24)
+        gl.glDrawArrays(gl.GL_TRIANGLES, 0, self.axisVertexCount)
+        gl.glDisableClientState(gl.GL_VERTEX_ARRAY)
+        gl.glDisableClientState(gl.GL_NORMAL_ARRAY)
+        gl.glDisableClientState(gl.GL_COLOR_ARRAY)
+        self.axisVbo.unbind()
+        gl.glDepthRange(0.0, 1.0)
+        gl.glDisable(gl.GL_COLOR_MATERIAL)
     def paintGL(self):
         gl.glClear(gl.GL_COLOR_BUFFER_BIT | gl.GL_DEPTH_BUFFER_BIT)
+        self.loadMatrices()
         self.renderAxisIndicator()
     def frontView(self, update=True):
         """Rotate to view the X/Y plane.
         """
-        gl.glLoadIdentity()
-        self.modelviewMatrix = gl.glGetFloat(gl.GL_MODELVIEW_MATRIX)
+        self.setModelview(matvec.identity())
         if update:
             self.updateGL()
     def backView(self, update=True):
         """Rotate to view the -X/Y plane.
         """
-        gl.glLoadIdentity()
-        gl.glRotate(180.0, 0.0, 1.0, 0.0)
-        self.modelviewMatrix = gl.glGetFloat(gl.GL_MODELVIEW_MATRIX)
+        self.setModelview(matvec.rotation(180.0, 0.0, 1.0, 0.0))
         if update:
             self.updateGL()
     def rightView(self, update=True):
         """Rotate to view the -Z/Y plane.
         """
-        gl.glLoadIdentity()
-        gl.glRotate(-90.0, 0.0, 1.0, 0.0)
-        self.modelviewMatrix = gl.glGetFloat(gl.GL_MODELVIEW_MATRIX)
+        self.setModelview(matvec.rotation(-90.0, 0.0, 1.0, 0.0))
         if update:
             self.updateGL()
     def leftView(self, update=True):
         """Rotate to view the Z/Y plane.
         """
-        gl.glLoadIdentity()
-        gl.glRotate(90.0, 0.0, 1.0, 0.0)
-        self.modelviewMatrix = gl.glGetFloat(gl.GL_MODELVIEW_MATRIX)
+        self.setModelview(matvec.rotation(90.0, 0.0, 1.0, 0.0))
         if update:
             self.updateGL()
     def topView(self, update=True):
         """Rotate to view the X/Z- plane.
         """
-        gl.glLoadIdentity()
-        gl.glRotate(90.0, 1.0, 0.0, 0.0)
-        self.modelviewMatrix = gl.glGetFloat(gl.GL_MODELVIEW_MATRIX)
+        self.setModelview(matvec.rotation(90.0, 1.0, 0.0, 0.0))
         if update:
             self.updateGL()
     def bottomView(self, update=True):
         """Rotate to view the -X/Z plane.
         """
-        gl.glLoadIdentity()
-        gl.glRotate(-90.0, 1.0, 0.0, 0.0)
-        self.modelviewMatrix = gl.glGetFloat(gl.GL_MODELVIEW_MATRIX)
+        self.setModelview(matvec.rotation(-90.0, 1.0, 0.0, 0.0))
         if update:
             self.updateGL()
     # TODO: Not sure if this is 100% accurate, but it's close enough.
@@ -294,10 +351,8 @@ class GLView(QGLWidget):
         +Y up, +X right, +Z forward
 
         """
-        gl.glLoadIdentity()
-        gl.glRotate(30.0, 1.0, 0.0, 0.0)
-        gl.glRotate(-45.0, 0.0, 1.0, 0.0)
-        self.modelviewMatrix = gl.glGetFloat(gl.GL_MODELVIEW_MATRIX)
+        self.setModelview(matvec.rotation(-45.0, 0.0, 1.0, 0.0)
+                          .dot(matvec.rotation(30.0, 1.0, 0.0, 0.0)))
         if update:
             self.updateGL()
     def mouseRotate(self, dx, dy):
@@ -317,29 +372,24 @@ class GLView(QGLWidget):
         Y+ is up, X+ is right
         """
         # find the rotation center point @ the current rotation
-        gl.glPushMatrix()
-        gl.glTranslatef(*self.rotCenter)
-        m = gl.glGetFloat(gl.GL_MODELVIEW_MATRIX)
-        gl.glPopMatrix()
-        gl.glLoadIdentity()
+        c = matvec.mxv(self.modelviewMatrix, self.rotCenter)
         # now shift/rotate/unshift and mulitiply
-        gl.glTranslatef(*m[3,:3]) # NUMPY: indexing
-        gl.glRotate(angle, *axis)
-        gl.glTranslatef(*(m[3,:3] * -1.0))
-        # gl.glTranslatef(-m[3, 0], -m[3, 1], -m[3, 2]) # NUMPY: indexing
-        gl.glMultMatrixf(self.modelviewMatrix)
-        self.modelviewMatrix = gl.glGetFloat(gl.GL_MODELVIEW_MATRIX)
-        # self.updateGL()
+        self.setModelview(self.modelviewMatrix
+                          .dot(matvec.translation(*(c * -1.0)))
+                          .dot(matvec.rotation(angle, *axis))
+                          .dot(matvec.translation(*c)))
     def pan(self, dx, dy):
         """Shift the scene origin by dx/dy pixels.
 
         dx, dy -- mouse deltas in pixels
         """
-        pw, ph = self.pixelSize(gl.glGetFloat(gl.GL_PROJECTION_MATRIX))
+        self._pan(dx, dy)
+        self.scheduleUpdate()
+    def _pan(self, dx, dy):
+        pw, ph = self.pixelSize(self.projMatrix)
         self.sceneCenter[0] -= pw * dx
         self.sceneCenter[1] -= ph * -dy
         self.ortho()
-        self.updateGL()
     def fit(self, p1, p2, pad=True):
         """Fit the rectangle define by the two points into the scene.
 
@@ -366,14 +416,15 @@ class GLView(QGLWidget):
     def mouseMoveEvent(self, e):
         """Left button rotate, middle button pan
         """
+        delta = e.pos() - self.lastMousePos
         if e.buttons() & qt.LeftButton:
-            delta = e.pos() - self.lastMousePos
-            self.mouseRotate(delta.x(), delta.y())
-            self.updateGL()
+            self._pendingRotate[0] += delta.x()
+            self._pendingRotate[1] += delta.y()
+            self.scheduleUpdate()
         if e.buttons() & qt.MiddleButton:
-            delta = e.pos() - self.lastMousePos
-            self.pan(delta.x(), delta.y())
-            self.updateGL()
+            self._pendingPan[0] += delta.x()
+            self._pendingPan[1] += delta.y()
+            self.scheduleUpdate()
         self.lastMousePos = e.pos()
     def mousePressEvent(self, e):
         super(QGLWidget, self).mousePressEvent(e)
@@ -405,7 +456,7 @@ class GLView(QGLWidget):
             self.sceneWidth = sw
             self.sceneHeight *= 1.2
         self.ortho()
-        self.updateGL()
+        self.scheduleUpdate()
     def keyPressEvent(self, e):
         """Handle key press events
 
@@ -0,0 +1,390 @@
+#!/usr/bin/python -t
+# -*- coding: utf-8 -*-
+
+"""holder.py
+
+Tool holder definitions and tool assemblies.
+
+Holders
+=======
+A holder is defined by a dict of specs, like a tool, and stored in a library
+of the same layout as the tool library ({category: [specs, ...]}, see
+readHolderLib()). Every holder has:
+ * "name" -- string
+ * "metric" -- boolean, True if the dimensions are in millimeters
+ * "gaugeLength" -- nose face to the spindle gauge line
+ * "boreDia" -- the largest shank the holder takes
+ * "flangeDia", "flangeLength" -- the flange that ends at the gauge line
+
+The profile is the right side of the holder's outside, Y0 at the nose face,
+Y+ toward the spindle, ending on the centerline at the gauge line. Only the
+outside is modeled, the bore is filled by the tool. Holders are not graphics
+items, their profiles are built and cached the way tool profiles are (see
+profilecache.py) so everything derived from them is shared too.
+
+Holders Currently Defined
+=========================
+ * ColletHolderDef -- a collet nut then a straight body
+ * ShrinkFitHolderDef -- a slim tapered nose
+ * SideLockHolderDef -- a straight body
+
+Assemblies
+==========
+A ToolAssembly is a tool in a holder at a gauge length, spindle gauge line to
+tool tip. Its profile, in inches, is the tool's profile from the tip up to the
+holder's nose then the holder's profile. The combined profile is cached with
+the tool's and holder's profiles and the gauge length, reach and clearance
+questions are answered from it without meshing.
+
+Sunday, October 18 2026
+"""
+
+import json
+from math import atan2, pi, sqrt, tan, radians
+from copy import copy
+from operator import gt, lt
+
+import numpy as np
+
+from path2d import Path2d, KIND_POINT, KIND_CCLW
+from profilecache import ProfileEntry, profileCache
+from specschema import SpecSchema, Spec, Constraint
+from mesh import RevolvedMesh
+from strutil import toInch
+
+# mesh colors
+CUTTER_COLOR = (0.1, 0.1, 0.7, 1.0)
+SHANK_COLOR = (0.5, 0.5, 0.5, 1.0)
+HOLDER_COLOR = (0.6, 0.45, 0.2, 1.0)
+
+
+class HolderException(Exception):
+    pass
+
+
+class HolderDef(object):
+    """A tool holder.
+
+    specs -- dict, see the module doc string. Raise HolderException if the
+             specs don't pass the class's schema.
+
+    Every subclass has a _body(path2d) that adds the profile from the
+    centerline at the nose face, a line out to the nose corner first, up to
+    the flange's height, gaugeLength - flangeLength.
+    """
+    schema = SpecSchema(
+        [Spec('name', (str, unicode)),
+         Spec('metric', (bool,)),
+         Spec('gaugeLength', tests=[[gt, 0.0]]),
+         Spec('boreDia', tests=[[gt, 0.0]]),
+         Spec('flangeDia', tests=[[gt, 0.0]]),
+         Spec('flangeLength', tests=[[gt, 0.0]])],
+        [Constraint('flangeLength must be < gaugeLength',
+                    ['flangeLength', 'gaugeLength'],
+                    lambda c: c['flangeLength'] < c['gaugeLength'])])
+    def __init__(self, specs):
+        errors = self.schema.validate(specs)
+        if errors:
+            raise HolderException(str(errors[0]))
+        self.specs = copy(specs)
+    def name(self):
+        return self.specs['name']
+    def isMetric(self):
+        return self.specs['metric']
+    @classmethod
+    def profileFamily(cls):
+        return cls.__name__
+    def profileKey(self):
+        """Return the key this holder's profile is cached by, see
+        ToolDef.profileKey().
+        """
+        return (self.profileFamily(),
+                tuple(sorted((k, v) for k, v in self.specs.iteritems()
+                             if k not in ('name', 'metric'))))
+    def profileEntry(self):
+        """Return the shared ProfileEntry of this holder's profile.
+        """
+        return profileCache.get(self.profileKey(), self._buildProfile)
+    def inchProfile(self):
+        """Return the shared InchProfile of this holder.
+        """
+        return self.profileEntry().inchProfile(self.isMetric())
+    def gaugeLength(self):
+        """Return the nose to gauge line length in inches.
+        """
+        return toInch(self.specs['gaugeLength'], self.isMetric())
+    def boreDia(self):
+        """Return the largest shank diameter in inches.
+        """
+        return toInch(self.specs['boreDia'], self.isMetric())
+    def _buildProfile(self):
+        """Create the holder's profile.
+
+        Return a ProfileEntry.
+        """
+        gl = self.specs['gaugeLength']
+        frad = self.specs['flangeDia'] * 0.5
+        fy = gl - self.specs['flangeLength']
+        path2d = Path2d((0.0, 0.0))
+        self._body(path2d)
+        path2d.lineTo(frad, fy)
+        path2d.lineTo(frad, gl)
+        path2d.lineTo(0.0, gl)
+        return ProfileEntry(path2d, path2d.toQPainterPath(mirror=True))
+
+
+class ColletHolderDef(HolderDef):
+    """An ER style collet chuck, the nut then a straight body.
+    """
+    schema = HolderDef.schema.extend(
+        [Spec('nutDia', tests=[[gt, 0.0]]),
+         Spec('nutLength', tests=[[gt, 0.0]]),
+         Spec('bodyDia', tests=[[gt, 0.0]])],
+        [Constraint('boreDia must be < nutDia', ['boreDia', 'nutDia'],
+                    lambda c: c['boreDia'] < c['nutDia']),
+         Constraint('nutLength + flangeLength must be < gaugeLength',
+                    ['nutLength', 'flangeLength', 'gaugeLength'],
+                    lambda c: c['nutLength'] + c['flangeLength']
+                    < c['gaugeLength'])])
+    def _body(self, path2d):
+        nrad = self.specs['nutDia'] * 0.5
+        nlen = self.specs['nutLength']
+        brad = self.specs['bodyDia'] * 0.5
+        fy = self.specs['gaugeLength'] - self.specs['flangeLength']
+        path2d.lineTo(nrad, 0.0)
+        path2d.lineTo(nrad, nlen)
+        if brad != nrad:
+            path2d.lineTo(brad, nlen)
+        path2d.lineTo(brad, fy)
+
+
+class ShrinkFitHolderDef(HolderDef):
+    """A shrink fit holder, a thin walled nose tapering out to the body.
+
+    The nose tapers at noseAngle degrees from the axis until it reaches
+    bodyDia.
+    """
+    schema = HolderDef.schema.extend(
+        [Spec('noseDia', tests=[[gt, 0.0]]),
+         Spec('noseAngle', tests=[[gt, 0.0], [lt, 90.0]]),
+         Spec('bodyDia', tests=[[gt, 0.0]])],
+        [Constraint('boreDia must be < noseDia', ['boreDia', 'noseDia'],
+                    lambda c: c['boreDia'] < c['noseDia']),
+         Constraint('noseDia must be <= bodyDia', ['noseDia', 'bodyDia'],
+                    lambda c: c['noseDia'] <= c['bodyDia']),
+         Constraint('the taper must end below the flange',
+                    ['noseDia', 'noseAngle', 'bodyDia', 'gaugeLength',
+                     'flangeLength'],
+                    lambda c: (c['bodyDia'] - c['noseDia']) * 0.5
+                    / np.tan(np.radians(c['noseAngle']))
+                    < c['gaugeLength'] - c['flangeLength'])])
+    def _body(self, path2d):
+        nrad = self.specs['noseDia'] * 0.5
+        brad = self.specs['bodyDia'] * 0.5
+        fy = self.specs['gaugeLength'] - self.specs['flangeLength']
+        path2d.lineTo(nrad, 0.0)
+        if brad > nrad:
+            path2d.lineTo(brad,
+                          (brad - nrad) / tan(radians(self.specs['noseAngle'])))
+        path2d.lineTo(brad, fy)
+
+
+class SideLockHolderDef(HolderDef):
+    """A side lock (Weldon) holder, a straight body.
+
+    The set screw boss isn't round and isn't modeled.
+    """
+    schema = HolderDef.schema.extend(
+        [Spec('bodyDia', tests=[[gt, 0.0]])],
+        [Constraint('boreDia must be < bodyDia', ['boreDia', 'bodyDia'],
+                    lambda c: c['boreDia'] < c['bodyDia'])])
+    def _body(self, path2d):
+        brad = self.specs['bodyDia'] * 0.5
+        path2d.lineTo(brad, 0.0)
+        path2d.lineTo(brad, self.specs['gaugeLength']
+                      - self.specs['flangeLength'])
+
+
+# holder category to HolderDef class, the holder library's categories
+CAT2HDEF = {'Collet Holder': ColletHolderDef,
+            'Shrink Fit Holder': ShrinkFitHolderDef,
+            'Side Lock Holder': SideLockHolderDef}
+
+def readHolderLib(fileName):
+    """Read a holder library.
+
+    fileName -- JSON file of {category: [specs, ...]}
+
+    Every category's specs are checked in one batch. Unknown categories and
+    invalid holders are left out.
+
+    Return ({category: [HolderDef, ...]}, [[category, name, message], ...]).
+    """
+    f = open(fileName)
+    holderMap = json.load(f)
+    f.close()
+    holders = {}
+    invalid = []
+    for category, specsList in holderMap.iteritems():
+        if category not in CAT2HDEF:
+            invalid.append([category, None, 'unknown holder category'])
+            continue
+        cls = CAT2HDEF[category]
+        errors = {}
+        for e in cls.schema.validateBatch(specsList):
+            errors.setdefault(e.index, e.message)
+        holders[category] = []
+        for i, specs in enumerate(specsList):
+            if i in errors:
+                invalid.append([category, specs.get('name'), errors[i]])
+            else:
+                holders[category].append(cls(specs))
+    return holders, invalid
+
+def _arcAtY(p0, p1, center, kind, y):
+    """Find where an arc element crosses a height.
+
+    p0 -- (x, y) arc start
+    p1, center, kind -- the arc element's end point, center and KIND_*
+    y -- height crossed by the arc
+
+    Return the (x, y) crossing reached first from p0, None if there's none.
+    """
+    cx, cy = center
+    r = sqrt((p1[0] - cx) ** 2 + (p1[1] - cy) ** 2)
+    dy = y - cy
+    if abs(dy) > r:
+        return None
+    dx = sqrt(r * r - dy * dy)
+    sign = 1.0 if kind == KIND_CCLW else -1.0
+    a0 = atan2(p0[1] - cy, p0[0] - cx)
+    sweep = (sign * (atan2(p1[1] - cy, p1[0] - cx) - a0)) % (2.0 * pi)
+    best = None
+    for x in (cx + dx, cx - dx):
+        t = (sign * (atan2(dy, x - cx) - a0)) % (2.0 * pi)
+        if t <= sweep + 1e-12 and (best is None or t < best[0]):
+            best = (t, (x, y))
+    return best[1] if best else None
+
+
+class ToolAssembly(object):
+    """A tool in a holder.
+
+    toolClass -- the ToolDef subclass of the tool
+    toolSpecs -- valid tool specs
+    holder -- HolderDef
+    gaugeLength -- spindle gauge line to tool tip
+    metric -- True if gaugeLength is in millimeters
+
+    Raise HolderException if the tool doesn't reach the holder's nose, is
+    shorter than the stick out or its shank is larger than the holder's
+    bore.
+    """
+    def __init__(self, toolClass, toolSpecs, holder, gaugeLength,
+                 metric=False):
+        self.toolClass = toolClass
+        self.toolSpecs = toolSpecs
+        self.holder = holder
+        self._gaugeLength = toInch(float(gaugeLength), metric)
+        self._stickout = self._gaugeLength - holder.gaugeLength()
+        if self._stickout <= 0.0:
+            raise HolderException('gauge length must be > the holder\'s')
+        # (entry, (cutter, shank, holder) element ranges)
+        self._profile = None
+        # check the fit now, not the first time the profile is asked for
+        self.profileEntry()
+    def gaugeLength(self):
+        """Return the gauge line to tool tip length in inches.
+        """
+        return self._gaugeLength
+    def stickout(self):
+        """Return the holder nose to tool tip length in inches.
+        """
+        return self._stickout
+    def profileKey(self):
+        """Return the key the combined profile is cached by.
+        """
+        metric = self.toolSpecs.get('metric', False)
+        key, entry, cutter, shank = self.toolClass.sharedProfile(
+            self.toolSpecs)
+        return ('ToolAssembly', key, metric, self.holder.profileKey(),
+                self.holder.isMetric(), self._gaugeLength)
+    def profileEntry(self):
+        """Return the shared ProfileEntry of the combined profile, in inches.
+
+        The entry's shankStep is unused. The element ranges of the tool's
+        cutter, the tool's shank below the holder and the holder are
+        derived under 'parts', see parts().
+        """
+        if self._profile is None:
+            self._profile = profileCache.get(self.profileKey(),
+                                             self._buildProfile)
+        return self._profile
+    def parts(self):
+        """Return the (start, stop) element ranges of the cutter, the shank
+        in view and the holder, each starting with the last element of the
+        one before. The shank range is None if the holder covers it.
+        """
+        return self.profileEntry().derived('parts', lambda: None)
+    def _toolInch(self):
+        entry, inch, cutter, shank = self.toolClass.sharedInchProfile(
+            self.toolSpecs)
+        return inch, cutter
+    def _buildProfile(self):
+        """Clip the tool at the holder's nose and join the holder.
+
+        Return a ProfileEntry.
+        """
+        inch, cutter = self._toolInch()
+        points, centers, kinds = inch.arrays()
+        s = self._stickout
+        above = np.flatnonzero(points[:, 1] >= s)
+        if not len(above) or above[0] == 0:
+            raise HolderException('the tool is shorter than the stick out')
+        k = int(above[0])
+        if kinds[k] == KIND_POINT:
+            (x0, y0), (x1, y1) = points[k - 1], points[k]
+            cross = (x0 + (x1 - x0) * (s - y0) / (y1 - y0), s)
+        else:
+            cross = _arcAtY(points[k - 1], points[k], centers[k], kinds[k], s)
+            if cross is None:
+                raise HolderException('the tool profile doesn\'t cross the'
+                                      ' holder nose')
+        if cross[0] * 2.0 > self.holder.boreDia() + 1e-9:
+            raise HolderException('the tool is larger than the holder bore')
+        hinch = self.holder.inchProfile()
+        hpoints, hcenters, hkinds = hinch.arrays()
+        # the holder's elements after its nose corner, moved up to the nose
+        offset = np.array([0.0, s])
+        newPoints = np.concatenate([points[:k], [cross],
+                                    hpoints[1:] + offset])
+        newCenters = np.concatenate([centers[:k], [centers[k]],
+                                     hcenters[1:] + offset])
+        newKinds = np.concatenate([kinds[:k], [kinds[k]], hkinds[1:]])
+        path2d = Path2d.fromArrays(newPoints, newCenters, newKinds)
+        entry = ProfileEntry(path2d, path2d.toQPainterPath(mirror=True))
+        # the cutter ends where the tool's profile says, or at the nose
+        cutStop = slice(*cutter).indices(len(kinds))[1]
+        if cutStop <= k:
+            parts = ((0, cutStop), (cutStop - 1, k + 1), (k, len(newKinds)))
+        else:
+            parts = ((0, k + 1), None, (k, len(newKinds)))
+        entry.derived('parts', lambda: parts)
+        return entry
+    def mesh(self, sweep=360.0):
+        """Return the assembly's RevolvedMesh, built once per profile and
+        sweep.
+        """
+        entry = self.profileEntry()
+        def build():
+            path2d = entry.path2d
+            elements = path2d.elements()
+            joints = path2d.joints()
+            mesh = RevolvedMesh(sweep=sweep)
+            for part, color in zip(self.parts(), (CUTTER_COLOR, SHANK_COLOR,
+                                                  HOLDER_COLOR)):
+                if part is not None:
+                    mesh.addProfile(elements[slice(*part)], color,
+                                    joints=joints[slice(*part)])
+            return mesh
+        return entry.derived(('mesh', sweep), build)
@@ -0,0 +1,169 @@
+#!/usr/bin/python -t
+# -*- coding: utf-8 -*-
+
+"""journal.py
+
+An undo/redo journal for tool spec edits.
+
+Each journal entry is a diff of the specs that changed, not a snapshot of the
+whole tool:
+
+  {key: [oldValue, newValue], ...}
+
+Stepping back or forward through several entries merges their diffs into a
+single specs dict so ToolDef.config() only has to be called once.
+
+Sunday, October 18 2026
+"""
+
+import json
+from collections import deque
+
+
+class SpecJournalException(Exception):
+    pass
+
+
+class SpecJournal(object):
+    """A bounded list of spec diffs for a single tool.
+
+    maxEntries -- the oldest diffs are dropped once the undo list is this long
+    fileName -- if not None, the journal is written to this JSON file every
+                time it changes
+    """
+    def __init__(self, maxEntries=200, fileName=None):
+        if maxEntries < 1:
+            raise SpecJournalException('maxEntries must be > 0')
+        self._undo = deque(maxlen=maxEntries)
+        self._redo = deque(maxlen=maxEntries)
+        self._fileName = fileName
+    def __len__(self):
+        return len(self._undo)
+    @staticmethod
+    def diff(oldSpecs, newSpecs):
+        """Find the specs that differ.
+
+        oldSpecs -- the current specs dict
+        newSpecs -- a possibly partial specs dict
+
+        Return {key: [old, new]} for every key in newSpecs whose value is not
+        the same as in oldSpecs.
+        """
+        d = {}
+        for k, v in newSpecs.iteritems():
+            old = oldSpecs.get(k)
+            if old != v:
+                d[k] = [old, v]
+        return d
+    def record(self, oldSpecs, newSpecs):
+        """Record an edit.
+
+        oldSpecs -- the specs before the edit
+        newSpecs -- the specs being applied
+
+        The redo list is cleared if something changed.
+
+        Return True if a diff was recorded, False if nothing changed.
+        """
+        d = self.diff(oldSpecs, newSpecs)
+        if not d:
+            return False
+        self._undo.append(d)
+        self._redo.clear()
+        self._autoSave()
+        return True
+    def matches(self, specs):
+        """Find if the journal ends at specs.
+
+        Return True if the newest undone diff leads to specs and the next
+        redo starts from them, False if the tool was changed some other way
+        since the journal was written.
+        """
+        if self._undo and any(specs.get(k) != v[1]
+                              for k, v in self._undo[-1].iteritems()):
+            return False
+        if self._redo and any(specs.get(k) != v[0]
+                              for k, v in self._redo[-1].iteritems()):
+            return False
+        return True
+    def canUndo(self):
+        return bool(self._undo)
+    def canRedo(self):
+        return bool(self._redo)
+    def _step(self, src, dst, count, idx):
+        """Move up to count diffs from src to dst and merge them.
+
+        idx -- 0 to merge the old values (undo), 1 for the new values (redo)
+
+        Return the merged specs dict, empty if src is empty.
+        """
+        specs = {}
+        for i in range(min(count, len(src))):
+            d = src.pop()
+            dst.append(d)
+            for k, v in d.iteritems():
+                # undo: the oldest value wins, redo: the newest value wins
+                specs[k] = v[idx]
+        if specs:
+            self._autoSave()
+        return specs
+    def undo(self, count=1):
+        """Step back count edits.
+
+        Return the specs dict needed to restore the tool.
+        """
+        return self._step(self._undo, self._redo, count, 0)
+    def redo(self, count=1):
+        """Step forward count edits.
+
+        Return the specs dict needed to reapply the edits.
+        """
+        return self._step(self._redo, self._undo, count, 1)
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self._autoSave()
+    def _autoSave(self):
+        if self._fileName:
+            self.save(self._fileName)
+    def save(self, fileName):
+        """Write the journal to a JSON file.
+        """
+        f = open(fileName, 'w')
+        json.dump({'maxEntries': self._undo.maxlen,
+                   'undo': list(self._undo),
+                   'redo': list(self._redo)}, f, indent=1)
+        f.close()
+    @staticmethod
+    def load(fileName, autoSave=True, maxEntries=None):
+        """Read a journal written by save().
+
+        fileName -- JSON file name
+        autoSave -- if True, keep writing changes to the same file
+        maxEntries -- entries kept, the oldest are dropped, None for the size
+                      saved in the file
+
+        Raise SpecJournalException if the file isn't a journal.
+
+        Return a new SpecJournal.
+        """
+        f = open(fileName, 'r')
+        m = json.load(f)
+        f.close()
+        if not isinstance(m, dict):
+            raise SpecJournalException('not a journal file')
+        stacks = (m.get('undo', []), m.get('redo', []))
+        for stack in stacks:
+            if not isinstance(stack, list) or not all(
+                    isinstance(d, dict) and all(
+                        isinstance(v, list) and len(v) == 2
+                        for v in d.itervalues()) for d in stack):
+                raise SpecJournalException('malformed journal file')
+        if maxEntries is None:
+            maxEntries = m.get('maxEntries', 200)
+        if not isinstance(maxEntries, int):
+            raise SpecJournalException('malformed journal file')
+        journal = SpecJournal(maxEntries, fileName if autoSave else None)
+        journal._undo.extend(stacks[0])
+        journal._redo.extend(stacks[1])
+        return journal
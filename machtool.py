@@ -7,16 +7,20 @@ Tuesday, September 10 2013
 """
 
 import sys
+from math import pi
 from PyQt4.QtGui import *
 from PyQt4.QtCore import *
 from PyQt4.QtCore import Qt as qt
-from tooldefwidget import ToolDefWidget
+from tooldefwidget import ToolDefWidget, CAT2TDEF
 from meshview import MeshView
+from assembly import Assembly, libraryToolMesh, ringLayout
 
 # DEBUG:
 from mesh import RevolvedMesh
 from path2d import Path2d
 
+# most tools shown by showMagazine()
+MAGAZINE_SIZE = 60
 
 class MainWindow(QMainWindow):
     def __init__(self, parent=None):
@@ -35,32 +39,73 @@ class MainWindow(QMainWindow):
                      self.toolModified)
         self.connect(self.tdefWidget, SIGNAL('toolLoaded()'),
                      self.toolLoaded)
+        # degrees revolved, less than 360.0 shows a cut-away section
+        self.sweep = 360.0
+    def toolMesh(self, tdef):
+        """Return the mesh of a tool.
+
+        The mesh is cached with the tool's shared profile, reloading a tool or
+        undoing back to a previous shape reuses the mesh built the first
+        time.
+        """
+        return libraryToolMesh(type(tdef), tdef.specs, self.sweep)
     def toolModified(self):
         """The user changed a dimension on the current tool.
         """
-        tdef = self.tdefWidget.toolDef
-        sprof = tdef.shankProfile()
-        cprof = tdef.cutterProfile()
-        mesh = RevolvedMesh(cprof)
-        mesh.addProfile(sprof, (0.5, 0.5, 0.5, 1.0))
-        self.meshview.setMesh(mesh)
+        self.meshview.setMesh(self.toolMesh(self.tdefWidget.toolDef))
         self.meshview.fitMesh()
     def toolLoaded(self):
         """The user loaded a tool.
         """
-        tdef = self.tdefWidget.toolDef
-        sprof = tdef.shankProfile()
-        cprof = tdef.cutterProfile()
-        mesh = RevolvedMesh(cprof)
-        mesh.addProfile(sprof, (0.5, 0.5, 0.5, 1.0))
-        self.meshview.setMesh(mesh)
+        self.meshview.setMesh(self.toolMesh(self.tdefWidget.toolDef))
         self.meshview.fitMesh()
     def closeEvent(self, e):
         toolBrowser = self.tdefWidget.toolBrowser
         if toolBrowser.isDirty():
             toolBrowser.saveToolMap()
         e.accept()
+    def toggleSection(self):
+        """Switch between the whole tool and a three quarter cut-away.
+        """
+        self.sweep = 270.0 if self.sweep == 360.0 else 360.0
+        self.meshview.setMesh(self.toolMesh(self.tdefWidget.toolDef))
+        self.meshview.updateGL()
+    def showMagazine(self):
+        """Show the tools of the current library category around a ring.
+
+        Tools with the same geometry share one mesh.
+        """
+        item = self.tdefWidget.toolBrowser.currentItem()
+        if item is None:
+            return
+        catItem = item.parent() or item
+        toolClass = CAT2TDEF[unicode(catItem.text(0))]
+        tools = []
+        for i in range(catItem.childCount()):
+            child = catItem.child(i)
+            if child.specs is not None and child.valid:
+                tools.append((libraryToolMesh(toolClass, child.specs,
+                                              self.sweep),
+                              child.specs['name']))
+            if len(tools) == MAGAZINE_SIZE:
+                break
+        if not tools:
+            return
+        # room for the widest tool in each pocket
+        pitch = max(mesh.bbox().width() for mesh, name in tools) * 1.5
+        radius = max(pitch * len(tools) / (2.0 * pi), pitch)
+        assembly = Assembly()
+        for (mesh, name), m in zip(tools, ringLayout(len(tools), radius)):
+            assembly.addInstance(mesh, m, name)
+        self.meshview.setMesh(assembly)
+        self.meshview.fitMesh()
     def keyPressEvent(self, e):
+        if e.key() == qt.Key_X:
+            self.toggleSection()
+            return
+        if e.key() == qt.Key_M:
+            self.showMagazine()
+            return
         # DEBUG:
         from math import sin, cos, radians
         if e.key() == qt.Key_Space:
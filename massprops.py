@@ -0,0 +1,294 @@
+#!/usr/bin/python -t
+# -*- coding: utf-8 -*-
+
+"""massprops.py
+
+Volume, surface area, centroid and inertia of tools, from their profiles.
+
+A tool is its profile revolved about the Y axis, so by Pappus every property
+is an integral over the profile's region in the X/Y plane. Green's theorem
+turns those into integrals along the profile, one line or arc at a time:
+
+    volume            V        = pi   * integral of x^2 dy
+    first moment      int y dV = pi   * integral of x^2 y dy
+    second moment     int y^2  = pi   * integral of x^2 y^2 dy
+    axial moment      int r^2  = pi/2 * integral of x^4 dy
+    surface area      A        = 2 pi * integral of x ds
+
+The integrands are polynomials of degree 5 or less along a line, which 3
+point Gauss-Legendre integrates exactly, and trigonometric polynomials of
+degree 5 or less in the angle of an arc, which are integrated exactly from
+their Fourier coefficients. Every line and arc of every tool is done in one
+pass of array arithmetic, then summed per tool and region.
+
+The regions are the cutter and the shank, see ToolDef._cutterRange() and
+_shankRange(), each closed by the plane where they meet, and the whole tool.
+The area of a region is the area of its profile's surface, without that
+plane.
+
+Lengths are inches, densities pounds per cubic inch, masses pounds and mass
+moments of inertia pound inches squared.
+
+Run this module to check every tool in tools.json against numerical
+integration over its mesh.
+
+Sunday, October 18 2026
+"""
+
+from math import pi
+
+import numpy as np
+
+from path2d import KIND_POINT, KIND_CCLW
+
+# region columns of MassProps arrays
+REGION_CUTTER = 0
+REGION_SHANK = 1
+REGION_WHOLE = 2
+# pounds per cubic inch
+DENSITY = {'carbide': 0.539, 'hss': 0.295, 'steel': 0.283,
+           'aluminum': 0.098}
+
+# 3 point Gauss-Legendre on [0, 1]
+_GAUSS_T = 0.5 + 0.5 * np.array([-np.sqrt(0.6), 0.0, np.sqrt(0.6)])
+_GAUSS_W = np.array([5.0, 8.0, 5.0]) / 18.0
+# samples of an arc's integrands around the circle, more than twice their
+# degree so their Fourier coefficients are exact
+_ARC_SAMPLES = 16
+
+
+class MassPropsException(Exception):
+    pass
+
+
+def _integrands(x, y):
+    """Return the Green's theorem integrands of the volume moments, an array
+    shaped (4,) + x.shape, each to be integrated over dy.
+    """
+    x2 = x * x
+    return np.array([pi * x2, pi * x2 * y, pi * x2 * y * y,
+                     pi * 0.5 * x2 * x2])
+
+def segmentMoments(start, end, centers, kinds):
+    """Integrate profile segments.
+
+    start, end -- (n, 2) arrays of the segments' end points
+    centers -- (n, 2) array, arc centers
+    kinds -- (n,) KIND_* of each segment
+
+    Return an (n, 5) array, each segment's share of the volume, the first
+    and second moments of the volume about the X/Z plane, the second moment
+    about the Y axis and the surface area.
+    """
+    n = len(kinds)
+    moments = np.zeros((n, 5))
+    line = np.asarray(kinds) == KIND_POINT
+    if line.any():
+        (x0, y0), (x1, y1) = start[line].T, end[line].T
+        t = _GAUSS_T[:, np.newaxis]
+        f = _integrands(x0 + (x1 - x0) * t, y0 + (y1 - y0) * t)
+        moments[line, :4] = (f * _GAUSS_W[:, np.newaxis]).sum(1).T \
+            * (y1 - y0)[:, np.newaxis]
+        moments[line, 4] = pi * np.hypot(x1 - x0, y1 - y0) * (x0 + x1)
+    arc = ~line
+    if arc.any():
+        (cx, cy), (x0, y0), (x1, y1) = centers[arc].T, start[arc].T, \
+            end[arc].T
+        r = np.hypot(x1 - cx, y1 - cy)
+        a0 = np.arctan2(y0 - cy, x0 - cx)
+        a1 = np.arctan2(y1 - cy, x1 - cx)
+        sweep = np.where(np.asarray(kinds)[arc] == KIND_CCLW,
+                         (a1 - a0) % (2.0 * pi), -((a0 - a1) % (2.0 * pi)))
+        a1 = a0 + sweep
+        # the integrands times dy/da around the whole circle
+        phi = np.arange(_ARC_SAMPLES) * (2.0 * pi / _ARC_SAMPLES)
+        c, s = np.cos(phi), np.sin(phi)
+        f = _integrands(cx[:, np.newaxis] + r[:, np.newaxis] * c,
+                        cy[:, np.newaxis] + r[:, np.newaxis] * s) \
+            * (r[:, np.newaxis] * c)
+        coef = np.fft.rfft(f, axis=-1) / _ARC_SAMPLES
+        k = np.arange(1, coef.shape[-1] - 1)
+        # f = a0 + sum of 2 (re cos(k a) - im sin(k a)), integrated a0 to a1
+        ka0, ka1 = k * a0[:, np.newaxis], k * a1[:, np.newaxis]
+        moments[arc, :4] = (coef[..., 0].real * sweep
+                            + (2.0 * (coef[..., 1:-1].real
+                                      * (np.sin(ka1) - np.sin(ka0))
+                                      + coef[..., 1:-1].imag
+                                      * (np.cos(ka1) - np.cos(ka0)))
+                               / k).sum(-1)).T
+        moments[arc, 4] = 2.0 * pi * r * np.sign(sweep) \
+            * (cx * sweep + r * (np.sin(a1) - np.sin(a0)))
+    return moments
+
+
+class MassProps(object):
+    """Mass properties of tools, each tool's cutter, shank and whole.
+
+    moments -- (n, 3, 5) array, see segmentMoments(), summed per tool and
+               region
+    density -- pounds per cubic inch, a float or an (n,) array
+
+    Each property is an (n, 3) array, one column per REGION_*. Centroids are
+    heights above the tip on the tool's axis, transverse inertia is about an
+    axis across the tool through the region's centroid.
+    """
+    def __init__(self, moments, density):
+        self.moments = moments
+        density = np.asarray(density, dtype=np.float64)
+        self.density = density[:, np.newaxis] if density.ndim else density
+    def __len__(self):
+        return len(self.moments)
+    @property
+    def volume(self):
+        return self.moments[..., 0]
+    @property
+    def area(self):
+        return self.moments[..., 4]
+    @property
+    def mass(self):
+        return self.volume * self.density
+    @property
+    def centroid(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.moments[..., 1] / self.volume
+    @property
+    def axialInertia(self):
+        return self.moments[..., 3] * self.density
+    @property
+    def transverseInertia(self):
+        m = self.moments
+        with np.errstate(divide='ignore', invalid='ignore'):
+            about = m[..., 2] - m[..., 1] ** 2 / m[..., 0]
+        return (m[..., 3] * 0.5 + about) * self.density
+    def toDict(self, i):
+        """Return tool i's properties as a JSON-able dict of regions.
+        """
+        props = ('volume', 'area', 'mass', 'centroid', 'axialInertia',
+                 'transverseInertia')
+        values = dict((p, getattr(self, p)[i].tolist()) for p in props)
+        return dict((region, dict((p, values[p][col]) for p in props))
+                    for region, col in (('cutter', REGION_CUTTER),
+                                        ('shank', REGION_SHANK),
+                                        ('whole', REGION_WHOLE)))
+
+
+def _toolSegments(toolClass, specs):
+    """Return a tool's inch profile arrays as segments.
+
+    Return (start, end, centers, kinds, regions), regions the REGION_* of
+    each segment.
+    """
+    entry, inch, cutter, shank = toolClass.sharedInchProfile(specs)
+    points, centers, kinds = inch.arrays()
+    n = len(kinds)
+    regions = np.empty(n, dtype=np.intp)
+    regions.fill(-1)
+    for region, (start, stop) in ((REGION_CUTTER, cutter),
+                                  (REGION_SHANK, shank)):
+        start, stop, _ = slice(start, stop).indices(n)
+        # element i is the segment from point i - 1
+        regions[start + 1:stop] = region
+    if (regions[1:] < 0).any():
+        raise MassPropsException('{} profile has segments outside the cutter '
+                                 'and shank'.format(specs.get('name')))
+    return points[:-1], points[1:], centers[1:], kinds[1:], regions[1:]
+
+def libraryMassProps(tools, density=DENSITY['carbide']):
+    """Find the mass properties of many tools at once.
+
+    tools -- [(toolClass, specs), ...], ToolDef subclasses and valid specs
+    density -- pounds per cubic inch, a float or one per tool
+
+    Return a MassProps, in the order of tools.
+    """
+    parts = [_toolSegments(toolClass, specs) for toolClass, specs in tools]
+    if not parts:
+        return MassProps(np.zeros((0, 3, 5)), density)
+    start, end, centers, kinds, regions = [np.concatenate(a)
+                                           for a in zip(*parts)]
+    tool = np.repeat(np.arange(len(parts)), [len(p[3]) for p in parts])
+    moments = segmentMoments(start, end, centers, kinds)
+    sums = np.zeros((len(parts), 3, 5))
+    np.add.at(sums, (tool, regions), moments)
+    sums[:, REGION_WHOLE] = sums[:, REGION_CUTTER] + sums[:, REGION_SHANK]
+    return MassProps(sums, density)
+
+def toolMassProps(toolClass, specs, density=DENSITY['carbide']):
+    """Return the MassProps of one tool.
+    """
+    return libraryMassProps([(toolClass, specs)], density)
+
+
+def _meshMoments(mesh, y):
+    """Integrate a RevolvedMesh numerically, by tetrahedra from the axis.
+
+    y -- height of the axis point the tetrahedra share, on the plane of the
+         mesh's opening if it has one, so the missing face adds nothing
+
+    Return the 5 values of segmentMoments() for the whole mesh.
+    """
+    # the triangles as added, building the mesh only welds and shades them
+    tris = np.concatenate([c for p in mesh._patches for c in p._triChunks])
+    area = 0.5 * np.sqrt((np.cross(tris[:, 1] - tris[:, 0],
+                                   tris[:, 2] - tris[:, 0]) ** 2)
+                         .sum(-1)).sum()
+    tris[..., 1] -= y
+    v = np.einsum('ij,ij->i', tris[:, 0],
+                  np.cross(tris[:, 1], tris[:, 2])) / 6.0
+    # faces may wind either way, the whole mesh has positive volume
+    v *= np.sign(v.sum())
+    s = tris.sum(1)
+    # second moments of each tetrahedron, V / 20 (sum of v v' + s s')
+    second = (v / 20.0)[:, np.newaxis] * ((tris ** 2).sum(1) + s ** 2)
+    m1 = (v * s[:, 1] / 4.0).sum()
+    m2 = second[:, 1].sum()
+    volume = v.sum()
+    return np.array([volume, m1 + y * volume,
+                     m2 + 2.0 * y * m1 + y * y * volume,
+                     second[:, 0].sum() + second[:, 2].sum(), area])
+
+
+if __name__ == '__main__':
+    import sys
+    import json
+
+    from PyQt4.QtGui import QApplication
+
+    from mesh import RevolvedMesh
+    from tooldefwidget import CAT2TDEF
+
+    app = QApplication(sys.argv)
+    lib = json.load(open('tools.json'))
+    tools = [(CAT2TDEF[cat], specs) for cat in sorted(lib)
+             for specs in lib[cat]]
+    props = libraryMassProps(tools)
+    names = ('volume', 'first', 'second', 'axial', 'area')
+    failed = 0
+    for i, (toolClass, specs) in enumerate(tools):
+        entry, inch, cutter, shank = toolClass.sharedInchProfile(specs)
+        # the cutter and shank meet at the shank's first point
+        split = inch.points[slice(*shank).indices(len(inch))[0]][1]
+        meshed = []
+        for part in (cutter, shank):
+            mesh = RevolvedMesh(segs=360)
+            mesh.addProfile(inch.part(*part), joints=inch.joints(*part))
+            meshed.append(_meshMoments(mesh, split))
+        meshed.append(meshed[0] + meshed[1])
+        one = toolMassProps(toolClass, specs).moments[0]
+        for region in (REGION_CUTTER, REGION_SHANK, REGION_WHOLE):
+            exact = props.moments[i, region]
+            err = np.abs(meshed[region] - exact) \
+                / np.maximum(np.abs(exact), 1e-12)
+            bad = (err > 1e-3) | (np.abs(one[region] - exact)
+                                  > 1e-12 * np.abs(exact) + 1e-15)
+            if bad.any():
+                failed += 1
+                print 'FAIL {} {} region {}: {}'.format(
+                    specs['name'], names, region,
+                    ', '.join('{:.3g}'.format(e) for e in err))
+        whole = props.toDict(i)['whole']
+        print '{:<32} {:8.4f} in3 {:8.4f} lb {:8.4f} lb in2'.format(
+            specs['name'], whole['volume'], whole['mass'],
+            whole['axialInertia'])
+    print '{} tools, {} failures'.format(len(tools), failed)
+    sys.exit(1 if failed else 0)
@@ -3,9 +3,19 @@
 
 """matvec.py
 
+4x4 matrices for the views, kept on the CPU.
+
+Matrices are numpy arrays laid out the way glGetFloat() returns them and
+glLoadMatrixd() takes them, the transpose of the textbook column vector form.
+Points are row vectors, p' = p . m, and the translation is m[3, :3]. A GL call
+sequence A then B (each post-multiplying the current matrix) is the product
+B . A here.
+
 Tuesday, September 24 2013
 """
 
+from math import radians, sin, cos, sqrt
+
 import numpy as np
 
 def mxv(m, v):
@@ -16,14 +26,60 @@ def mxv(m, v):
 
     Return the transformed [x, y, z].
     """
-    print 'v', type(v)
-    vv = v + [1.0]
-    print 'vv', vv
-    out = np.zeros(4)
-    for r in (0, 1, 2, 3):
-        result = 0.0
-        for c in (0, 1, 2, 3):
-            result += vv[c] * m[c, r]
-        out[r] = result
-    return out[:3]
-    
+    return np.dot(np.append(np.asarray(v, dtype=np.float64), 1.0), m)[:3]
+
+def mxvs(m, vs):
+    """Multiply matrix and each of an (n, 3) array of vectors.
+
+    Return the transformed (n, 3) array.
+    """
+    vs = np.asarray(vs, dtype=np.float64)
+    return np.column_stack([vs, np.ones(len(vs))]).dot(m)[:, :3]
+
+def identity():
+    return np.identity(4)
+
+def translation(x, y, z):
+    """Return the matrix glTranslate(x, y, z) multiplies by.
+    """
+    m = np.identity(4)
+    m[3, :3] = (x, y, z)
+    return m
+
+def rotation(angle, x, y, z):
+    """Return the matrix glRotate(angle, x, y, z) multiplies by.
+
+    angle -- degrees
+    x, y, z -- axis, doesn't have to be normalized
+    """
+    l = sqrt(x * x + y * y + z * z)
+    x /= l
+    y /= l
+    z /= l
+    a = radians(angle)
+    c = cos(a)
+    s = sin(a)
+    t = 1.0 - c
+    return np.array([[x * x * t + c, y * x * t + z * s, x * z * t - y * s, 0.0],
+                     [x * y * t - z * s, y * y * t + c, y * z * t + x * s, 0.0],
+                     [x * z * t + y * s, y * z * t - x * s, z * z * t + c, 0.0],
+                     [0.0, 0.0, 0.0, 1.0]])
+
+def ortho(left, right, bottom, top, near, far):
+    """Return the matrix glOrtho() multiplies by.
+    """
+    m = np.identity(4)
+    m[0, 0] = 2.0 / (right - left)
+    m[1, 1] = 2.0 / (top - bottom)
+    m[2, 2] = -2.0 / (far - near)
+    m[3, :3] = (-(right + left) / float(right - left),
+                -(top + bottom) / float(top - bottom),
+                -(far + near) / float(far - near))
+    return m
+
+def rotationOnly(m):
+    """Return a copy of m without its translation.
+    """
+    r = np.array(m, dtype=np.float64)
+    r[3] = (0.0, 0.0, 0.0, 1.0)
+    return r
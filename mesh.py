@@ -9,19 +9,24 @@ Sunday, September 15 2013
 # NumPy
 # * linspace -- evenly spaced numbers over interval
 
-from math import pi, radians, degrees, sin, cos, sqrt
+from math import pi, radians, degrees, sin, cos, sqrt, ceil
+import time
 
 # from PyQt4.QtOpenGL import *
-from PyQt4.QtGui import QVector2D, QVector3D
-from PyQt4.QtCore import QPointF
 import OpenGL.GL as gl
 import numpy as np
 
 from arc import Arc
 from bbox import BBox
+from path2d import elementsToArrays, classifyJoints, JOINT_TANGENT
 
 pi2 = pi*2
 
+
+class MeshException(Exception):
+    pass
+
+
 def windowItr(seq, sz, step):
     n = ((len(seq) - sz) / step) + 1
     for i in range(0, n * step, step):
@@ -31,9 +36,11 @@ def windowItr(seq, sz, step):
 class Patch(object):
     """A section of a Mesh.
 
-    Smooth normals are computed per patch. This results in sharp edges between
-    non-tangent patches. Each patch contains a list of indices into into its
-    parent mesh's vertices.
+    A patch is one smooth surface, normals are blended across the edges it
+    shares with itself and not across its edges with other patches. This
+    results in sharp edges between non-tangent patches. After the mesh is
+    built each patch holds an array of indices into its parent mesh's
+    vertices.
     """
     def __init__(self, mesh):
         """Initialize a Patch
@@ -41,12 +48,13 @@ class Patch(object):
         mesh -- Mesh, parent
         """
         self._mesh = mesh
-        # number of triangles in this patch
+        # (n, 3, 3) triangle vertices and (n, 3) apex flags, as added
+        self._triChunks = []
+        self._apexChunks = []
+        # number of triangles in this patch, set by Mesh.build()
         self._nTris = 0
-        # offset into mesh._indices where this patch starts
-        self._startIndex = mesh.vertexCount()
-        # indices into the parent mesh's vertex list
-        self._indices = []
+        # indices into the parent mesh's vertex array, set by Mesh.build()
+        self._indices = np.zeros(0, dtype=np.uint32)
         # r, g, b, a
         self._color = [0.1, 0.1, 0.7, 1.0]
         # 'wire', 'flat', or 'smooth'
@@ -64,16 +72,27 @@ class Patch(object):
             self._showNormals = state
     def setColor(self, color):
         self._color = color
+        self._mesh._batch = None
     def setWireFrame(self):
         self._surfaceMode = 'wire'
     def setSmoothShaded(self):
         self._surfaceMode = 'smooth'
     def setFlatShaded(self):
         self._surfaceMode = 'flat'
-    def startIndex(self):
-        """Return this patch's offset into its parent mesh's vertices.
+    def addTris(self, tris, apex=None):
+        """Add triangles.
+
+        tris -- (n, 3, 3) array, the vertices of each triangle in CCLW
+                winding order
+        apex -- (n, 3) bool array or None. True marks the apex of a cone
+                tip, its normal is the triangle's normal and is not blended.
         """
-        return self._startIndex
+        tris = np.asarray(tris, dtype=np.float64).reshape(-1, 3, 3)
+        if apex is None:
+            apex = np.zeros(tris.shape[:2], dtype=bool)
+        self._triChunks.append(tris)
+        self._apexChunks.append(np.asarray(apex, dtype=bool))
+        self._mesh._dirty = True
     def addTri(self, a, b, c, apexVertex=None):
         """Add a triangle.
 
@@ -85,18 +104,8 @@ class Patch(object):
 
         Return None.
         """
-        # triangle normal
-        n = QVector3D.normal(QVector3D(*a),
-                             QVector3D(*b),
-                             QVector3D(*c))
-        n = [n.x(), n.y(), n.z()]
-        self._indices.append(self._mesh.addVertex(a, n, self._startIndex,
-                                                  apexVertex == a))
-        self._indices.append(self._mesh.addVertex(b, n, self._startIndex,
-                                                  apexVertex == b))
-        self._indices.append(self._mesh.addVertex(c, n, self._startIndex,
-                                                  apexVertex == c))
-        self._nTris += 1
+        self.addTris([[a, b, c]], [[apexVertex == a, apexVertex == b,
+                                    apexVertex == c]])
     def addQuad(self, a, b, c, d):
         """Add a quad.
 
@@ -110,8 +119,7 @@ class Patch(object):
           | / |
         a o---o b
         """
-        self.addTri(a, b, c)
-        self.addTri(d, a, c)
+        self.addTris([[a, b, c], [d, a, c]])
     def addRevLineSeg(self, x1, y1, x2, y2):
         """Add a 360 degree revolved line to this Patch.
 
@@ -122,32 +130,45 @@ class Patch(object):
         revolution is parallel to the vector (0, 1, 0), and passes through the
         point (0, 0, 0).
         """
+        cos, sin = self._mesh.sinCos()
+        n = len(cos) - 1
         # tip triangles
         if np.allclose(x1, 0.0):
-            a = [x1, y1, 0.0]
-            for (sa1, ca1), (sa2, ca2) in self._mesh.sincos:
-                r = x2
-                b = [r * sa2, y2, r * ca2]
-                c = [r * sa1, y2, r * ca1]
-                self.addTri(a, b, c, None if np.allclose(y1, y2) else a)
+            a = np.tile([x1, y1, 0.0], (n, 1))
+            ring = self._ring(x2, y2, cos, sin)
+            apex = None
+            if not np.allclose(y1, y2):
+                apex = np.zeros((n, 3), dtype=bool)
+                apex[:, 0] = True
+            self.addTris(np.stack([a, ring[1:], ring[:-1]], axis=1), apex)
         # shank end triangle fan, p1 = top center
         elif np.allclose(x2, 0.0):
-            a = [x2, y2, 0.0]
-            for (sa1, ca1), (sa2, ca2) in self._mesh.sincos:
-                b = [x1 * sa1, y1, x1 * ca1]
-                c = [x1 * sa2, y1, x1 * ca2]
-                self.addTri(a, b, c, None if np.allclose(y1, y2) else a)
-        # triangle strip
+            a = np.tile([x2, y2, 0.0], (n, 1))
+            ring = self._ring(x1, y1, cos, sin)
+            apex = None
+            if not np.allclose(y1, y2):
+                apex = np.zeros((n, 3), dtype=bool)
+                apex[:, 0] = True
+            self.addTris(np.stack([a, ring[:-1], ring[1:]], axis=1), apex)
+        # triangle strip, two triangles per quad
         # d o--o c
         #   | /|
         #   |/ |
         # a o--o b
         else:
-            for (sa1, ca1), (sa2, ca2) in self._mesh.sincos:
-                self.addQuad([x1 * sa1, y1, x1 * ca1], # a
-                             [x1 * sa2, y1, x1 * ca2], # b
-                             [x2 * sa2, y2, x2 * ca2], # c
-                             [x2 * sa1, y2, x2 * ca1]) # d
+            ring1 = self._ring(x1, y1, cos, sin)
+            ring2 = self._ring(x2, y2, cos, sin)
+            a = ring1[:-1]
+            b = ring1[1:]
+            c = ring2[1:]
+            d = ring2[:-1]
+            self.addTris(np.concatenate([np.stack([a, b, c], axis=1),
+                                         np.stack([d, a, c], axis=1)]))
+    @staticmethod
+    def _ring(x, y, cos, sin):
+        """Return the vertices of point (x, y) revolved to each angle.
+        """
+        return np.column_stack([x * sin, np.full_like(sin, y), x * cos])
     def addRevArcSeg(self, x1, y1, x2, y2, cx, cy, arcDir):  
         """Add a 360 degree revolved arc to this Patch.      
                                                              
@@ -160,47 +181,27 @@ class Patch(object):
         revolution is parallel to the vector (0, 0, 1), and passes through the
         point (0, 0, 0).
         """
-        a = x1 - cx
-        b = y1 - cy
-        r = sqrt(a*a + b*b)
-        arc = Arc.fromVectors(QVector2D(a, b),
-                              QVector2D(x2 - cx, y2 - cy),
-                              r,
-                              arcDir == 'cclw')
-        # TODO: By halving the mesh segs ( * 0.5), fewer triangles are
-        #       created. Shading is ok but arc edges look blocky.
-        # angstep = 360.0 / (self._mesh.segs * 0.5)
-        angstep = 360.0 / self._mesh.segs
-        # minimum 2 segments in the arc
-        segs = max(int(abs(arc.span()) / angstep), 3)
-        step = arc.span() / segs
-        sa = arc.startAngle()
-        a1 = radians(sa)
-        sa1 = sin(a1)
-        ca1 = cos(a1)
-        for i in range(1, segs):
-            a2 = radians(sa + step * i)
-            sa2 = sin(a2)
-            ca2 = cos(a2)
-            x1 = cx + r * ca1
-            y1 = cy + r * sa1
-            x2 = cx + r * ca2
-            y2 = cy + r * sa2
-            self.addRevLineSeg(x1, y1, x2, y2)
-            a1 = a2
-            sa1 = sa2
-            ca1 = ca2
-            if i == 1:
-                # only blend the first strip
-                self._mesh.blendTangent(False)
-        # last strip
-        else:
-            a2 = radians(arc.endAngle())
-            x1 = cx + r * ca1
-            y1 = cy + r * sa1
-            x2 = cx + r * cos(a2)
-            y2 = cy + r * sin(a2)
+        pts = arcPoints(x1, y1, x2, y2, cx, cy, arcDir, self._mesh.segs)
+        for (x1, y1), (x2, y2) in zip(pts[:-1], pts[1:]):
             self.addRevLineSeg(x1, y1, x2, y2)
+    def addPlanarFace(self, points, angle):
+        """Add a profile region rotated about the axis to this Patch.
+
+        points -- [(x, y), ...], a simple closed polygon in the profile
+                  plane, the last point is not a repeat of the first
+        angle -- degrees about the axis, see sinCosTable()
+
+        The face is wound to face away from the angles greater than angle,
+        reverse points to face the other way.
+        """
+        tris = triangulate(points)
+        if not tris:
+            return
+        a = radians(angle)
+        pts = np.asarray(points, dtype=np.float64)
+        verts = np.column_stack([pts[:, 0] * sin(a), pts[:, 1],
+                                 pts[:, 0] * cos(a)])
+        self.addTris(verts[np.array(tris)])
     # DEBUG:
     def renderNormals(self):
         gl.glDisable(gl.GL_LIGHTING)
@@ -209,12 +210,11 @@ class Patch(object):
         gl.glColor(0, 1, 0, 1)
         gl.glBegin(gl.GL_LINES)
         factor = max(*self._mesh._bbox.size()) * 0.01
-        for i in self._indices:
-            v = self._mesh._vertices[i]
-            n = self._mesh._normals[i]
-            ep = QVector3D(*v) + QVector3D(*n) * factor
+        vs = self._mesh._vertices[self._indices]
+        eps = vs + self._mesh._normals[self._indices] * factor
+        for v, ep in zip(vs.tolist(), eps.tolist()):
             gl.glVertex3f(*v)
-            gl.glVertex3f(ep.x(), ep.y(), ep.z())
+            gl.glVertex3f(*ep)
         gl.glEnd()
         gl.glEnable(gl.GL_LINE_SMOOTH)
     def render(self):
@@ -279,22 +279,30 @@ class Patch(object):
 
 class Mesh(object):
     """A Collection of Patch instances.
+
+    Patches collect triangles as they're added. build() welds the vertices
+    and computes the normals of the whole mesh at once, it's called the
+    first time the arrays are needed after a change.
     """
     def __init__(self):
         # Patch instances
         self._patches = []
-        # [x, y, z], all vertices of every triangle in the mesh
-        self._vertices = []
-        # [i, j, k], associated normals
-        self._normals = []
-        # [x, y, z], the unique set of all vertices, for bbox calc
-        self._sharedVertices = []
-        # integer, self._vertices count
-        self._nVertices = 0
-        # if true, include the previous patches vertices when summing normals
-        self._prevPatchStartIndex = 1e10
+        # (n, 3) float, every distinct (vertex, normal) in the mesh
+        self._vertices = np.zeros((0, 3))
+        # (n, 3) float, associated normals
+        self._normals = np.zeros((0, 3))
+        # (n, 3) float, the unique set of all vertex positions, for bbox calc
+        self._sharedVertices = np.zeros((0, 3))
+        # True if triangles were added since the last build()
+        self._dirty = False
+        # (n,) index of the patch each vertex belongs to
+        self._vertexPatch = np.zeros(0, dtype=np.intp)
+        # float32 copies for renderBatched(), see _batchArrays()
+        self._batch = None
         # vertice bounding box
         self._bbox = None
+        # milliseconds the last build() took
+        self.buildMs = 0.0
     def toggleNormals(self, state=None):
         """Show surface normals.
 
@@ -324,87 +332,199 @@ class Mesh(object):
         """
         for patch in self._patches:
             patch.setFlatShaded()
-    def blendTangent(self, blend):
-        """Search the previous Patch's vertices when adding a vertex.
-        
-        blend -- bool
-
-        This will create the correct normals between tangent patches.
-        """
-        if blend and self._patches:
-            self._prevPatchStartIndex = self._patches[-1].startIndex()
-        else:
-            self._prevPatchStartIndex = 1e10
-    def verticesEqual(self, v1, v2, eps=1e-8):
-        """Return True if the vertices are equal.
-
-        v1, v2 -- [x, y, z]
-        eps -- allowed difference
-        """
-        if abs(v1[0] - v2[0]) > eps:
-            return False
-        if abs(v1[1] - v2[1]) > eps:
-            return False
-        if abs(v1[2] - v2[2]) > eps:
-            return False
-        return True
-    # TODO: The calculated normals look ok but they're not really accurate.
-    #       This function does not know if two triangles share an edge. When a
-    #       quad is added to the mesh, its two triangles are co-planar. If
-    #       those two triangles share a vertex with another non-co-planar
-    #       triangle, the normal will be biased towards the quad.
-    def addVertex(self, v, n, startIndex, apex=False):
-        """Add the vertex and associated normal.
-
-        v -- [x, y, z]
-        n -- [i, j, k], normal of vertex's parent triangle or an apex normal
-                        as described below
-        startIndex -- index where vertex's Patch starts
-        apex -- If True, the vertex is the apex of a cone. Its associated
-                normal (n) will have been pre-calculated. v and n will be
-                appended without any further checks or normal sums.
+    def build(self, eps=1e-8):
+        """Weld the vertices and compute the normals.
+
+        eps -- vertices closer than this are the same vertex
+
+        The triangles of every patch are welded into one indexed mesh and an
+        edge adjacency is built from it. An edge shared by two triangles of
+        the same patch is smooth, an edge between patches is a crease (the
+        patches were split where the profile isn't tangent, see
+        path2d.classifyJoints()). The corners of a vertex connected across
+        smooth edges share one vertex and one normal, the sum of their
+        triangles' normals weighted by the angle at the corner. Quads split
+        in two weigh the same as any other corner.
         """
-        for vv in self._sharedVertices[-1::-1]:
-            if self.verticesEqual(v, vv):
+        self._dirty = False
+        chunks = [c for p in self._patches for c in p._triChunks]
+        if not chunks:
+            return
+        t0 = time.time()
+        tris = np.concatenate(chunks)
+        apex = np.concatenate([c for p in self._patches
+                               for c in p._apexChunks])
+        patchIds = np.concatenate(
+            [np.full(len(c), i, dtype=np.intp)
+             for i, p in enumerate(self._patches) for c in p._triChunks])
+        # drop degenerate triangles, corner angles
+        e1 = np.roll(tris, -1, axis=1) - tris
+        e2 = np.roll(tris, -2, axis=1) - tris
+        fn = np.cross(e1[:, 0], e2[:, 0])
+        fnLen = np.sqrt((fn * fn).sum(-1))
+        keep = fnLen > eps * eps
+        tris, apex, patchIds = tris[keep], apex[keep], patchIds[keep]
+        e1, e2 = e1[keep], e2[keep]
+        fn = fn[keep] / fnLen[keep][:, np.newaxis]
+        cross = np.cross(e1, e2)
+        angles = np.arctan2(np.sqrt((cross * cross).sum(-1)),
+                            (e1 * e2).sum(-1))
+        nTris = len(tris)
+        corners = tris.reshape(-1, 3)
+        # weld by position
+        q = np.round(corners / eps).astype(np.int64)
+        _, first, welded = np.unique(q, axis=0, return_index=True,
+                                     return_inverse=True)
+        self._sharedVertices = corners[first]
+        faces = welded.reshape(-1, 3)
+        # half edges, half edge 3f + j runs from corner 3f + j to the next
+        start = faces.ravel()
+        end = faces[:, [1, 2, 0]].ravel()
+        lo = np.minimum(start, end)
+        hi = np.maximum(start, end)
+        order = np.lexsort((hi, lo))
+        same = ((lo[order][1:] == lo[order][:-1])
+                & (hi[order][1:] == hi[order][:-1]))
+        h1 = order[:-1][same]
+        h2 = order[1:][same]
+        # smooth edges join the corners at both of their ends
+        smooth = patchIds[h1 // 3] == patchIds[h2 // 3]
+        h1, h2 = h1[smooth], h2[smooth]
+        h1End = h1 - h1 % 3 + (h1 % 3 + 1) % 3
+        h2End = h2 - h2 % 3 + (h2 % 3 + 1) % 3
+        flipped = start[h2] != start[h1]
+        c1 = np.concatenate([h1, h1End])
+        c2 = np.concatenate([np.where(flipped, h2End, h2),
+                             np.where(flipped, h2, h2End)])
+        apexCorner = apex.ravel()
+        join = ~(apexCorner[c1] | apexCorner[c2])
+        c1, c2 = c1[join], c2[join]
+        # label each group of joined corners with its lowest corner
+        labels = np.arange(nTris * 3)
+        while True:
+            old = labels
+            labels = labels.copy()
+            np.minimum.at(labels, c1, labels[c2])
+            np.minimum.at(labels, c2, labels[c1])
+            labels = labels[labels]
+            if (labels == old).all():
                 break
-        else:
-            self._sharedVertices.append(v)
-        if not apex:
-            # blend with the previous patch?
-            startIndex = min(startIndex, self._prevPatchStartIndex)
-            i = self._nVertices - 1
-            while i >= startIndex:
-                if self.verticesEqual(self._vertices[i], v):
-                    # vertex found
-                    # sum its normal with the duplicate vertex's normal
-                    nn = QVector3D(*self._normals[i])
-                    nn += QVector3D(*n)
-                    nn.normalize()
-                    self._normals[i] = [nn.x(), nn.y(), nn.z()]
-                    return i
-                i -= 1
-        # vertex not found or it's an apex vertex
-        self._vertices.append(v)
-        self._normals.append(n)
-        self._nVertices += 1
-        return self._nVertices - 1
+        groups, vIndex = np.unique(labels, return_inverse=True)
+        normals = np.zeros((len(groups), 3))
+        np.add.at(normals, vIndex,
+                  (angles[:, :, np.newaxis] * fn[:, np.newaxis]).reshape(-1, 3))
+        nLen = np.sqrt((normals * normals).sum(-1))
+        nLen[nLen == 0.0] = 1.0
+        self._vertices = corners[groups]
+        self._normals = normals / nLen[:, np.newaxis]
+        # corners are only joined within a patch
+        self._vertexPatch = np.repeat(patchIds, 3)[groups]
+        self._batch = None
+        # hand each patch its triangles, they're in patch order
+        indices = vIndex.astype(np.uint32).reshape(-1, 3)
+        counts = np.bincount(patchIds, minlength=len(self._patches))
+        stops = np.cumsum(counts)
+        for patch, n, stop in zip(self._patches, counts, stops):
+            patch._nTris = int(n)
+            patch._indices = indices[stop - n:stop].ravel()
+        self._bbox = BBox.fromVertices(self._sharedVertices)
+        self.buildMs = (time.time() - t0) * 1000.0
+    def _update(self):
+        if self._dirty:
+            self.build()
     def vertexCount(self):
-        """Return the length of self.vertices (cached)
+        """Return the length of self.vertices
         """
-        return self._nVertices
+        self._update()
+        return len(self._vertices)
+    def triangleCount(self):
+        self._update()
+        return sum(p._nTris for p in self._patches)
+    def patchCount(self):
+        return len(self._patches)
     def sharedVertices(self):
-        """Return the list of unique vertices in this mesh.
+        """Return the unique vertex positions in this mesh, an (n, 3) array.
         """
+        self._update()
         return self._sharedVertices
     def bbox(self):
         """Find the coordinate-aligned bounding box of this meshes vertices.
 
         Return a BBox instance.
         """
+        self._update()
         return self._bbox
+    def surfaceMode(self):
+        """Return the surface mode of every patch, None if they differ.
+        """
+        modes = set(p._surfaceMode for p in self._patches)
+        return modes.pop() if len(modes) == 1 else None
+    def _batchArrays(self):
+        """Return float32 (vertices, normals, colors) and uint32 indices of
+        every patch.
+
+        Colors are per vertex, copied from each vertex's patch.
+        """
+        self._update()
+        if self._batch is None:
+            colors = np.array([p._color for p in self._patches] or
+                              np.zeros((0, 4)), dtype=np.float32)
+            indices = [p._indices for p in self._patches]
+            self._batch = (
+                np.ascontiguousarray(self._vertices, dtype=np.float32),
+                np.ascontiguousarray(self._normals, dtype=np.float32),
+                colors[self._vertexPatch],
+                np.concatenate(indices) if indices
+                else np.zeros(0, dtype=np.uint32))
+        return self._batch
+    def renderBatched(self, shader):
+        """Render all the patches with a MeshShader.
+
+        shader -- meshshader.MeshShader, bound
+
+        If the patches share a surface mode they're drawn by one call,
+        otherwise one call per patch.
+
+        Return the number of draw calls made.
+        """
+        vertices, normals, colors, indices = self._batchArrays()
+        if not len(indices):
+            return 0
+        gl.glEnableClientState(gl.GL_VERTEX_ARRAY)
+        gl.glEnableClientState(gl.GL_NORMAL_ARRAY)
+        gl.glEnableClientState(gl.GL_COLOR_ARRAY)
+        gl.glVertexPointer(3, gl.GL_FLOAT, 0, vertices)
+        gl.glNormalPointer(gl.GL_FLOAT, 0, normals)
+        gl.glColorPointer(4, gl.GL_FLOAT, 0, colors)
+        mode = self.surfaceMode()
+        if mode is not None:
+            shader.setMode(mode)
+            gl.glDrawElements(gl.GL_TRIANGLES, len(indices),
+                              gl.GL_UNSIGNED_INT, indices)
+            calls = 1
+        else:
+            for patch in self._patches:
+                shader.setMode(patch._surfaceMode)
+                gl.glDrawElements(gl.GL_TRIANGLES, patch._nTris * 3,
+                                  gl.GL_UNSIGNED_INT, patch._indices)
+            calls = len(self._patches)
+        gl.glDisableClientState(gl.GL_VERTEX_ARRAY)
+        gl.glDisableClientState(gl.GL_NORMAL_ARRAY)
+        gl.glDisableClientState(gl.GL_COLOR_ARRAY)
+        return calls
+    def renderNormals(self):
+        """Render the normals of patches that show them, fixed-function.
+        """
+        self._update()
+        for patch in self._patches:
+            if patch._showNormals:
+                patch.renderNormals()
     def render(self):
         """Render all the patches.
+
+        Return the number of draw calls made.
         """
+        self._update()
         gl.glEnableClientState(gl.GL_VERTEX_ARRAY);
         gl.glEnableClientState(gl.GL_NORMAL_ARRAY);
         gl.glVertexPointer(3, gl.GL_DOUBLE, 0, self._vertices);
@@ -413,82 +533,161 @@ class Mesh(object):
             patch.render()
         gl.glDisableClientState(gl.GL_VERTEX_ARRAY);
         gl.glDisableClientState(gl.GL_NORMAL_ARRAY);
+        return len(self._patches)
 
         
-def getSinCosCache(nSegs):
-    """Find the sin and cos of every angle of a circle divided by nSegs.
+def arcPoints(x1, y1, x2, y2, cx, cy, arcDir, meshSegs):
+    """Divide an arc into line segments the way RevolvedMesh does.
 
-    This build the sin/cos cache for RevolvedMesh.
+    x1, y1 -- start point
+    x2, y2 -- end point
+    cx, cy -- center point
+    arcDir -- 'cclw' or 'clw'
+    meshSegs -- segments per 360 degrees
 
-    Return the list:
-      [((sin0, cos0), (sinAng1, cosAng1)),
-       ...
-       ((sinAngN, cosAngN), (sin0, cos0))]
-      where N is pi*2 / nSegs
-      
+    Return a list of (x, y), at least 4 points.
+    """
+    a = x1 - cx
+    b = y1 - cy
+    r = sqrt(a*a + b*b)
+    arc = Arc.fromVectors((a, b), (x2 - cx, y2 - cy), r, arcDir == 'cclw')
+    # TODO: By halving the mesh segs ( * 0.5), fewer triangles are
+    #       created. Shading is ok but arc edges look blocky.
+    # angstep = 360.0 / (meshSegs * 0.5)
+    angstep = 360.0 / meshSegs
+    # minimum 3 segments in the arc
+    segs = max(int(abs(arc.span()) / angstep), 3)
+    angs = np.radians(arc.startAngle() + arc.span() / segs * np.arange(segs))
+    angs = np.append(angs, radians(arc.endAngle()))
+    return zip((cx + r * np.cos(angs)).tolist(),
+               (cy + r * np.sin(angs)).tolist())
+
+def profilePoints(profile, meshSegs):
+    """Return the points of a profile with its arcs divided, see arcPoints().
     """
-    step = pi2 / nSegs
-    rangs = [0.0]
-    for i in range(1, nSegs):
-        rangs.append(step * i)
-    rangs.append(0.0)
-    return map(lambda x: ((sin(x[0]), cos(x[0])),
-                          (sin(x[1]), cos(x[1]))),
-               windowItr(rangs, 2, 1))
+    e = profile[0]
+    pts = [tuple(e) if len(e) == 2 else tuple(e[0])]
+    for e in profile[1:]:
+        if len(e) == 2:
+            pts.append(tuple(e))
+        else:
+            (x2, y2), (cx, cy), d = e
+            x1, y1 = pts[-1]
+            pts.extend(arcPoints(x1, y1, x2, y2, cx, cy, d, meshSegs)[1:])
+    return pts
 
+def triangulate(points, eps=1e-12):
+    """Triangulate a simple polygon by ear clipping.
 
-class RevolvedMesh(Mesh):
-    """A 360 degree surface of revolution.
-    """
-    segs = 32
-    sincos = getSinCosCache(segs)
-    def __init__(self, profile=None, color=[0.1, 0.1, 0.7, 1.0], close=False):
-        super(RevolvedMesh, self).__init__()
-        if profile:
-            self.addProfile(profile, color, close)
-    def _isLineTanToArc(self, x1, y1, x2, y2, cx, cy, d):
-        """Find if the line is tangent to the arc.
+    points -- [(x, y), ...], either winding, the last point is not a repeat
+              of the first
 
-        x1, y1 -- [x, y], line start point
-        x2, y2 -- [x, y], line end, arc start
-        cx, cy -- [x, y], arc center point
-        d -- 'clw' or 'cclw'
+    Repeated and collinear points are dropped without making a triangle.
 
-        It is assumed that the line end point and the arc start point are the
-        same.
+    Return a list of (i, j, k) index triples into points, wound the same way
+    as points.
+    """
+    idx = range(len(points))
+    area = 0.0
+    for i in idx:
+        (x1, y1), (x2, y2) = points[i - 1], points[i]
+        area += x1 * y2 - x2 * y1
+    # clip counter-clockwise ears
+    cw = area < 0.0
+    if cw:
+        idx.reverse()
+    def cross(a, b, c):
+        (ax, ay), (bx, by), (cx, cy) = points[a], points[b], points[c]
+        return (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+    def inside(p, a, b, c):
+        return (cross(a, b, p) >= 0.0 and cross(b, c, p) >= 0.0
+                and cross(c, a, p) >= 0.0)
+    tris = []
+    i = 0
+    misses = 0
+    while len(idx) > 2 and misses < len(idx):
+        n = len(idx)
+        a, b, c = idx[(i - 1) % n], idx[i % n], idx[(i + 1) % n]
+        turn = cross(a, b, c)
+        if abs(turn) <= eps:
+            # collinear or repeated
+            del idx[i % n]
+            misses = 0
+            continue
+        if turn > 0.0 and not any(inside(p, a, b, c) for p in idx
+                                  if p not in (a, b, c)
+                                  and points[p] not in (points[a], points[b],
+                                                        points[c])):
+            tris.append((c, b, a) if cw else (a, b, c))
+            del idx[i % n]
+            misses = 0
+            continue
+        i += 1
+        misses += 1
+    return tris
+
+
+# (segs, start, sweep) -> (cos, sin), see sinCosTable()
+_sinCosTables = {}
+
+def sinCosTable(segs, sweep=360.0, start=0.0):
+    """Find the cos and sin of each angle of a sweep divided into segs.
+
+    segs -- number of segments
+    sweep -- degrees swept
+    start -- first angle, in degrees
+
+    The tables are built once per (segs, sweep, start) and shared, they are
+    read-only. A full circle's last angle is exactly its first.
+
+    Return (cos, sin), arrays of segs + 1 floats.
+    """
+    key = (segs, float(sweep), float(start))
+    try:
+        return _sinCosTables[key]
+    except KeyError:
+        pass
+    a = np.radians(np.linspace(start, start + sweep, segs + 1))
+    cos = np.cos(a)
+    sin = np.sin(a)
+    if abs(sweep) == 360.0:
+        cos[-1] = cos[0]
+        sin[-1] = sin[0]
+    cos.flags.writeable = False
+    sin.flags.writeable = False
+    table = _sinCosTables[key] = (cos, sin)
+    return table
 
-        Return True or False.
-        """
-        p = QPointF(x2, y2)
-        # line start -> end
-        v1 = QVector2D(p - QPointF(x1, y1)).normalized()
-        # arc center -> arc start
-        v2 = QVector2D(p - QPointF(cx, cy)).normalized()
-        if abs(v1.dotProduct(v1, v2)) <= 1e-6:
-            # TODO: handle case where arc turns back into the line
-            return True
-        else:
-            return False
-    # TODO: untested
-    def _isArcTangentToArc(self, px, py, cx1, cy1, cx2, cy2):
-        """Find if two arcs are tangent
 
-        px, p1 -- [x, y], common point of arcs
-        cxN, cyN -- [x, y], arc center points
+class RevolvedMesh(Mesh):
+    """A surface of revolution.
 
-        It is assumed that the arcs share a common point.
+    segs -- number of segments in 360 degrees
+    sweep -- degrees revolved, if less than 360.0 each profile's region is
+             capped with a planar face at both ends of the sweep
 
-        Return True or Fasle
+    A partial sweep only creates the segments it covers, a half section
+    costs half a full mesh.
+    """
+    def __init__(self, profile=None, color=[0.1, 0.1, 0.7, 1.0], close=False,
+                 segs=32, sweep=360.0):
+        super(RevolvedMesh, self).__init__()
+        if not 0.0 < sweep <= 360.0:
+            raise MeshException('sweep must be > 0.0 and <= 360.0')
+        self.segs = segs
+        self.sweep = float(sweep)
+        if profile:
+            self.addProfile(profile, color, close)
+    def isSection(self):
+        return self.sweep < 360.0
+    def sinCos(self):
+        """Return the (cos, sin) table of this mesh's resolution and sweep.
         """
-        p = QPointF(px, py)
-        v1 = QVector2D(p - QPointF(cx1, cy1)).normalized()
-        v2 = QVector2D(p - QPointF(cx1, cy1)).normalized()
-        if abs(v1.dotProduct(v1, v2)) - 1.0 <= 1e-6:
-            # TODO: handle case where arc turns back into the other arc
-            return True
-        else:
-            return False
-    def addProfile(self, profile, color=None, close=False):
+        if self.sweep == 360.0:
+            return sinCosTable(self.segs)
+        n = max(1, int(ceil(self.segs * self.sweep / 360.0 - 1e-9)))
+        return sinCosTable(n, self.sweep)
+    def addProfile(self, profile, color=None, close=False, joints=None):
         """Create each Patch defined by the profile.
 
         profile -- a list of tuples as defined in tooldef.py
@@ -496,68 +695,71 @@ class RevolvedMesh(Mesh):
         close -- if True and the profile start or end points are not on
                  the axis of revolution, insert one with X=0.0 and Y
                  equal to the start or end point Y.
+        joints -- the JOINT_* class of each element of profile, see
+                  path2d.classifyJoints(). Computed if None or if close
+                  inserts an element.
+
+        Segments meeting at a tangent joint are added to the same Patch, so
+        their normals are blended and they are drawn in one batch.
         """
         if close:
+            # don't modify the caller's list, it may be a cached profile
+            profile = list(profile)
             e1 = profile[0]     # should always be a point
             if e1[0] != 0.0:
-                profile = [(0.0, e1[1])] + profile
+                profile.insert(0, (0.0, e1[1]))
+                joints = None
             e2 = profile[-1]
-            if e2[0] != 0.0:
-                if len(e2) == 2:
+            if len(e2) == 2:
+                if e2[0] != 0.0:
                     profile.append((0.0, e2[1]))
-                else:
-                    # profile ends in an arc
-                    profile.append((0.0, e2[0][1]))
-        # previous line start x/y, for line -> arc
-        px1 = py1 = None
-        for e1, e2 in windowItr(profile, 2, 1):
-            if e2 is None:
-                break
-            le1 = len(e1)
-            le2 = len(e2)
-            # line or start -> line
-            if le1 == 2 and le2 == 2:
-                x1, y1 = e1
-                x2, y2 = e2
-                self.blendTangent(False)
-                patch = Patch.fromRevLineSeg(x1, y1, x2, y2, self)
-                if color:
-                    patch.setColor(color)
-                self._patches.append(patch)
-                px1 = x1
-                py1 = y1
-            # line or start -> arc
-            elif le1 == 2 and le2 == 3:
-                x1, y1 = e1
-                (x2, y2), (cx, cy), d = e2
-                if px1 is not None:
-                    self.blendTangent(self._isLineTanToArc(px1, py1, x1, y1,
-                                                           cx, cy, d))
-                patch = Patch.fromRevArcSeg(x1, y1, x2, y2, cx, cy, d, self)
-                if color:
-                    patch.setColor(color)
-                self._patches.append(patch)
-            # arc -> line
-            elif le1 == 3 and le2 == 2:
-                (aex, aey), (cx, cy), d = e1
-                lex, ley = e2
-                self.blendTangent(self._isLineTanToArc(lex, ley, aex, aey, cx,
-                                                       cy, d))
-                patch = Patch.fromRevLineSeg(aex, aey, lex, ley, self)
+                    joints = None
+            elif e2[0][0] != 0.0:
+                # profile ends in an arc
+                profile.append((0.0, e2[0][1]))
+                joints = None
+        if joints is None:
+            joints = classifyJoints(*elementsToArrays(profile))
+        patch = None
+        for i in range(1, len(profile)):
+            e1 = profile[i - 1]
+            e2 = profile[i]
+            x1, y1 = e1 if len(e1) == 2 else e1[0]
+            if patch is None or joints[i - 1] != JOINT_TANGENT:
+                patch = Patch(self)
                 if color:
                     patch.setColor(color)
                 self._patches.append(patch)
-                px1 = aex
-                py1 = aey
-            # arc -> arc
+            if len(e2) == 2:
+                x2, y2 = e2
+                patch.addRevLineSeg(x1, y1, x2, y2)
             else:
-                (x1, y1), (cx1, cy1), d1 = e1
-                (x2, y2), (cx2, cy2), d2 = e2
-                self.blendTangent(self._isArcTangentToArc(x1, y1, cx1, cy1,
-                                                          cx2, cy2))
-                patch = Patch.fromRevArcSeg(x1, y1, x2, y2, cx2, cy2, d2,
-                                            self)
-                if color:
-                    patch.setColor(color)
-                self._patches.append(patch)
-        self._bbox = BBox.fromVertices(self._sharedVertices)
+                (x2, y2), (cx, cy), d = e2
+                patch.addRevArcSeg(x1, y1, x2, y2, cx, cy, d)
+        if self.isSection():
+            self.addSectionFaces(profile, color)
+    def addSectionFaces(self, profile, color=None):
+        """Cap the region between the profile and the axis at both ends of
+        the sweep.
+
+        The region is closed by lines from the profile's ends to the axis.
+        """
+        pts = profilePoints(profile, self.segs)
+        if pts[-1][0] != 0.0:
+            pts.append((0.0, pts[-1][1]))
+        if pts[0][0] != 0.0:
+            pts.insert(0, (0.0, pts[0][1]))
+        if pts[0] == pts[-1]:
+            pts.pop()
+        # faces are wound to face away from the sweep
+        area = 0.0
+        for (x1, y1), (x2, y2) in zip(pts, pts[1:] + pts[:1]):
+            area += x1 * y2 - x2 * y1
+        if area < 0.0:
+            pts.reverse()
+        for pp, angle in ((pts, 0.0), (pts[::-1], self.sweep)):
+            patch = Patch(self)
+            if color:
+                patch.setColor(color)
+            patch.addPlanarFace(pp, angle)
+            self._patches.append(patch)
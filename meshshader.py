@@ -0,0 +1,133 @@
+#!/usr/bin/python -t
+# -*- coding: utf-8 -*-
+
+"""meshshader.py
+
+A GLSL 1.20 program for drawing a Mesh in a single call.
+
+The program lights each pixel with the fixed-function light 0 (see
+GLView.initializeGL()) and reads the model view and projection matrices from
+the fixed-function stacks, so it draws the same scene Patch.render() does.
+Color comes from a per-vertex attribute, so every patch of a mesh can be drawn
+by one glDrawElements(). The surface mode is a uniform:
+ * smooth -- the interpolated vertex normals
+ * flat -- the triangle's normal, from the screen space derivatives of the
+           eye space position (GLSL 1.20 has no flat varyings)
+ * wire -- unlit, the caller sets the polygon mode
+
+Sunday, October 18 2026
+"""
+
+import OpenGL.GL as gl
+import OpenGL.error
+from OpenGL.GL import shaders
+
+
+VERTEX_SHADER = """
+#version 120
+varying vec3 eyePos;
+varying vec3 eyeNormal;
+varying vec4 color;
+void main()
+{
+    vec4 p = gl_ModelViewMatrix * gl_Vertex;
+    eyePos = p.xyz / p.w;
+    eyeNormal = gl_NormalMatrix * gl_Normal;
+    color = gl_Color;
+    gl_Position = gl_ModelViewProjectionMatrix * gl_Vertex;
+}
+"""
+
+FRAGMENT_SHADER = """
+#version 120
+uniform int mode;           // 0 smooth, 1 flat, 2 wire
+uniform vec3 specular;      // material specular color
+uniform float shininess;
+varying vec3 eyePos;
+varying vec3 eyeNormal;
+varying vec4 color;
+void main()
+{
+    if (mode == 2) {
+        gl_FragColor = color;
+        return;
+    }
+    vec3 n;
+    if (mode == 1)
+        n = normalize(cross(dFdx(eyePos), dFdy(eyePos)));
+    else
+        n = normalize(eyeNormal);
+    vec4 lp = gl_LightSource[0].position;
+    vec3 l = normalize(lp.w == 0.0 ? lp.xyz : lp.xyz - eyePos);
+    // orthographic, the viewer looks down -Z
+    vec3 h = normalize(l + vec3(0.0, 0.0, 1.0));
+    float diffuse = max(dot(n, l), 0.0);
+    float spec = 0.0;
+    if (diffuse > 0.0)
+        spec = pow(max(dot(n, h), 0.0), shininess);
+    vec3 c = color.rgb * (gl_LightModel.ambient.rgb
+                          + gl_LightSource[0].diffuse.rgb * diffuse)
+             + specular * gl_LightSource[0].specular.rgb * spec;
+    gl_FragColor = vec4(c, color.a);
+}
+"""
+
+# surface mode -> (mode uniform, specular, shininess), the materials
+# Patch.render() sets
+MODES = {'smooth': (0, (0.3, 0.3, 1.0), 64.0),
+         'flat': (1, (0.0, 0.0, 1.0), 128.0),
+         'wire': (2, (0.0, 0.0, 0.0), 1.0)}
+
+
+class MeshShaderException(Exception):
+    pass
+
+
+class MeshShader(object):
+    """The compiled program and its uniform locations.
+
+    Must be created with the GL context current, see create().
+    """
+    def __init__(self):
+        try:
+            self._program = shaders.compileProgram(
+                shaders.compileShader(VERTEX_SHADER, gl.GL_VERTEX_SHADER),
+                shaders.compileShader(FRAGMENT_SHADER, gl.GL_FRAGMENT_SHADER))
+        except (RuntimeError, OpenGL.error.Error) as e:
+            raise MeshShaderException(str(e))
+        self._mode = gl.glGetUniformLocation(self._program, 'mode')
+        self._specular = gl.glGetUniformLocation(self._program, 'specular')
+        self._shininess = gl.glGetUniformLocation(self._program, 'shininess')
+        self._current = None
+    @staticmethod
+    def create():
+        """Compile the program for the current context.
+
+        Return a MeshShader, or None if the context can't run it. Draw with
+        the fixed-function Mesh.render() in that case.
+        """
+        try:
+            return MeshShader()
+        except MeshShaderException:
+            return None
+    def bind(self):
+        gl.glUseProgram(self._program)
+        self._current = None
+    def release(self):
+        gl.glUseProgram(0)
+    def setMode(self, mode):
+        """Set the surface mode, 'smooth', 'flat' or 'wire'.
+
+        The program must be bound. Does nothing if mode is already set.
+        """
+        if mode == self._current:
+            return
+        m, spec, shininess = MODES[mode]
+        gl.glUniform1i(self._mode, m)
+        gl.glUniform3f(self._specular, *spec)
+        gl.glUniform1f(self._shininess, shininess)
+        if mode == 'wire':
+            gl.glPolygonMode(gl.GL_FRONT_AND_BACK, gl.GL_LINE)
+        else:
+            gl.glPolygonMode(gl.GL_FRONT, gl.GL_FILL)
+        self._current = mode
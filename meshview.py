@@ -14,7 +14,11 @@ import OpenGL.GL as gl
 import numpy as np
 
 from glview import GLView
+import matvec
 from bbox import BBox
+from meshshader import MeshShader
+from renderstats import RenderStats
+from assembly import Assembly
 
 class MeshView(GLView):
     """A tool mesh viewer.
@@ -26,6 +30,14 @@ class MeshView(GLView):
         self.baseRotFactor = self.rotFactor
         self._shadeMode = 'smooth'
         self._showNormals = False
+        # MeshShader, or None to draw with the fixed-function pipeline
+        self._shader = None
+        self.stats = RenderStats()
+        self._showStats = False
+    def initializeGL(self):
+        super(MeshView, self).initializeGL()
+        self._shader = MeshShader.create()
+        self.stats.initializeGL()
     def initGL(self):
         super(MeshView, self).initGL()
         self.frontView()
@@ -58,6 +70,13 @@ class MeshView(GLView):
                                      * self.sceneHeight / max(w, h) * 0.5,
                                      0.05)
     def setMesh(self, mesh):
+        """Show a Mesh or an assembly.Assembly.
+
+        The buffer objects of an outgoing Assembly are deleted.
+        """
+        if isinstance(self._mesh, Assembly) and self._mesh is not mesh:
+            self.makeCurrent()
+            self._mesh.releaseBuffers()
         self._mesh = mesh
         self.setRotCenter(mesh.bbox().center())
         if self._shadeMode == 'smooth':
@@ -79,6 +98,31 @@ class MeshView(GLView):
         for a in [x for x in self.actions()
                   if x.text() in ['Left', 'Right', 'Back']]:
             self.removeAction(a)
+        sep = QAction(self)
+        sep.setSeparator(True)
+        self.addAction(sep)
+        a = QAction("Render Stats", self)
+        a.setCheckable(True)
+        self.connect(a, SIGNAL('toggled(bool)'), self.showStats)
+        self.addAction(a)
+        a = QAction("Save Render Stats...", self)
+        self.connect(a, SIGNAL('triggered()'), self.saveStats)
+        self.addAction(a)
+    def showStats(self, state):
+        """Show or hide the render statistics overlay.
+        """
+        self._showStats = state
+        self.stats.clear()
+        self.updateGL()
+    def saveStats(self):
+        """Write the render statistics window to a JSON file.
+        """
+        fname = unicode(QFileDialog.getSaveFileName(self,
+                                                    'Save Render Stats',
+                                                    'renderstats.json',
+                                                    'JSON files (*.json)'))
+        if fname:
+            self.stats.save(fname)
     def mxv(self, m, v):
         """Multiply matrix and vector.
 
@@ -115,10 +159,8 @@ class MeshView(GLView):
 
         Return a BBox.
         """
-        mappedVerts = []
-        for meshVert in self._mesh.sharedVertices():
-            mappedVerts.append(self.mxv(self.modelviewMatrix,
-                                        meshVert + [1.0])[:3])
+        mappedVerts = matvec.mxvs(self.modelviewMatrix,
+                                  self._mesh.sharedVertices())
         bbox = BBox.fromVertices(mappedVerts)
         return bbox
     def fitMesh(self):
@@ -129,10 +171,38 @@ class MeshView(GLView):
         self.fit(bbox.leftTop(), bbox.rightBottom())
         self._setRotFactor(bbox)
     def paintGL(self):
+        self.stats.beginFrame()
         gl.glClear(gl.GL_COLOR_BUFFER_BIT | gl.GL_DEPTH_BUFFER_BIT)
+        self.loadMatrices()
         if self._mesh:
-            self._mesh.render()
+            self.stats.beginRender()
+            if isinstance(self._mesh, Assembly):
+                self._mesh.cull(self.modelviewMatrix, self.projMatrix)
+            if self._shader:
+                self._shader.bind()
+                calls = self._mesh.renderBatched(self._shader)
+                self._shader.release()
+                gl.glPolygonMode(gl.GL_FRONT_AND_BACK, gl.GL_FILL)
+                if self._showNormals:
+                    self._mesh.renderNormals()
+            else:
+                calls = self._mesh.render()
+            self.stats.endRender(self._mesh, calls)
         self.renderAxisIndicator()
+        self.stats.endFrame()
+        if self._showStats:
+            self.renderStats()
+    def renderStats(self):
+        """Draw the statistics overlay in the top left corner.
+        """
+        gl.glDisable(gl.GL_LIGHTING)
+        gl.glPolygonMode(gl.GL_FRONT_AND_BACK, gl.GL_FILL)
+        self.qglColor(QColor(255, 255, 255))
+        font = QFont('Monospace', 9)
+        font.setStyleHint(QFont.TypeWriter)
+        step = QFontMetrics(font).lineSpacing()
+        for i, line in enumerate(self.stats.lines()):
+            self.renderText(8, step * (i + 1) + 4, line, font)
     def topView(self, update=False):
         super(MeshView, self).topView(update)
         self.fitMesh()
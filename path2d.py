@@ -8,14 +8,101 @@ Sunday, September 22 2013
 
 from math import atan2, degrees, hypot
 
+import numpy as np
+
 from PyQt4.QtGui import QPainterPath
 from PyQt4.QtCore import QRectF
 
 
+# element kinds used by toArrays()
+KIND_POINT = 0                  # start point or line end point
+KIND_CCLW = 1                   # counter-clockwise arc
+KIND_CLW = -1                   # clockwise arc
+
+# joint classes used by classifyJoints(), the profile is assumed to run
+# counter-clockwise around the solid (the tool profiles do)
+JOINT_END = 2                   # first or last element, not a joint
+JOINT_TANGENT = 0               # smooth
+JOINT_CONVEX = 1                # outside corner, turns left (or back)
+JOINT_CONCAVE = -1              # inside corner, turns right
+
+
 class Path2dException(Exception):
     pass
 
 
+def elementsToArrays(elements):
+    """Convert a list of path elements (see Path2d.elements()) to arrays.
+
+    Return (points, centers, kinds), see Path2d.toArrays().
+    """
+    n = len(elements)
+    points = np.empty((n, 2), dtype=np.float64)
+    centers = np.full((n, 2), np.nan, dtype=np.float64)
+    kinds = np.zeros(n, dtype=np.int8)
+    for i, e in enumerate(elements):
+        if len(e) == 2:
+            points[i] = e
+        else:
+            points[i] = e[0]
+            centers[i] = e[1]
+            kinds[i] = KIND_CCLW if e[2] == 'cclw' else KIND_CLW
+    return points, centers, kinds
+
+def classifyJoints(points, centers, kinds, relTol=1e-9, angTol=1e-6):
+    """Classify the joint at every element of a path.
+
+    points, centers, kinds -- see Path2d.toArrays()
+    relTol -- position tolerance, relative to the size of the path
+    angTol -- minimum angle between tangents, in radians, of a corner
+
+    A joint is tangent if the tangents of the segments meeting there differ
+    by less than angTol, or by less than the position tolerance divided by
+    the length (or radius) of the shorter segment. Small paths are judged as
+    strictly as large ones.
+
+    Return an int8 array with a JOINT_* value for every element. The first
+    and last elements are JOINT_END.
+    """
+    n = len(kinds)
+    joints = np.full(n, JOINT_END, dtype=np.int8)
+    if n < 3:
+        return joints
+    size = np.ptp(points, axis=0).max()
+    tol = relTol * (size if size > 0.0 else 1.0)
+    s = points[:-1]
+    e = points[1:]
+    c = centers[1:]
+    k = kinds[1:].astype(np.float64)[:, np.newaxis]
+    isArc = kinds[1:] != KIND_POINT
+    with np.errstate(invalid='ignore', divide='ignore'):
+        d = e - s
+        lineLen = np.hypot(d[:, 0], d[:, 1])
+        lineT = d / lineLen[:, np.newaxis]
+        rs = s - c
+        re = e - c
+        r = np.hypot(rs[:, 0], rs[:, 1])
+        ts = np.where(isArc[:, np.newaxis],
+                      np.column_stack([-rs[:, 1], rs[:, 0]]) * k
+                      / r[:, np.newaxis], lineT)
+        te = np.where(isArc[:, np.newaxis],
+                      np.column_stack([-re[:, 1], re[:, 0]]) * k
+                      / r[:, np.newaxis], lineT)
+        length = np.where(isArc, r, lineLen)
+        # tangents into and out of each interior element
+        tin = te[:-1]
+        tout = ts[1:]
+        cross = tin[:, 0] * tout[:, 1] - tin[:, 1] * tout[:, 0]
+        dot = (tin * tout).sum(-1)
+        tolAng = np.maximum(angTol,
+                            tol / np.minimum(length[:-1], length[1:]))
+    tangent = (np.abs(cross) <= tolAng) & (dot > 0.0)
+    joints[1:-1] = np.where(tangent, JOINT_TANGENT,
+                            np.where(cross < 0.0, JOINT_CONCAVE,
+                                     JOINT_CONVEX))
+    return joints
+
+
 class Path2d(object):
     """A list of connected line and arc segments in the x/y cartesian plane.
     
@@ -27,28 +114,82 @@ class Path2d(object):
     The path must start with a point but may end with a point or arc. A valid
     path requires at least two elements, a point followed by an arc, or a
     point followed by a point.
+
+    Elements are stored in three parallel arrays, end points and arc centers
+    as float64 (n, 2) arrays and the element kinds as an int8 array (see
+    toArrays()). The arrays grow by doubling. elements() builds the nested
+    list form on demand.
     """
-    def __init__(self, startPoint=None):
+    __slots__ = ('_points', '_centers', '_kinds', '_n', '_elements',
+                 '_version', '_qpath', '_joints')
+    def __init__(self, startPoint=None, capacity=8):
         """Initialize the path.
 
         startPoint -- [x, y] If not supplied, moveTo must be called before
                              adding lines or arcs.
+        capacity -- number of elements to allocate room for
         """
-        self._elements = []
+        capacity = max(capacity, 2)
+        self._points = np.empty((capacity, 2), dtype=np.float64)
+        self._centers = np.empty((capacity, 2), dtype=np.float64)
+        self._kinds = np.empty(capacity, dtype=np.int8)
+        self._n = 0
+        # cached elements() list
+        self._elements = None
+        # incremented every time the path changes
+        self._version = 0
+        # ((version, mirror), QPainterPath) cached by toQPainterPath()
+        self._qpath = None
+        # (version, joints array) cached by joints()
+        self._joints = None
         if startPoint:
-            self._elements.append(startPoint)
+            self.moveTo(*startPoint)
     def __str__(self):
-        elmstr = '\n       '.join([str(x) for x in self._elements])
+        elmstr = '\n       '.join([str(x) for x in self.elements()])
         if elmstr:
             return 'Path2D[' + elmstr + ']'
         else:
             return 'Path2D[]'
+    def __len__(self):
+        return self._n
+    @classmethod
+    def fromArrays(cls, points, centers, kinds):
+        """Create a path from arrays as returned by toArrays().
+
+        The arrays are copied.
+        """
+        n = len(kinds)
+        path = cls(capacity=n)
+        path._points[:n] = points
+        path._centers[:n] = centers
+        path._kinds[:n] = kinds
+        path._n = n
+        return path
+    def version(self):
+        """Return a number that changes every time the path is modified.
+        """
+        return self._version
+    def _append(self, x, y, cx, cy, kind):
+        n = self._n
+        if n == len(self._kinds):
+            size = n * 2
+            for name in ('_points', '_centers', '_kinds'):
+                a = getattr(self, name)
+                b = np.empty((size,) + a.shape[1:], dtype=a.dtype)
+                b[:n] = a[:n]
+                setattr(self, name, b)
+        self._points[n] = x, y
+        self._centers[n] = cx, cy
+        self._kinds[n] = kind
+        self._n = n + 1
+        self._elements = None
+        self._version += 1
     def isValid(self):
         """Return True if the path has at least two elements.
 
         The first must be a point.
         """
-        return len(self._elements) >= 2 and len(self._elements[0]) == 2
+        return self._n >= 2 and self._kinds[0] == KIND_POINT
     def elements(self):
         """Return a list of path elements.
 
@@ -57,16 +198,27 @@ class Path2d(object):
         2. [[x, y], arc end point
             [x, y], arc center point
             d]      either 'cclw' or 'clw'
+
+        The list is built once per change to the path and must not be
+        modified.
         """
+        if self._elements is None:
+            n = self._n
+            self._elements = [p if k == KIND_POINT
+                              else [p, c, 'cclw' if k == KIND_CCLW else 'clw']
+                              for p, c, k in zip(self._points[:n].tolist(),
+                                                 self._centers[:n].tolist(),
+                                                 self._kinds[:n].tolist())]
         return self._elements
     def isEmpty(self):
         """Return True if there are no elements in the path.
         """
-        return not self._elements
+        return not self._n
     def moveTo(self, x, y):
         """Clear the path and set the start point.
         """
-        self._elements = [[x, y]]
+        self._n = 0
+        self._append(x, y, np.nan, np.nan, KIND_POINT)
     def lineTo(self, x, y):
         """Add the end point to the path.
 
@@ -74,7 +226,7 @@ class Path2d(object):
         """
         if self.isEmpty():
             raise Path2dException("path needs a line start point")
-        self._elements.append([x, y])
+        self._append(x, y, np.nan, np.nan, KIND_POINT)
     def arcTo(self, endX, endY, centerX, centerY, arcDir):
         """Add an arc to the path.
 
@@ -84,46 +236,128 @@ class Path2d(object):
         """
         if self.isEmpty():
             raise Path2dException("path needs an arc start point")
-        self._elements.append([[endX, endY],
-                               [centerX, centerY],
-                               arcDir])
+        self._append(endX, endY, centerX, centerY,
+                     KIND_CCLW if arcDir == 'cclw' else KIND_CLW)
     def endPoints(self):
         """Return a list of all line and arc end points, in order.
         """
-        return [e if len(e) == 2 else e[0] for e in self._elements]
-    def toQPainterPath(self):
+        return self._points[:self._n].tolist()
+    def arrays(self):
+        """Return (points, centers, kinds) views of the path's arrays.
+
+        See toArrays(). The views must not be modified.
+        """
+        n = self._n
+        return self._points[:n], self._centers[:n], self._kinds[:n]
+    def joints(self):
+        """Return the JOINT_* class of every element, see classifyJoints().
+
+        The array is computed once per change to the path and must not be
+        modified.
+        """
+        if self._joints is None or self._joints[0] != self._version:
+            self._joints = (self._version, classifyJoints(*self.arrays()))
+        return self._joints[1]
+    def toArrays(self, scale=1.0):
+        """Return the path as NumPy arrays.
+
+        scale -- every coordinate is multiplied by this
+
+        Return (points, centers, kinds), copies of the path's arrays. points
+        is an (n, 2) float64 array of element end points, centers an (n, 2)
+        float64 array of arc centers (NaN for points) and kinds an int8 array
+        of KIND_POINT, KIND_CCLW or KIND_CLW.
+        """
+        points, centers, kinds = self.arrays()
+        return points * scale, centers * scale, kinds.copy()
+    def transformed(self, matrix=None, offset=(0.0, 0.0)):
+        """Return a new path with every point mapped by matrix, then offset.
+
+        matrix -- 2x2 array-like, None for the identity
+        offset -- (dx, dy)
+
+        Arc directions are reversed if the matrix mirrors the path. Only
+        uniform scales and rotations (with or without a mirror) keep arcs
+        circular.
+        """
+        points, centers, kinds = self.arrays()
+        if matrix is not None:
+            m = np.asarray(matrix, dtype=np.float64)
+            points = points.dot(m.T)
+            centers = centers.dot(m.T)
+            if np.linalg.det(m) < 0.0:
+                kinds = -kinds
+        return Path2d.fromArrays(points + offset, centers + offset, kinds)
+    def scaled(self, factor):
+        """Return a new path with every coordinate multiplied by factor.
+        """
+        points, centers, kinds = self.arrays()
+        return Path2d.fromArrays(points * factor, centers * factor, kinds)
+    def toQPainterPath(self, mirror=False):
         """Return a QPainterPath containing all segments of this path.
+
+        mirror -- if True, the path mirrored about X0.0 is added as a second
+                  subpath. Both halves are built in the same pass.
+
+        The result is cached until the path changes, the returned
+        QPainterPath is a (copy on write) copy that can be modified.
         """
+        if self._qpath is None or self._qpath[0] != (self._version, mirror):
+            self._qpath = ((self._version, mirror),
+                           self._buildQPainterPath(mirror))
+        return QPainterPath(self._qpath[1])
+    def _buildQPainterPath(self, mirror):
         if not self.isValid():
             raise Path2dException('invalid path')
         p = QPainterPath()
-        sx, sy = self._elements[0]
-        if len(self._elements[1]) == 2:
+        m = QPainterPath() if mirror else None
+        points, centers, kinds = self.arrays()
+        points = points.tolist()
+        centers = centers.tolist()
+        kinds = kinds.tolist()
+        sx, sy = points[0]
+        # NOTE: machtool uses a right-handed cartesian coordinate system with
+        #       the Y+ up. Because of this, the QRectF used to define an arc
+        #       has a negative height. This makes a positive arc angle sweep
+        #       cclw as it should.
+        if kinds[1] == KIND_POINT:
             # Only add a start point if the QPainterPath will start with a
             # line, not an arc.
             p.moveTo(sx, sy)
-        for e in self._elements[1:]:
-            if len(e) == 2:
-                p.lineTo(*e)
-                sx, sy = e
+            if mirror:
+                m.moveTo(-sx, sy)
+        else:
+            (cx, cy) = centers[1]
+            r = hypot(sx-cx, sy-cy)
+            sa = degrees(atan2(sy-cy, sx-cx)) % 360.0
+            p.arcMoveTo(QRectF(cx - r, cy + r, r*2, -r*2), sa)
+            if mirror:
+                m.arcMoveTo(QRectF(-cx - r, cy + r, r*2, -r*2), 180.0 - sa)
+        for (ex, ey), (cx, cy), kind in zip(points[1:], centers[1:],
+                                            kinds[1:]):
+            if kind == KIND_POINT:
+                p.lineTo(ex, ey)
+                if mirror:
+                    m.lineTo(-ex, ey)
             else:
-                (ex, ey), (cx, cy), arcDir = e
                 r = hypot(ex-cx, ey-cy)
                 d = r*2
                 sa = degrees(atan2(sy-cy, sx-cx)) % 360.0
                 ea = degrees(atan2(ey-cy, ex-cx)) % 360.0
-                # NOTE: machtool uses a right-handed cartesian coordinate
-                #       system with the Y+ up. Because of this, the QRectF
-                #       used to define the arc has a negative height. This
-                #       makes a positive arc angle sweep cclw as it should.
-                rect = QRectF(cx - r, cy + r, d, -d)
-                if arcDir == 'cclw':
+                if kind == KIND_CCLW:
                     span = (ea + 360.0 if ea < sa else ea) - sa
                 else:
                     span = -((sa + 360.0 if sa < ea else sa) - ea)
-                p.arcMoveTo(rect, sa)
-                p.arcTo(rect, sa, span)
-                sx, sy = ex, ey
+                # the current point is already the arc start point
+                p.arcTo(QRectF(cx - r, cy + r, d, -d), sa, span)
+                if mirror:
+                    # mirrored about X0.0, angles are reflected about 90
+                    # degrees and the direction reverses
+                    m.arcTo(QRectF(-cx - r, cy + r, d, -d), 180.0 - sa,
+                            -span)
+            sx, sy = ex, ey
+        if mirror:
+            p.addPath(m)
         return p
 
 if __name__ == '__main__':
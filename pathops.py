@@ -0,0 +1,675 @@
+#!/usr/bin/python -t
+# -*- coding: utf-8 -*-
+
+"""pathops.py
+
+Profile operations on Path2d: offset, fillet and simplify.
+
+Offset
+======
+offset() moves every segment of a path sideways. Positive distances move to
+the right of the direction of travel. Tool profiles run counter-clockwise
+around the tool, so a positive distance grows the tool and a negative one
+grinds it down. Corners that open up are closed with a round join centered on
+the original corner, corners that overlap are trimmed.
+
+Fillet
+======
+fillet() rounds corners between line/line, line/arc and arc/arc pairs with
+tangent arcs.
+
+Both work on whole arrays of distances or radii at once (offsetMany(),
+filletMany()). Each variant has the same segment layout, only the numbers
+change, so the geometry of every variant is computed together, one joint at a
+time. A variant where some segments or round joins collapse or reverse, a
+short step ground away or a fillet wider than a segment, is built again on
+its own without them, their neighbours trimmed to meet or rounded, until
+nothing collapses. It's None only if the whole path degenerates, or for a
+fillet, if its first or last segment goes.
+
+Simplify
+========
+simplify() removes points from runs of line segments with the Douglas-Peucker
+algorithm. Arcs and their end points are always kept.
+
+Sunday, October 18 2026
+"""
+
+import numpy as np
+
+from path2d import Path2d, KIND_POINT, KIND_CCLW, KIND_CLW
+from algo import xsectLineCirBatch
+
+# cross product of unit tangents below which a joint is tangent
+TANGENT_EPS = 1e-9
+# distance below which two points are the same
+POINT_EPS = 1e-9
+
+
+class PathOpsException(Exception):
+    pass
+
+
+def _segments(path):
+    """Return (S, E, C, K, R) for each segment of path.
+
+    S, E -- (m, 2) start and end points
+    C -- (m, 2) arc centers, NaN for lines
+    K -- (m,) KIND_POINT for lines, else the arc direction
+    R -- (m,) arc radii, NaN for lines
+    """
+    if not path.isValid():
+        raise PathOpsException('invalid path')
+    points, centers, kinds = path.arrays()
+    S = points[:-1]
+    E = points[1:]
+    C = centers[1:]
+    K = kinds[1:].astype(np.float64)
+    R = np.hypot(*(S - C).T)
+    return S, E, C, K, R
+
+def _rot90(v):
+    """Rotate vectors 90 degrees counter-clockwise.
+    """
+    return np.stack([-v[..., 1], v[..., 0]], axis=-1)
+
+def _unit(v):
+    return v / np.hypot(v[..., 0], v[..., 1])[..., np.newaxis]
+
+def _tangents(S, E, C, K):
+    """Return the unit tangents at the start and end of each segment.
+    """
+    isArc = K != KIND_POINT
+    lineT = _unit(E - S)
+    k = K[:, np.newaxis]
+    with np.errstate(invalid='ignore'):
+        ts = np.where(isArc[:, np.newaxis], _unit(_rot90(S - C)) * k, lineT)
+        te = np.where(isArc[:, np.newaxis], _unit(_rot90(E - C)) * k, lineT)
+    return ts, te
+
+def _cross(a, b):
+    return a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]
+
+def _angles(v):
+    return np.degrees(np.arctan2(v[..., 1], v[..., 0]))
+
+def _sweep(c, a, b, kind):
+    """Return the sweep in degrees from point a to b around c, in the arc's
+    direction, in the range [0, 360).
+    """
+    return ((_angles(b - c) - _angles(a - c)) * kind) % 360.0
+
+def _offsetGeom(S, E, C, K, R, j, d):
+    """Offset segment j by the distances d.
+
+    d -- (k,) distances
+
+    Return (s, e, geom). s and e are (k, 2) offset end points. geom is
+    ('line', s, unitTangent) or ('arc', center, (k,) radii).
+    """
+    dd = d[:, np.newaxis]
+    if K[j] == KIND_POINT:
+        t = _unit(E[j] - S[j])
+        n = -_rot90(t)          # right side normal
+        s = S[j] + dd * n
+        return s, E[j] + dd * n, ('line', s, t)
+    r = R[j] + K[j] * d
+    # an arc offset through its center is gone
+    r = np.where(r > 0.0, r, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scale = (r / R[j])[:, np.newaxis]
+    return (C[j] + (S[j] - C[j]) * scale, C[j] + (E[j] - C[j]) * scale,
+            ('arc', C[j], r))
+
+def _nearest(candidates, v):
+    """Pick the candidate point nearest v.
+
+    candidates -- (k, 2, 2) two candidate points per variant, NaN for none
+    v -- (2,) reference point, or (k, 2) one per variant
+
+    Return (k, 2), NaN where there is no candidate.
+    """
+    v = np.asarray(v)
+    if v.ndim == 2:
+        v = v[:, np.newaxis]
+    dist = np.hypot(*(candidates - v).T).T
+    dist = np.where(np.isnan(dist), np.inf, dist)
+    i = np.argmin(dist, axis=-1)
+    out = candidates[np.arange(len(i)), i]
+    out[np.isinf(dist.min(axis=-1))] = np.nan
+    return out
+
+def _intersect(g1, g2, v):
+    """Intersect two offset geometries, see _offsetGeom().
+
+    v -- the original joint, the intersection nearest it is used
+
+    Return a (k, 2) array, NaN where the geometries don't meet.
+    """
+    if g1[0] == 'arc' and g2[0] == 'line':
+        g1, g2 = g2, g1
+    if g1[0] == 'line' and g2[0] == 'line':
+        _, p1, t1 = g1
+        _, p2, t2 = g2
+        den = _cross(t1, t2)
+        if abs(den) < TANGENT_EPS:
+            return np.full(p1.shape, np.nan)
+        a = _cross(p2 - p1, t2) / den
+        return p1 + a[:, np.newaxis] * t1
+    if g1[0] == 'line':
+        _, p, t = g1
+        _, c, r = g2
+        k = len(p)
+        points, _ = xsectLineCirBatch(p, p + t, np.broadcast_to(c, (k, 2)), r)
+        return _nearest(points, v)
+    _, c1, r1 = g1
+    _, c2, r2 = g2
+    dc = c2 - c1
+    dist = np.hypot(*dc)
+    if dist == 0.0:
+        return np.full((len(r1), 2), np.nan)
+    a = (r1 * r1 - r2 * r2 + dist * dist) / (2.0 * dist)
+    with np.errstate(invalid='ignore'):
+        h = np.sqrt(r1 * r1 - a * a)
+    u = dc / dist
+    base = c1 + a[:, np.newaxis] * u
+    off = h[:, np.newaxis] * _rot90(u)
+    return _nearest(np.stack([base + off, base - off], axis=1), v)
+
+
+class _Builder(object):
+    """Collect output elements for k variants of a path.
+
+    Each element is (points, centers, kind, piece). points and centers are
+    (k, 2). piece is the index of the piece of the path the element came
+    from, or None for inserted elements. checks holds for each piece the
+    direction of its line or the sweep in degrees of its arc, the element
+    must not reverse or sweep further, see _segmentChecks().
+    """
+    def __init__(self, k, start, checks):
+        self.k = k
+        self.checks = checks
+        self.elements = [(start, None, KIND_POINT, None)]
+        self.bad = [set() for i in range(k)]
+    def add(self, points, kind, center=None, piece=None):
+        self.elements.append((points, center, kind, piece))
+    def collapse(self, piece, mask=None):
+        """Mark a piece as collapsed in the variants where mask is True, or
+        in every variant.
+        """
+        for v in range(self.k) if mask is None else np.flatnonzero(mask):
+            self.bad[v].add(piece)
+    def build(self):
+        """Check every variant.
+
+        Return (paths, bad). paths is a list of Path2d, None where a variant
+        isn't valid. bad is a list of the sets of pieces that collapsed or
+        reversed in each variant.
+        """
+        k = self.k
+        n = len(self.elements)
+        points = np.empty((k, n, 2))
+        centers = np.full((k, n, 2), np.nan)
+        kinds = np.array([e[2] for e in self.elements], dtype=np.int8)
+        bad = self.bad
+        valid = np.array([not b for b in bad], dtype=bool)
+        for i, (p, c, kind, piece) in enumerate(self.elements):
+            points[:, i] = p
+            if c is not None:
+                centers[:, i] = c
+            ok = ~np.isnan(p).any(axis=-1)
+            if piece is not None and i > 0:
+                prev = points[:, i - 1]
+                check = self.checks[piece]
+                with np.errstate(invalid='ignore'):
+                    if kind == KIND_POINT:
+                        # the line must not reverse
+                        ok &= ((p - prev) * check).sum(-1) >= -1e-12
+                    else:
+                        r = np.hypot(*(p - centers[:, i]).T)
+                        ok &= r > 0.0
+                        new = _sweep(centers[:, i], prev, p, kind)
+                        ok &= (new <= check + 1e-9) | \
+                            (np.abs(new - 360.0) < 1e-9)
+                for v in np.flatnonzero(~ok):
+                    bad[v].add(piece)
+            valid &= ok
+        return ([Path2d.fromArrays(points[i], centers[i], kinds)
+                 if valid[i] else None for i in range(k)], bad)
+
+
+def _segmentChecks(S, E, C, K):
+    """Return the _Builder checks of the segments.
+    """
+    return [E[j] - S[j] if K[j] == KIND_POINT else
+            _sweep(C[j], S[j], E[j], K[j]) for j in range(len(K))]
+
+def _dropCollapsed(build, m, k, ends=False):
+    """Build k variants of a path, leaving out pieces that collapse.
+
+    build -- build(active, variants) returns _Builder.build() of the
+             variants (an index array) made from the active pieces (a list
+             of indices in order)
+    m -- number of pieces in the path
+    ends -- if True the first and last pieces may go too
+
+    Every variant is built from every piece at once. Each that fails is
+    built again alone without its bad pieces, until it's valid or there's
+    nothing left to remove.
+
+    Return a list of Path2d or None.
+    """
+    paths, bad = build(range(m), np.arange(k))
+    for i in range(k):
+        active = range(m)
+        while paths[i] is None and bad[i]:
+            active = [j for j in active if j not in bad[i]]
+            if len(active) < 2 or \
+                    not ends and (active[0] != 0 or active[-1] != m - 1):
+                break
+            p, b = build(active, np.array([i]))
+            paths[i], bad[i] = p[0], b[0]
+    return paths
+
+
+def _dropDegenerate(path, axis=False):
+    """Remove zero length lines and zero sweep arcs from a built path and,
+    with axis, lines along X0.0 at its start and end.
+
+    Return a new Path2d, None if nothing is left off the axis.
+    """
+    if path is None:
+        return None
+    points, centers, kinds = path.arrays()
+    keep = [0]
+    for i in range(1, len(kinds)):
+        if np.hypot(*(points[i] - points[keep[-1]])) > POINT_EPS:
+            keep.append(i)
+    points, centers, kinds = points[keep], centers[keep], kinds[keep]
+    first, last = 0, len(kinds) - 1
+    if axis:
+        line = (np.abs(points[:-1, 0]) <= POINT_EPS) \
+            & (np.abs(points[1:, 0]) <= POINT_EPS) & (kinds[1:] == KIND_POINT)
+        while first < last and line[first]:
+            first += 1
+        while last > first and line[last - 1]:
+            last -= 1
+    points = points[first:last + 1]
+    centers = centers[first:last + 1]
+    kinds = kinds[first:last + 1]
+    if len(kinds) < 2 or ((np.abs(points[:, 0]) <= POINT_EPS).all()
+                          and (kinds == KIND_POINT).all()):
+        return None
+    centers[0] = np.nan
+    kinds[0] = KIND_POINT
+    return Path2d.fromArrays(points, centers, kinds)
+
+def _toAxis(p, t):
+    """Slide points p along t until x is 0.0.
+    """
+    if abs(t[0]) < TANGENT_EPS:
+        return p
+    u = -p[:, 0] / t[0]
+    return p + u[:, np.newaxis] * t
+
+def _arcToAxis(p, g, v):
+    """Move points p past X0.0 to where their arcs g cross it, the crossing
+    nearest v, the other ends of the arcs.
+    """
+    x = _intersect(('line', np.zeros_like(p), np.array([0.0, 1.0])), g, v)
+    return np.where((p[:, :1] < 0.0) & ~np.isnan(x), x, p)
+
+def _isTangent(t1, t2):
+    return abs(_cross(t1, t2)) < TANGENT_EPS and np.dot(t1, t2) > 0.0
+
+def _offsetPieces(segs, sign):
+    """Split the offset of a path by distances of one sign into pieces.
+
+    segs -- (S, E, C, K, R, ts, te), see _segments() and _tangents()
+    sign -- 1.0 or -1.0
+
+    Each segment is a piece, and so is the round join around each corner
+    that opens.
+
+    Return (pieces, checks). pieces is a list of (j, join) in order: segment
+    j for join None, else the join after it and its direction. checks are
+    the _Builder checks of the pieces.
+    """
+    S, E, C, K, R, ts, te = segs
+    segChecks = _segmentChecks(S, E, C, K)
+    pieces = []
+    checks = []
+    for j in range(len(K)):
+        pieces.append((j, None))
+        checks.append(segChecks[j])
+        if j == len(K) - 1 or _isTangent(te[j], ts[j + 1]):
+            continue
+        cross = _cross(te[j], ts[j + 1])
+        if cross * sign > 0.0:
+            kind = KIND_CCLW if cross > 0.0 else KIND_CLW
+            pieces.append((j, kind))
+            checks.append(_sweep(E[j], E[j] - _rot90(te[j]) * sign,
+                                 E[j] - _rot90(ts[j + 1]) * sign, kind))
+    return pieces, checks
+
+def _offsetSameSign(segs, d, axis, pieces, checks, active):
+    """Offset a path by distances of one sign.
+
+    segs -- (S, E, C, K, R, ts, te), see _segments() and _tangents()
+    pieces, checks -- see _offsetPieces()
+    active -- indices of the pieces kept, in order, see _dropCollapsed()
+
+    Return _Builder.build() of the variants.
+    """
+    S, E, C, K, R, ts, te = segs
+    dd = d[:, np.newaxis]
+    # (start, end, geometry, kind, center) of each piece
+    geoms = {}
+    for i in active:
+        j, join = pieces[i]
+        if join is None:
+            s, e, g = _offsetGeom(S, E, C, K, R, j, d)
+            geoms[i] = (s, e, g, int(K[j]), C[j] if K[j] else None)
+        else:
+            # the right side normals times d
+            geoms[i] = (E[j] - dd * _rot90(te[j]),
+                        E[j] - dd * _rot90(ts[j + 1]),
+                        ('arc', E[j], np.abs(d)), join,
+                        np.broadcast_to(E[j], (len(d), 2)))
+    first = active[0]
+    start = geoms[first][0]
+    if axis and S[0][0] == 0.0:
+        g = geoms[first][2]
+        start = _toAxis(start, g[2]) if g[0] == 'line' else \
+            _arcToAxis(start, g, geoms[first][1])
+    b = _Builder(len(d), start, checks)
+    if axis:
+        # pieces beyond the axis are ground away
+        for i in active:
+            s, e = geoms[i][:2]
+            b.collapse(i, (s[:, 0] < -1e-12) & (e[:, 0] < -1e-12))
+    for i, nxt in zip(active, active[1:] + [None]):
+        s, e, g, kind, center = geoms[i]
+        j, join = pieces[i]
+        if nxt is None:
+            if axis and E[-1][0] == 0.0:
+                e = _toAxis(e, g[2]) if g[0] == 'line' else \
+                    _arcToAxis(e, g, geoms[i][0])
+            b.add(e, kind, center, i)
+            break
+        if nxt == i + 1:
+            if join is not None or pieces[nxt][1] is not None or \
+                    _isTangent(te[j], ts[j + 1]):
+                # round joins start and end where the segments do
+                b.add(e, kind, center, i)
+                continue
+            # the corner overlaps, trim both segments
+            x = _intersect(g, geoms[nxt][2], E[j])
+        else:
+            # the pieces between collapsed, trim the neighbours to meet
+            x = _intersect(g, geoms[nxt][2], (e + geoms[nxt][0]) * 0.5)
+            if np.isnan(x).all():
+                joins = [p for p in (i, nxt) if pieces[p][1] is not None]
+                for p in joins:
+                    # the neighbour passes by the round join, drop it too
+                    b.collapse(p)
+                # or they're parallel, bridge the gap
+                b.add(e, kind, center, i)
+                b.add(geoms[nxt][0], KIND_POINT)
+                continue
+        b.add(x, kind, center, i)
+        geoms[nxt] = (x,) + geoms[nxt][1:]
+    return b.build()
+
+def offsetMany(path, distances, axis=False):
+    """Offset a path by many distances.
+
+    path -- Path2d
+    distances -- sequence of distances, positive to the right of the
+                 direction of travel
+    axis -- if True and the path starts or ends on X0.0, the offset path
+            starts or ends on X0.0 too, a line is extended or trimmed along
+            its direction, an arc is trimmed, and pieces that end up past
+            X0.0 are left out
+
+    Segments and round joins that collapse or reverse are left out, see
+    _dropCollapsed(), the tip of a small drill ground away leaves the
+    point of its body. Pieces left with no length are removed, and with
+    axis the lines left along X0.0 at either end, a shank ground down to
+    nothing.
+
+    Return a list of Path2d, None where the whole offset degenerates, no
+    piece is left off the axis.
+    """
+    d = np.asarray(distances, dtype=np.float64).ravel()
+    result = [None] * len(d)
+    for i in np.flatnonzero(d == 0.0):
+        result[i] = Path2d.fromArrays(*path.arrays())
+    S, E, C, K, R = _segments(path)
+    segs = (S, E, C, K, R) + _tangents(S, E, C, K)
+    for mask in (d > 0.0, d < 0.0):
+        idx = np.flatnonzero(mask)
+        if len(idx):
+            pieces, checks = _offsetPieces(segs, np.sign(d[idx[0]]))
+            build = lambda active, v: _offsetSameSign(segs, d[idx][v], axis,
+                                                      pieces, checks, active)
+            paths = _dropCollapsed(build, len(pieces), len(idx), True)
+            for i, p in zip(idx, paths):
+                result[i] = _dropDegenerate(p, axis)
+    return result
+
+def offset(path, distance, axis=False):
+    """Offset a path, see offsetMany().
+
+    Raise PathOpsException if the offset is not valid.
+
+    Return a new Path2d.
+    """
+    p = offsetMany(path, [distance], axis)[0]
+    if p is None:
+        raise PathOpsException('path collapses at offset {}' \
+                                   .format(distance))
+    return p
+
+def corners(path):
+    """Return the indices of the elements that end at a corner, a joint that
+    is not tangent.
+    """
+    S, E, C, K, R = _segments(path)
+    ts, te = _tangents(S, E, C, K)
+    cross = _cross(te[:-1], ts[1:])
+    dot = (te[:-1] * ts[1:]).sum(-1)
+    tangent = (np.abs(cross) < TANGENT_EPS) & (dot > 0.0)
+    return [int(i) + 1 for i in np.flatnonzero(~tangent)]
+
+def filletMany(path, radii, indices=None):
+    """Round corners with many radii.
+
+    path -- Path2d
+    radii -- sequence of fillet radii > 0.0
+    indices -- element indices of the corners to round (see corners()), None
+               for every corner
+
+    A fillet wider than a segment rounds the corner of that segment's
+    neighbours instead, see _dropCollapsed(). Parallel neighbours are joined
+    by a line, unrounded.
+
+    Return a list of Path2d, None where the fillets don't fit.
+    """
+    rad = np.asarray(radii, dtype=np.float64).ravel()
+    if (rad <= 0.0).any():
+        raise PathOpsException('fillet radius must be > 0.0')
+    S, E, C, K, R = _segments(path)
+    segs = (S, E, C, K, R) + _tangents(S, E, C, K)
+    rounded = set(corners(path) if indices is None else indices)
+    build = lambda active, v: _filletActive(segs, rad[v], rounded, active)
+    return [_dropDegenerate(p) for p in _dropCollapsed(build, len(K),
+                                                        len(rad))]
+
+def _filletActive(segs, rad, rounded, active):
+    """Round corners of a path with many radii.
+
+    segs -- (S, E, C, K, R, ts, te), see _segments() and _tangents()
+    rounded -- element indices of the corners to round
+    active -- indices of the segments kept, in order, see _dropCollapsed()
+
+    The corner where two kept segments meet is rounded if any corner
+    between them is.
+
+    Return _Builder.build() of the variants.
+    """
+    S, E, C, K, R, ts, te = segs
+    k = len(rad)
+    b = _Builder(k, np.broadcast_to(S[0], (k, 2)).copy(),
+                 _segmentChecks(S, E, C, K))
+    for j, nxt in zip(active, active[1:] + [None]):
+        center = C[j] if K[j] else None
+        if nxt is None or not rounded.intersection(range(j + 1, nxt + 1)):
+            if nxt is None or nxt == j + 1:
+                b.add(np.broadcast_to(E[j], (k, 2)).copy(), int(K[j]),
+                      center, j)
+            else:
+                # the segments between collapsed, meet where the
+                # neighbours cross
+                zero = np.zeros(k)
+                _, _, g1 = _offsetGeom(S, E, C, K, R, j, zero)
+                _, _, g2 = _offsetGeom(S, E, C, K, R, nxt, zero)
+                x = _intersect(g1, g2, (E[j] + S[nxt]) * 0.5)
+                if np.isnan(x).all():
+                    _bridge(b, S, E, C, K, j, nxt)
+                else:
+                    b.add(x, int(K[j]), center, j)
+            continue
+        cross = _cross(te[j], ts[nxt])
+        # the fillet center is inside the corner
+        d = rad if cross < 0.0 else -rad
+        _, _, g1 = _offsetGeom(S, E, C, K, R, j, d)
+        _, _, g2 = _offsetGeom(S, E, C, K, R, nxt, d)
+        x = _intersect(g1, g2, (E[j] + S[nxt]) * 0.5)
+        if nxt != j + 1 and np.isnan(x).all():
+            # the neighbours are parallel, there's no room for a fillet
+            _bridge(b, S, E, C, K, j, nxt)
+            continue
+        t1 = _tangentPoint(S, E, C, K, R, j, x)
+        t2 = _tangentPoint(S, E, C, K, R, nxt, x)
+        b.add(t1, int(K[j]), center, j)
+        b.add(t2, KIND_CCLW if cross > 0.0 else KIND_CLW, x)
+    return b.build()
+
+def _bridge(b, S, E, C, K, j, nxt):
+    """Join segments j and nxt of a fillet with a line.
+    """
+    k = b.k
+    b.add(np.broadcast_to(E[j], (k, 2)).copy(), int(K[j]),
+          C[j] if K[j] else None, j)
+    b.add(np.broadcast_to(S[nxt], (k, 2)).copy(), KIND_POINT)
+
+def _tangentPoint(S, E, C, K, R, j, x):
+    """Return the points on segment j nearest the fillet centers x.
+    """
+    if K[j] == KIND_POINT:
+        t = _unit(E[j] - S[j])
+        u = ((x - S[j]) * t).sum(-1)
+        return S[j] + u[:, np.newaxis] * t
+    return C[j] + _unit(x - C[j]) * R[j]
+
+def fillet(path, radius, indices=None):
+    """Round corners, see filletMany().
+
+    Raise PathOpsException if the fillet doesn't fit.
+
+    Return a new Path2d.
+    """
+    p = filletMany(path, [radius], indices)[0]
+    if p is None:
+        raise PathOpsException('fillet radius {} does not fit' \
+                                   .format(radius))
+    return p
+
+def _douglasPeucker(points, tol):
+    """Return a bool mask of the points to keep.
+    """
+    n = len(points)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
+        a = points[i]
+        v = points[j] - a
+        w = points[i + 1:j] - a
+        length = np.hypot(*v)
+        if length == 0.0:
+            dist = np.hypot(*w.T)
+        else:
+            dist = np.abs(_cross(v, w)) / length
+        k = int(np.argmax(dist))
+        if dist[k] > tol:
+            k += i + 1
+            keep[k] = True
+            stack.append((i, k))
+            stack.append((k, j))
+    return keep
+
+def simplify(path, tol):
+    """Remove points that are within tol of the simplified path.
+
+    path -- Path2d
+    tol -- maximum distance of a removed point from the new path
+
+    Only runs of line segments are simplified, arcs and their end points are
+    kept.
+
+    Return a new Path2d.
+    """
+    points, centers, kinds = path.arrays()
+    keep = np.ones(len(kinds), dtype=bool)
+    # element i is an anchor if it's the start, the end, an arc end point or
+    # the start point of an arc
+    anchor = kinds != KIND_POINT
+    anchor[:-1] |= kinds[1:] != KIND_POINT
+    anchor[0] = anchor[-1] = True
+    idx = np.flatnonzero(anchor)
+    for i, j in zip(idx[:-1], idx[1:]):
+        if j - i > 1:
+            keep[i:j + 1] = _douglasPeucker(points[i:j + 1], tol)
+    return Path2d.fromArrays(points[keep], centers[keep], kinds[keep])
+
+
+if __name__ == '__main__':
+    import sys
+    import warnings
+
+    from clearance import Envelope
+
+    warnings.simplefilter('error')
+    # a flat end mill with a narrower shank
+    p = Path2d([0.0, 0.0])
+    for x, y in ((0.25, 0.0), (0.25, 1.0), (0.2, 1.0), (0.2, 3.0), (0.0, 3.0)):
+        p.lineTo(x, y)
+    failed = 0
+    for d in (0.05, -0.1, -0.2, -0.25):
+        q = offset(p, d, axis=True) if d != -0.25 else \
+            offsetMany(p, [d], axis=True)[0]
+        if d == -0.25:
+            # ground to nothing
+            if q is not None:
+                failed += 1
+                print 'FAIL offset {} is not None'.format(d)
+            continue
+        points, centers, kinds = q.arrays()
+        short = np.hypot(*(points[1:] - points[:-1]).T).min()
+        q.joints()
+        radius = Envelope(*q.arrays()).maxRadius()
+        if short <= POINT_EPS or abs(radius - points[:, 0].max()) > 1e-12:
+            failed += 1
+            print 'FAIL offset {}: shortest piece {}, radius {}'.format(
+                d, short, radius)
+        if d == -0.2 and tuple(points[-1]) != (0.0, 1.0):
+            # the shank is gone, the path ends at the shoulder
+            failed += 1
+            print 'FAIL offset {} ends at {}'.format(d, points[-1])
+    print '{} failures'.format(failed)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,169 @@
+#!/usr/bin/python -t
+# -*- coding: utf-8 -*-
+
+"""profilecache.py
+
+A session wide cache of tool profiles.
+
+Tools are keyed by the class that builds their profile and their geometry
+specs (see ToolDef.profileKey()). The name and metric flag are not part of the
+key, toggling a tool between inch and metric does not change its profile, it
+only changes how the profile's numbers are interpreted.
+
+Each ProfileEntry holds the Path2d and the mirrored QPainterPath built by
+ToolDef._buildProfile(). Anything else computed from a profile (meshes, inch
+conversions, exports) should be stored with derived() so every unique geometry
+is computed once per session, no matter how many tools or views use it.
+
+Sunday, October 18 2026
+"""
+
+from collections import OrderedDict
+
+from path2d import KIND_POINT, KIND_CCLW
+from strutil import toInch
+
+
+class ProfileEntry(object):
+    """A cached tool profile and everything derived from it.
+
+    path2d -- Path2d, the right side of the profile
+    painterPath -- QPainterPath, both sides of the profile plus any extra
+                   display lines
+    shankStep -- -1, 0, or 1, see ToolDef._shankStep
+
+    The path2d and painterPath are shared by every tool with the same key and
+    must not be modified.
+    """
+    __slots__ = ('path2d', 'painterPath', 'shankStep', '_derived')
+    def __init__(self, path2d, painterPath, shankStep=0):
+        self.path2d = path2d
+        self.painterPath = painterPath
+        self.shankStep = shankStep
+        self._derived = {}
+    def derived(self, name, fn):
+        """Return a value computed from this profile.
+
+        name -- hashable key, unique to the value's type and any options it
+                depends on, ('mesh', True) for instance
+        fn -- callable with no arguments, called only if name is not cached
+        """
+        try:
+            return self._derived[name]
+        except KeyError:
+            value = self._derived[name] = fn()
+            return value
+    def inchProfile(self, metric):
+        """Return the InchProfile of this profile, derived under
+        ('inch', metric).
+
+        metric -- True if the profile is in millimeters
+        """
+        return self.derived(('inch', metric),
+                            lambda: InchProfile(self.path2d,
+                                                toInch(1.0, metric)))
+    def clearDerived(self):
+        self._derived.clear()
+
+
+class InchProfile(object):
+    """A profile converted to inches, the unit meshes and exports work in.
+
+    path2d -- Path2d in the tool's units
+    scale -- 1.0 for inch tools, 1 / 25.4 for metric tools
+
+    Built once per profile and unit, see ToolDef.inchProfile(). The arrays and
+    lists returned are shared and must not be modified.
+    """
+    __slots__ = ('points', 'centers', 'kinds', '_joints', '_elements',
+                 '_parts')
+    def __init__(self, path2d, scale=1.0):
+        if scale == 1.0:
+            # the cached Path2d is never modified, share its arrays
+            self.points, self.centers, self.kinds = path2d.arrays()
+        else:
+            self.points, self.centers, self.kinds = path2d.toArrays(scale)
+        # the classification doesn't depend on scale, share the path's
+        self._joints = path2d.joints()
+        self._elements = None
+        self._parts = {}
+    def __len__(self):
+        return len(self.kinds)
+    def elements(self):
+        """Return the profile as a list of Path2d style elements.
+
+        Points are (x, y), arcs are ((ex, ey), (cx, cy), 'cclw' | 'clw').
+        """
+        if self._elements is None:
+            self._elements = [tuple(p) if k == KIND_POINT
+                              else (tuple(p), tuple(c),
+                                    'cclw' if k == KIND_CCLW else 'clw')
+                              for p, c, k in zip(self.points.tolist(),
+                                                 self.centers.tolist(),
+                                                 self.kinds)]
+        return self._elements
+    def part(self, start, stop):
+        """Return elements()[start:stop], the list is built once.
+        """
+        try:
+            return self._parts[start, stop]
+        except KeyError:
+            p = self._parts[start, stop] = self.elements()[start:stop]
+            return p
+    def arrays(self, start=None, stop=None):
+        """Return (points, centers, kinds) views of elements start to stop.
+        """
+        s = slice(start, stop)
+        return self.points[s], self.centers[s], self.kinds[s]
+    def joints(self, start=None, stop=None):
+        """Return a view of the JOINT_* class of elements start to stop.
+
+        See path2d.classifyJoints(). The ends of the whole profile are
+        JOINT_END, the ends of a part are whatever they join in the profile.
+        """
+        return self._joints[start:stop]
+
+
+class ProfileCache(object):
+    """A least recently used map of profile keys to ProfileEntry instances.
+
+    maxEntries -- the least recently used entry is dropped once the cache holds
+                  more than this many entries
+    """
+    def __init__(self, maxEntries=256):
+        self.maxEntries = maxEntries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    def __len__(self):
+        return len(self._entries)
+    def __contains__(self, key):
+        return key in self._entries
+    def get(self, key, buildFn):
+        """Find the entry for key.
+
+        key -- hashable profile key
+        buildFn -- callable with no arguments returning a new ProfileEntry,
+                   called only if key is not cached
+
+        Return a ProfileEntry.
+        """
+        try:
+            entry = self._entries.pop(key)
+            self.hits += 1
+        except KeyError:
+            entry = buildFn()
+            self.misses += 1
+            if len(self._entries) >= self.maxEntries:
+                self._entries.popitem(last=False)
+        # most recently used is last
+        self._entries[key] = entry
+        return entry
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# shared by every ToolDef, view, mesh builder and exporter
+profileCache = ProfileCache()
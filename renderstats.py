@@ -0,0 +1,207 @@
+#!/usr/bin/python -t
+# -*- coding: utf-8 -*-
+
+"""renderstats.py
+
+Frame timing and mesh counts for the MeshView overlay.
+
+RenderStats keeps the last few hundred frames. For each frame it records:
+ * cpu -- milliseconds spent in paintGL()
+ * render -- milliseconds of that spent in Mesh.render()/renderBatched()
+ * gpu -- milliseconds the GPU took, from GL_TIME_ELAPSED queries, if the
+          driver has them
+ * interval -- milliseconds since the previous frame finished
+
+Query results are read a few frames late so the CPU never waits on the GPU.
+The rolling window can be written to JSON with a histogram of each series.
+
+Sunday, October 18 2026
+"""
+
+import time
+import json
+from collections import deque
+
+import numpy as np
+import OpenGL.GL as gl
+import OpenGL.error
+
+# histogram bin edges, milliseconds
+BIN_EDGES = (0.0, 2.0, 4.0, 6.0, 8.0, 12.0, 16.0, 20.0, 25.0, 33.0, 50.0,
+             66.0, 100.0, 200.0, float('inf'))
+
+
+class GpuTimer(object):
+    """A ring of GL_TIME_ELAPSED queries.
+
+    Must be created with the GL context current, see create().
+    """
+    def __init__(self, count=4):
+        self._queries = [int(q) for q in np.ravel(gl.glGenQueries(count))]
+        # queries begun and not read yet, oldest first
+        self._waiting = deque()
+        self._free = deque(self._queries)
+    @staticmethod
+    def create(count=4):
+        """Return a GpuTimer, or None if the context has no timer queries.
+        """
+        try:
+            version = gl.glGetString(gl.GL_VERSION) or ''
+            extensions = gl.glGetString(gl.GL_EXTENSIONS) or ''
+            major, minor = [int(v) for v in version.split()[0].split('.')[:2]]
+            if (major, minor) < (3, 3) and \
+                    'GL_ARB_timer_query' not in extensions and \
+                    'GL_EXT_timer_query' not in extensions:
+                return None
+            return GpuTimer(count)
+        except (ValueError, IndexError, OpenGL.error.Error):
+            return None
+    def begin(self):
+        """Start timing. Does nothing if every query is still in flight.
+
+        Return True if a query was begun.
+        """
+        if not self._free:
+            return False
+        q = self._free.popleft()
+        gl.glBeginQuery(gl.GL_TIME_ELAPSED, q)
+        self._waiting.append(q)
+        return True
+    def end(self):
+        gl.glEndQuery(gl.GL_TIME_ELAPSED)
+    def poll(self):
+        """Return the milliseconds of each finished query, oldest first.
+        """
+        times = []
+        while self._waiting:
+            q = self._waiting[0]
+            if not gl.glGetQueryObjectiv(q, gl.GL_QUERY_RESULT_AVAILABLE):
+                break
+            ns = gl.glGetQueryObjectuiv(q, gl.GL_QUERY_RESULT)
+            times.append(int(ns) / 1e6)
+            self._free.append(self._waiting.popleft())
+        return times
+
+
+class RenderStats(object):
+    """Rolling frame statistics.
+
+    window -- number of frames kept
+
+    Call initializeGL() from the view's initializeGL(), then for each frame
+    beginFrame(), beginRender(), endRender() around the mesh draw and
+    endFrame().
+    """
+    def __init__(self, window=240):
+        self.cpuMs = deque(maxlen=window)
+        self.renderMs = deque(maxlen=window)
+        self.gpuMs = deque(maxlen=window)
+        self.intervalMs = deque(maxlen=window)
+        # counts of the last frame drawn
+        self.triangles = 0
+        self.vertices = 0
+        self.drawCalls = 0
+        self.patches = 0
+        self.culled = 0
+        self.segs = None
+        self.buildMs = 0.0
+        self._gpu = None
+        self._timing = False
+        self._frameStart = None
+        self._renderStart = None
+        self._lastFrameEnd = None
+    def initializeGL(self):
+        self._gpu = GpuTimer.create()
+    def hasGpuTimer(self):
+        return self._gpu is not None
+    def beginFrame(self):
+        self._frameStart = time.time()
+        if self._gpu:
+            self._timing = self._gpu.begin()
+    def beginRender(self):
+        self._renderStart = time.time()
+    def endRender(self, mesh, drawCalls):
+        """Record the time spent drawing mesh and its counts.
+
+        mesh -- the Mesh or assembly.Assembly drawn
+        drawCalls -- returned by Mesh.render() or Mesh.renderBatched()
+        """
+        self.renderMs.append((time.time() - self._renderStart) * 1000.0)
+        self.triangles = mesh.triangleCount()
+        self.vertices = mesh.vertexCount()
+        self.drawCalls = drawCalls
+        self.patches = mesh.patchCount()
+        self.culled = getattr(mesh, 'culled', 0)
+        self.segs = getattr(mesh, 'segs', None)
+        self.buildMs = mesh.buildMs
+    def endFrame(self):
+        now = time.time()
+        if self._timing:
+            self._gpu.end()
+            self._timing = False
+        if self._gpu:
+            self.gpuMs.extend(self._gpu.poll())
+        self.cpuMs.append((now - self._frameStart) * 1000.0)
+        if self._lastFrameEnd is not None:
+            self.intervalMs.append((now - self._lastFrameEnd) * 1000.0)
+        self._lastFrameEnd = now
+    def clear(self):
+        for series in (self.cpuMs, self.renderMs, self.gpuMs,
+                       self.intervalMs):
+            series.clear()
+        self._lastFrameEnd = None
+    @staticmethod
+    def _mean(series):
+        return sum(series) / len(series) if series else 0.0
+    def lines(self):
+        """Return the overlay text, a list of strings.
+        """
+        interval = self._mean(self.intervalMs)
+        lines = ['cpu {:.2f} ms  render {:.2f} ms'.format(
+                     self._mean(self.cpuMs), self._mean(self.renderMs)),
+                 'gpu {}'.format('{:.2f} ms'.format(self._mean(self.gpuMs))
+                                 if self._gpu else 'n/a'),
+                 'frame {:.1f} ms  ({:.0f} fps)'.format(
+                     interval, 1000.0 / interval if interval else 0.0),
+                 'tris {}  verts {}  calls {}  culled {}'.format(
+                     self.triangles, self.vertices, self.drawCalls,
+                     self.culled),
+                 'patches {}  segs {}  build {:.1f} ms'.format(
+                     self.patches, self.segs, self.buildMs)]
+        return lines
+    @staticmethod
+    def histogram(series):
+        """Return the count of series values in each BIN_EDGES bin.
+        """
+        counts, _ = np.histogram(np.asarray(series, dtype=np.float64),
+                                 bins=BIN_EDGES)
+        return counts.tolist()
+    def toDict(self):
+        """Return the window and its histograms as a JSON-able dict.
+        """
+        series = {}
+        for name in ('cpuMs', 'renderMs', 'gpuMs', 'intervalMs'):
+            values = list(getattr(self, name))
+            series[name] = {
+                'values': values,
+                'mean': self._mean(values),
+                'p95': float(np.percentile(values, 95)) if values else 0.0,
+                'max': max(values) if values else 0.0,
+                'histogram': self.histogram(values)}
+        return {'binEdges': [e if e != float('inf') else None
+                             for e in BIN_EDGES],
+                'gpuTimer': self.hasGpuTimer(),
+                'triangles': self.triangles,
+                'vertices': self.vertices,
+                'drawCalls': self.drawCalls,
+                'patches': self.patches,
+                'culled': self.culled,
+                'segs': self.segs,
+                'buildMs': self.buildMs,
+                'series': series}
+    def save(self, fileName):
+        """Write toDict() to a JSON file.
+        """
+        f = open(fileName, 'w')
+        json.dump(self.toDict(), f, indent=1)
+        f.close()
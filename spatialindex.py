@@ -0,0 +1,376 @@
+#!/usr/bin/python -t
+# -*- coding: utf-8 -*-
+
+"""spatialindex.py
+
+An R-tree of keyed bounding boxes for hit testing and snapping.
+
+Entries are inserted and deleted one at a time, so the tree can be kept in
+step with geometry that changes a little at a time (a tool's profile after a
+dimension edit). Two queries are supported:
+ * window -- every entry whose box intersects a rectangle
+ * nearest -- entries in order of distance from a point, best first
+
+Boxes are (minX, minY, maxX, maxY) tuples. Nodes are split with Guttman's
+quadratic split. Deleted entries whose leaf underflows are reinserted.
+
+profileEntries() builds the entries for a Path2d's line and arc segments and
+segmentDistance() is the matching exact distance function for nearest().
+
+Sunday, October 18 2026
+"""
+
+import heapq
+from math import hypot, atan2, degrees, radians, sin, cos
+
+
+class SpatialIndexException(Exception):
+    pass
+
+
+def boxUnion(a, b):
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+def boxArea(b):
+    return (b[2] - b[0]) * (b[3] - b[1])
+
+def boxIntersects(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+def boxDistance(b, x, y):
+    """Return the distance from (x, y) to the box, 0.0 if inside.
+    """
+    dx = max(b[0] - x, 0.0, x - b[2])
+    dy = max(b[1] - y, 0.0, y - b[3])
+    return hypot(dx, dy)
+
+
+class _Entry(object):
+    __slots__ = ('key', 'bbox', 'data')
+    def __init__(self, key, bbox, data):
+        self.key = key
+        self.bbox = bbox
+        self.data = data
+
+
+class _Node(object):
+    __slots__ = ('level', 'children', 'bbox', 'parent')
+    def __init__(self, level, children=None):
+        # 0 for leaves, their children are _Entry instances
+        self.level = level
+        self.children = children or []
+        self.bbox = None
+        self.parent = None
+        for c in self.children:
+            if level:
+                c.parent = self
+        self.updateBox()
+    def updateBox(self):
+        b = None
+        for c in self.children:
+            b = c.bbox if b is None else boxUnion(b, c.bbox)
+        self.bbox = b
+
+
+class SpatialIndex(object):
+    """A dynamic R-tree.
+
+    maxEntries -- node capacity, nodes are split when they exceed it
+    """
+    def __init__(self, maxEntries=8):
+        if maxEntries < 4:
+            raise SpatialIndexException('maxEntries must be >= 4')
+        self.maxEntries = maxEntries
+        self.minEntries = max(2, int(maxEntries * 0.4))
+        self.clear()
+    def clear(self):
+        self._root = _Node(0)
+        # key -> leaf node holding the entry
+        self._leaves = {}
+    def __len__(self):
+        return len(self._leaves)
+    def __contains__(self, key):
+        return key in self._leaves
+    def _entry(self, key):
+        for e in self._leaves[key].children:
+            if e.key == key:
+                return e
+    def bbox(self, key):
+        """Return the box of the entry with the given key, or None.
+        """
+        if key not in self._leaves:
+            return None
+        return self._entry(key).bbox
+    def data(self, key):
+        """Return the data of the entry with the given key.
+        """
+        return self._entry(key).data
+    def insert(self, key, bbox, data=None):
+        """Add an entry, replacing any entry with the same key.
+
+        key -- hashable
+        bbox -- (minX, minY, maxX, maxY)
+        data -- anything, returned by the queries
+        """
+        if key in self._leaves:
+            e = self._entry(key)
+            if e.bbox == tuple(bbox):
+                e.data = data
+                return
+            self.delete(key)
+        self._insert(_Entry(key, tuple(bbox), data))
+    def _insert(self, entry):
+        # descend to the leaf whose box grows the least
+        node = self._root
+        while node.level:
+            best = None
+            for c in node.children:
+                area = boxArea(c.bbox)
+                grow = boxArea(boxUnion(c.bbox, entry.bbox)) - area
+                if best is None or (grow, area) < best[0]:
+                    best = ((grow, area), c)
+            node = best[1]
+        node.children.append(entry)
+        self._leaves[entry.key] = node
+        # split and grow boxes on the way back up
+        while node is not None:
+            sibling = None
+            if len(node.children) > self.maxEntries:
+                sibling = self._split(node)
+            else:
+                node.bbox = entry.bbox if node.bbox is None \
+                    else boxUnion(node.bbox, entry.bbox)
+            parent = node.parent
+            if sibling is not None:
+                if parent is None:
+                    self._root = parent = _Node(node.level + 1,
+                                                [node, sibling])
+                else:
+                    parent.children.append(sibling)
+                    sibling.parent = parent
+                    parent.updateBox()
+            node = parent
+    def _split(self, node):
+        """Split node's children between node and a new sibling.
+
+        Return the sibling.
+        """
+        children = node.children
+        # seeds, the pair that would waste the most area together
+        worst = None
+        for i in range(len(children)):
+            for j in range(i + 1, len(children)):
+                a, b = children[i].bbox, children[j].bbox
+                d = boxArea(boxUnion(a, b)) - boxArea(a) - boxArea(b)
+                if worst is None or d > worst[0]:
+                    worst = (d, i, j)
+        _, i, j = worst
+        groups = [[children[i]], [children[j]]]
+        boxes = [children[i].bbox, children[j].bbox]
+        rest = [c for k, c in enumerate(children) if k != i and k != j]
+        while rest:
+            # fill a group that needs every remaining child to reach the min
+            for g in (0, 1):
+                if len(groups[g]) + len(rest) == self.minEntries:
+                    groups[g].extend(rest)
+                    for c in rest:
+                        boxes[g] = boxUnion(boxes[g], c.bbox)
+                    rest = []
+                    break
+            if not rest:
+                break
+            # the child with the strongest preference goes next
+            best = None
+            for k, c in enumerate(rest):
+                d0 = boxArea(boxUnion(boxes[0], c.bbox)) - boxArea(boxes[0])
+                d1 = boxArea(boxUnion(boxes[1], c.bbox)) - boxArea(boxes[1])
+                if best is None or abs(d0 - d1) > best[0]:
+                    best = (abs(d0 - d1), k, 0 if (d0, len(groups[0]))
+                            < (d1, len(groups[1])) else 1)
+            _, k, g = best
+            c = rest.pop(k)
+            groups[g].append(c)
+            boxes[g] = boxUnion(boxes[g], c.bbox)
+        node.children = groups[0]
+        node.bbox = boxes[0]
+        sibling = _Node(node.level, groups[1])
+        if node.level:
+            for c in node.children:
+                c.parent = node
+        else:
+            for e in sibling.children:
+                self._leaves[e.key] = sibling
+        return sibling
+    def delete(self, key):
+        """Remove the entry with the given key.
+
+        Return True if it was found.
+        """
+        node = self._leaves.pop(key, None)
+        if node is None:
+            return False
+        node.children = [e for e in node.children if e.key != key]
+        # drop underfull nodes on the way up, keep their entries
+        orphans = []
+        while node.parent is not None:
+            parent = node.parent
+            if len(node.children) < self.minEntries:
+                parent.children.remove(node)
+                orphans.append(node)
+            else:
+                node.updateBox()
+            node = parent
+        node.updateBox()
+        while self._root.level and len(self._root.children) == 1:
+            self._root = self._root.children[0]
+            self._root.parent = None
+        if self._root.level and not self._root.children:
+            self._root = _Node(0)
+        for n in orphans:
+            for e in self._iterEntries(n):
+                self._insert(e)
+        return True
+    def _iterEntries(self, node):
+        stack = [node]
+        while stack:
+            n = stack.pop()
+            if n.level:
+                stack.extend(n.children)
+            else:
+                for e in n.children:
+                    yield e
+    def window(self, bbox):
+        """Find the entries whose boxes intersect bbox.
+
+        Return a list of (key, data).
+        """
+        found = []
+        if self._root.bbox is None:
+            return found
+        stack = [self._root]
+        while stack:
+            n = stack.pop()
+            for c in n.children:
+                if boxIntersects(c.bbox, bbox):
+                    if n.level:
+                        stack.append(c)
+                    else:
+                        found.append((c.key, c.data))
+        return found
+    def nearest(self, x, y, count=1, maxDist=None, distFn=None, accept=None):
+        """Find the entries closest to a point.
+
+        x, y -- the point
+        count -- maximum number of entries to return
+        maxDist -- ignore entries farther than this, None for no limit
+        distFn -- distFn(data, x, y), the exact distance to an entry. It must
+                  not be less than the distance to the entry's box. If None
+                  the box distance is used.
+        accept -- accept(key, data), return False to skip an entry
+
+        Return a list of (distance, key, data) sorted by distance.
+        """
+        found = []
+        if self._root.bbox is None:
+            return found
+        # (distance, tie breaker, is an entry, node or entry)
+        heap = [(boxDistance(self._root.bbox, x, y), 0, False, self._root)]
+        tie = 1
+        while heap and len(found) < count:
+            d, _, isEntry, item = heapq.heappop(heap)
+            if maxDist is not None and d > maxDist:
+                break
+            if isEntry:
+                found.append((d, item.key, item.data))
+                continue
+            for c in item.children:
+                if item.level:
+                    cd = boxDistance(c.bbox, x, y)
+                else:
+                    if accept is not None and not accept(c.key, c.data):
+                        continue
+                    cd = distFn(c.data, x, y) if distFn \
+                        else boxDistance(c.bbox, x, y)
+                heapq.heappush(heap, (cd, tie, not item.level, c))
+                tie += 1
+        return found
+
+
+def _angleOnArc(a, start, span):
+    """Return True if angle a (degrees) is within the arc's sweep.
+    """
+    if span < 0.0:
+        start, span = start + span, -span
+    return (a - start) % 360.0 <= span
+
+def arcBox(cx, cy, r, start, span):
+    """Return the box of an arc.
+
+    start, span -- signed start and sweep angles in degrees
+    """
+    sa = radians(start)
+    ea = radians(start + span)
+    xs = [cx + r * cos(sa), cx + r * cos(ea)]
+    ys = [cy + r * sin(sa), cy + r * sin(ea)]
+    # quadrant points swept by the arc
+    for a, px, py in ((0.0, cx + r, cy), (90.0, cx, cy + r),
+                      (180.0, cx - r, cy), (270.0, cx, cy - r)):
+        if _angleOnArc(a, start, span):
+            xs.append(px)
+            ys.append(py)
+    return (min(xs), min(ys), max(xs), max(ys))
+
+def segmentDistance(seg, x, y):
+    """Return the distance from (x, y) to a segment from profileEntries().
+    """
+    if seg[0] == 'line':
+        _, x1, y1, x2, y2 = seg
+        dx = x2 - x1
+        dy = y2 - y1
+        ll = dx * dx + dy * dy
+        t = 0.0 if ll == 0.0 else \
+            min(1.0, max(0.0, ((x - x1) * dx + (y - y1) * dy) / ll))
+        return hypot(x - (x1 + t * dx), y - (y1 + t * dy))
+    _, cx, cy, r, start, span = seg
+    if _angleOnArc(degrees(atan2(y - cy, x - cx)), start, span):
+        return abs(hypot(x - cx, y - cy) - r)
+    sa = radians(start)
+    ea = radians(start + span)
+    return min(hypot(x - cx - r * cos(sa), y - cy - r * sin(sa)),
+               hypot(x - cx - r * cos(ea), y - cy - r * sin(ea)))
+
+def profileEntries(path2d, keyPrefix=()):
+    """Describe each segment of a path for a SpatialIndex.
+
+    path2d -- Path2d
+    keyPrefix -- tuple prepended to each key
+
+    Return a list of (key, bbox, segment). key is keyPrefix + (i,) where i is
+    the index of the segment's end element. segment is
+    ('line', x1, y1, x2, y2) or ('arc', cx, cy, r, start, span).
+    """
+    from path2d import KIND_POINT, KIND_CCLW
+    points, centers, kinds = path2d.arrays()
+    points = points.tolist()
+    centers = centers.tolist()
+    kinds = kinds.tolist()
+    entries = []
+    for i in range(1, len(kinds)):
+        sx, sy = points[i - 1]
+        ex, ey = points[i]
+        if kinds[i] == KIND_POINT:
+            seg = ('line', sx, sy, ex, ey)
+            bbox = (min(sx, ex), min(sy, ey), max(sx, ex), max(sy, ey))
+        else:
+            cx, cy = centers[i]
+            r = hypot(ex - cx, ey - cy)
+            sa = degrees(atan2(sy - cy, sx - cx))
+            ea = degrees(atan2(ey - cy, ex - cx))
+            if kinds[i] == KIND_CCLW:
+                span = (ea - sa) % 360.0 or 360.0
+            else:
+                span = -((sa - ea) % 360.0 or 360.0)
+            seg = ('arc', cx, cy, r, sa, span)
+            bbox = arcBox(cx, cy, r, sa, span)
+        entries.append((keyPrefix + (i,), bbox, seg))
+    return entries
@@ -0,0 +1,225 @@
+#!/usr/bin/python -t
+# -*- coding: utf-8 -*-
+
+"""specschema.py
+
+Declarative tool spec validation.
+
+Each ToolDef subclass declares a SpecSchema made of:
+ * Spec -- a single spec's allowed types, comparator tests and enums
+ * Constraint -- a test across several specs, the geometry rules that
+                 checkGeometry() enforces
+
+A schema is compiled once, the first time it's used. Validation works on
+columns, a list of spec dicts is checked by building one NumPy array per spec
+and running every comparator and constraint on whole arrays. Checking a single
+dict is a batch of one.
+
+Example
+-------
+ schema = SpecSchema([Spec('dia', tests=[[gt, 0.0]]),
+                      Spec('oal', tests=[[gt, 0.0]])],
+                     [Constraint('dia must be < oal', ['dia', 'oal'],
+                                 lambda c: c['dia'] < c['oal'])])
+ errors = schema.validateBatch(listOfSpecDicts)
+
+Sunday, October 18 2026
+"""
+
+import numpy as np
+
+NUMERIC = (float, int, long)
+
+
+class SpecSchemaException(Exception):
+    pass
+
+
+class SpecError(object):
+    """A single validation failure.
+
+    index -- position of the failing dict in the batch
+    key -- spec name, or None for a failed constraint
+    message -- description
+    """
+    __slots__ = ('index', 'key', 'message')
+    def __init__(self, index, key, message):
+        self.index = index
+        self.key = key
+        self.message = message
+    def __str__(self):
+        return self.message
+    def __repr__(self):
+        return 'SpecError({}, {}, {})'.format(self.index, repr(self.key),
+                                              repr(self.message))
+
+
+class Spec(object):
+    """Describe a single tool spec.
+
+    key -- spec name
+    types -- tuple of allowed value types
+    tests -- list of [cmpfn, value]. cmpfn must be a binary predicate from the
+             operator module. The spec's value is placed on the LHS.
+    enums -- list of allowed values, or None
+    noneOk -- the spec can be None (but not missing)
+    """
+    def __init__(self, key, types=NUMERIC, tests=(), enums=None,
+                 noneOk=False):
+        self.key = key
+        self.types = types
+        self.tests = list(tests)
+        self.enums = enums
+        self.noneOk = noneOk
+        # bool is a subclass of int, only allow it if asked for
+        self.numeric = all(issubclass(t, NUMERIC) and t is not bool
+                           for t in types)
+
+
+class Constraint(object):
+    """A test across several specs.
+
+    message -- description used when the test fails
+    keys -- names of the specs the test needs
+    fn -- fn(columns) where columns maps each key to a float64 array. Must
+          return a bool array, True where the specs are valid.
+    """
+    def __init__(self, message, keys, fn):
+        self.message = message
+        self.keys = list(keys)
+        self.fn = fn
+
+
+class SpecSchema(object):
+    """The specs and constraints of one tool type.
+    """
+    def __init__(self, specs=(), constraints=()):
+        self._specs = list(specs)
+        self._constraints = list(constraints)
+        self._compiled = None
+    def extend(self, specs=(), constraints=()):
+        """Return a new schema with this schema's specs and constraints plus
+        the ones given. A spec with the same key replaces the inherited one.
+        """
+        keys = set(s.key for s in specs)
+        return SpecSchema([s for s in self._specs if s.key not in keys]
+                          + list(specs),
+                          self._constraints + list(constraints))
+    def keys(self):
+        """Return the spec names in declaration order.
+        """
+        return [s.key for s in self._specs]
+    def _compile(self):
+        """Split the specs by how their columns are tested.
+
+        Numeric specs are tested on float64 arrays, everything else on
+        object arrays.
+        """
+        if self._compiled is None:
+            for c in self._constraints:
+                for k in c.keys:
+                    if k not in self.keys():
+                        raise SpecSchemaException(
+                            '{} constraint uses undeclared spec {}' \
+                                .format(repr(c.message), repr(k)))
+            self._compiled = ([s for s in self._specs if s.numeric],
+                              [s for s in self._specs if not s.numeric],
+                              self._constraints)
+        return self._compiled
+    def validateBatch(self, specsList):
+        """Validate a list of spec dicts.
+
+        Return a list of SpecError, empty if everything is valid. Errors are
+        sorted by index. Constraints are only tested for dicts whose specs
+        passed their own tests and are not None.
+        """
+        numSpecs, objSpecs, constraints = self._compile()
+        n = len(specsList)
+        errors = []
+        columns = {}
+        # rows where the spec's value exists and passed its tests
+        valid = {}
+        missing = object()
+        for spec in numSpecs + objSpecs:
+            key = spec.key
+            values = [s.get(key, missing) for s in specsList]
+            present = np.array([v is not missing for v in values], dtype=bool)
+            isNone = np.array([v is None for v in values], dtype=bool)
+            typeOk = np.array([isinstance(v, spec.types)
+                               and (not isinstance(v, bool)
+                                    or bool in spec.types)
+                               for v in values], dtype=bool)
+            for i in np.flatnonzero(~present):
+                errors.append(SpecError(i, key,
+                                        '{} is missing from the tool'
+                                        ' definition'.format(repr(key))))
+            if not spec.noneOk:
+                for i in np.flatnonzero(isNone):
+                    errors.append(SpecError(i, key, '{} may not be None' \
+                                                .format(repr(key))))
+            for i in np.flatnonzero(present & ~isNone & ~typeOk):
+                errors.append(SpecError(i, key,
+                                        '{} must be {}, not {}'.format(
+                            repr(key),
+                            ' or '.join(t.__name__ for t in spec.types),
+                            repr(values[i]))))
+            ok = typeOk.copy()
+            if spec.numeric:
+                col = np.array([v if ok[i] else np.nan
+                                for i, v in enumerate(values)],
+                               dtype=np.float64)
+            else:
+                col = np.empty(n, dtype=object)
+                col[:] = values
+            for fn, val in spec.tests:
+                with np.errstate(invalid='ignore'):
+                    passed = np.asarray(fn(col, val), dtype=bool) \
+                        if spec.numeric \
+                        else np.array([ok[i] and fn(v, val)
+                                       for i, v in enumerate(values)],
+                                      dtype=bool)
+                for i in np.flatnonzero(ok & ~passed):
+                    errors.append(SpecError(i, key,
+                                            '{} spec test failed: {}({}, {})' \
+                                                .format(repr(key),
+                                                        fn.__name__,
+                                                        values[i], val)))
+                ok &= passed
+            if spec.enums is not None:
+                if spec.numeric:
+                    passed = np.in1d(col, spec.enums)
+                else:
+                    passed = np.array([v in spec.enums for v in values],
+                                      dtype=bool)
+                for i in np.flatnonzero(ok & ~passed):
+                    errors.append(SpecError(i, key,
+                                            '{} must be one of {}, not {}' \
+                                                .format(repr(key),
+                                                        spec.enums,
+                                                        values[i])))
+                ok &= passed
+            columns[key] = col
+            valid[key] = ok
+        for c in constraints:
+            rows = np.ones(n, dtype=bool)
+            for k in c.keys:
+                rows &= valid[k]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                passed = np.asarray(c.fn(columns), dtype=bool)
+            for i in np.flatnonzero(rows & ~passed):
+                errors.append(SpecError(i, None, c.message))
+        errors.sort(key=lambda e: e.index)
+        return errors
+    def validate(self, specs):
+        """Validate a single spec dict.
+
+        Return a list of SpecError, empty if valid.
+        """
+        return self.validateBatch([specs])
+    def validateSpecs(self, specs):
+        """Validate only the individual specs of a single dict, not the
+        constraints.
+
+        Return a list of SpecError, empty if valid.
+        """
+        return [e for e in self.validate(specs) if e.key is not None]
@@ -15,6 +15,15 @@ FMTRIN = 'R%.4f"'               # radius dimension inch format string
 FMTRMM = 'R%.3fmm'              # radius dimension millimeter format string
 FMTDIN = u'Ø%.4f"'              # diameter dimension inch format string
 FMTDMM = u'Ø%.3fmm'             # diameter dimension millimeter format string
+MMPERIN = 25.4                  # millimeters per inch
+
+def toInch(value, metric):
+    """Return value in inches.
+
+    value -- number or NumPy array
+    metric -- True if value is in millimeters
+    """
+    return value / MMPERIN if metric else value
 
 def dimFormat(fmt, value):
     """Format the dimension value.
@@ -0,0 +1,561 @@
+#!/usr/bin/python -t
+# -*- coding: utf-8 -*-
+
+"""sweep.py
+
+Removal envelopes of linear moves, from tool profiles, for stock previews.
+
+A tool standing on its tip cuts with its underside. At a distance rho from
+the axis that's the lowest point of the whole profile as wide as rho or wider,
+a center drill's countersink beyond its pilot, a corner rounding mill's radius
+beyond its flat. As a function of rho it's the tool's LowerProfile, f(rho),
+the height of the tool's bottom above its tip, the reach() of the tool's
+clearance.Envelope.
+
+A linear move from start to end leaves a groove. Across the move, at a
+distance q from the line of the tip, the groove's floor is
+
+    g(q) = min over u of f(sqrt(q^2 + u^2)) - m u
+
+above the tip's path, where m is the move's slope, its rise over its
+horizontal length. That's the removal cross-section. It depends only on m, so
+a MoveSection is built once for each direction class (a slope, rounded to
+DIRECTION_STEP degrees) and kept with the tool's shared profile:
+ * horizontal moves -- g(q) = f(|q|), exact
+ * plunges -- the tool's footprint f(rho) at the bottom of the move, exact
+ * ramps -- g(q) and the u that gives it tabulated over q once, then
+            interpolated
+
+Where the tip passes over a point the floor is g(q), elsewhere the point is
+under the start or end of the move, and the floor is the tool's footprint
+there. For ramps the table only picks the tool position u, from the samples
+either side of q and between them, and the height there comes from f(rho),
+so a cut never goes below where the tool really was. The plan view of the
+whole groove is a capsule as wide as the tool.
+
+Taking the nearest end where the tip doesn't pass over is exact when the
+underside is convex, rising ever more steeply outward like the ball, bull,
+flat and drill point tips. Where it isn't, a step out to a countersink, a
+wider shank or a corner rounding radius, the end of a ramp may stop the tip
+short of the table's lowest floor and the cut is at another local low. The
+table keeps all of them, and the radii where the underside steps or turns
+are tried too. From the best of these positions a golden section search
+along the move closes in on the lowest cut, leaving it at most
+RAMP_TOLERANCE shallow, never too deep.
+
+Seen from the side, across the move, the tool's silhouette is as wide as its
+Envelope at each height. ToolSweep.sideOutline() sweeps it along the move,
+the silhouettes at the start and the end joined by their common tangents,
+found piece by piece of the Envelope without polygon booleans.
+
+ZMap is a stock of heights on a grid, cut by moves with all of this. A height
+field can't hold undercuts, and f fills them in, the dovetail and woodruff
+cutters cut it as if their tops came straight down to their widest.
+
+Lengths are inches.
+
+Sunday, October 18 2026
+"""
+
+from math import atan2, degrees, hypot, radians, sqrt, tan
+
+import numpy as np
+
+from clearance import toolEnvelope, CURVE_LINE, CURVE_ARC
+
+# degrees of slope in each direction class
+DIRECTION_STEP = 0.5
+# direction class of moves with no horizontal length
+PLUNGE = 'plunge'
+# samples of q and u in a ramp's table
+RAMP_SAMPLES = 257
+# a ramp's best tool position is closed in on across this many of the
+# table's samples of u either side, in this many golden section steps
+REFINE_WIDTH = 8
+REFINE_STEPS = 12
+GOLDEN = (sqrt(5.0) - 1.0) / 2.0
+# how shallow a ramp's cut may be left
+RAMP_TOLERANCE = 1e-5
+
+
+class LowerProfile(object):
+    """The height of a tool's underside at each distance from its axis.
+
+    envelope -- the tool's clearance.Envelope
+
+    The underside at a distance is the lowest point of the profile that
+    reaches it, undercuts filled in.
+    """
+    def __init__(self, envelope):
+        self.envelope = envelope
+    def radius(self):
+        """Return the widest radius of the tool.
+        """
+        return self.envelope.maxRadius()
+    def height(self, rho):
+        """Find the underside's height above the tip.
+
+        rho -- distance or array of distances from the axis
+
+        Return a float or array, inf beyond radius().
+        """
+        return self.envelope.reach(rho)
+
+
+def directionClass(dx, dy, dz):
+    """Return the direction class of a move.
+
+    dx, dy, dz -- the move
+
+    Return PLUNGE, or the move's slope in degrees rounded to DIRECTION_STEP,
+    0.0 for horizontal moves, negative going down.
+    """
+    if hypot(dx, dy) == 0.0:
+        return PLUNGE
+    a = degrees(atan2(dz, hypot(dx, dy)))
+    return round(a / DIRECTION_STEP) * DIRECTION_STEP + 0.0
+
+
+class MoveSection(object):
+    """The removal cross-section of moves of one direction class.
+
+    lower -- the tool's LowerProfile
+    angle -- the slope in degrees, see directionClass()
+    """
+    def __init__(self, lower, angle):
+        self.lower = lower
+        self.angle = angle
+        self.slope = tan(radians(angle))
+        r = lower.radius()
+        if self.slope == 0.0:
+            self._q = None
+            return
+        # the u of the lowest floor is within the tool's radius
+        self._q = np.linspace(0.0, r, RAMP_SAMPLES)
+        u = np.linspace(-r, r, RAMP_SAMPLES * 2 - 1)
+        floor = lower.height(np.hypot(self._q[:, np.newaxis], u)) \
+            - self.slope * u
+        best = floor.argmin(axis=1)
+        self._g = floor[np.arange(len(self._q)), best]
+        self._u = u[best]
+        # every local low of each row, padded with the lowest, a move may
+        # end before the tip gets to the lowest
+        inf = np.full((len(self._q), 1), np.inf)
+        padded = np.hstack([inf, floor, inf])
+        low = (floor <= padded[:, :-2]) & (floor < padded[:, 2:])
+        rows, cols = np.nonzero(low)
+        rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+        count = np.bincount(rows, minlength=len(self._q)).max()
+        self._lows = np.repeat(self._u[:, np.newaxis], max(count, 1), axis=1)
+        self._lows[rows, rank] = u[cols]
+        self._lowRadii = np.hypot(self._q[:, np.newaxis], self._lows)
+        # where the underside steps or turns, and the slopes of its cones
+        # steep enough to hold the lowest point of a ramp
+        env = lower.envelope
+        self._breaks = env.breakRadii()
+        with np.errstate(divide='ignore'):
+            cones = 1.0 / env.params[env.kind == CURVE_LINE, 1]
+        self._cones = cones[cones > abs(self.slope)]
+    def floor(self, q):
+        """Find the groove's floor.
+
+        q -- distance or array of distances across the move from the tip's
+             path
+
+        Return (g, u), g the floor's height above the tip's path and u how
+        far along the move, behind the point, the tip cuts it. Floats or
+        arrays, g inf beyond the tool's radius.
+        """
+        q = np.abs(np.asarray(q, dtype=np.float64))
+        if self._q is None:
+            return self.lower.height(q), np.zeros_like(q)
+        beyond = q > self.lower.radius()
+        g = np.where(beyond, np.inf, np.interp(q, self._q, self._g))
+        u = np.interp(q, self._q, self._u)
+        if not g.ndim:
+            return float(g), float(u)
+        return g, u
+    def positions(self, q):
+        """Find where the tip may be when it cuts the floor.
+
+        The lowest floor is near the table's samples either side of q. Where
+        the move ends before the tip gets there the lowest cut is at the
+        end, or at another local low: one of the table's, with the point
+        just inside a radius where the underside steps or turns, or where a
+        cone of the underside is tangent to the move.
+
+        Return a list of arrays like q, how far along the move behind the
+        point the tip is.
+        """
+        q = np.abs(np.asarray(q, dtype=np.float64))
+        if self._q is None:
+            return [np.zeros_like(q)]
+        i = np.clip(np.searchsorted(self._q, q), 1, len(self._q) - 1)
+        # the table's lows either side of q include its lowest
+        positions = [np.interp(q, self._q, self._u)]
+        # near the rim a low moves along the move faster than it moves out
+        w = np.clip((q - self._q[i - 1]) / (self._q[i] - self._q[i - 1]),
+                    0.0, 1.0)
+        for k in range(self._lows.shape[1]):
+            positions += [self._lows[i - 1, k], self._lows[i, k]]
+            rho = self._lowRadii[i - 1, k] * (1.0 - w) \
+                + self._lowRadii[i, k] * w
+            u = np.sqrt(np.maximum(rho * rho - q * q, 0.0))
+            positions += [u, -u]
+        for d in self._breaks * (1.0 - 1e-12):
+            u = np.sqrt(np.maximum(d * d - q * q, 0.0))
+            positions += [u, -u]
+        m = self.slope
+        for b in self._cones:
+            positions.append(q * m / sqrt(b * b - m * m))
+        return positions
+    def profile(self, count=65):
+        """Return the removal cross-section as an (n, 2) array of (q, g),
+        across the whole groove.
+        """
+        r = self.lower.radius()
+        q = np.linspace(-r, r, count)
+        return np.column_stack([q, self.floor(q)[0]])
+
+
+class ToolSweep(object):
+    """The removal envelopes of one tool, a MoveSection per direction class.
+
+    lower -- the tool's LowerProfile
+    """
+    def __init__(self, lower):
+        self.lower = lower
+        self._sections = {}
+    def radius(self):
+        return self.lower.radius()
+    def section(self, dx, dy, dz):
+        """Return the MoveSection of a move, None for plunges.
+        """
+        angle = directionClass(dx, dy, dz)
+        if angle == PLUNGE:
+            return None
+        section = self._sections.get(angle)
+        if section is None:
+            section = self._sections[angle] = MoveSection(self.lower, angle)
+        return section
+    def outline(self, start, end, count=16):
+        """Find the plan view of a move's groove, a capsule.
+
+        start, end -- tip positions (x, y, z) of the move
+        count -- points on each half circle
+
+        Return an (n, 2) array of (x, y), counterclockwise.
+        """
+        r = self.radius()
+        dx, dy = end[0] - start[0], end[1] - start[1]
+        a = atan2(dy, dx) if dx or dy else 0.0
+        t = np.linspace(-0.5 * np.pi, 0.5 * np.pi, count)
+        ends = [(end, a + t), (start, a + t + np.pi)]
+        return np.concatenate([np.column_stack([p[0] + r * np.cos(t),
+                                                p[1] + r * np.sin(t)])
+                               for p, t in ends])
+    def _turns(self, k):
+        """Find where E(u) + k u may be greatest inside a range of heights
+        u above the tip, besides the range's ends. E is the Envelope.
+
+        Return an array of the Envelope's breaks, where a concave arc's
+        slope is -k and where a rising piece comes up through its floor.
+        """
+        env = self.lower.envelope
+        turns = list(env.y0)
+        for i in range(len(env.y0) - 1):
+            p0, p1, p2, p3 = env.params[i]
+            floor = env.floor[i]
+            if env.kind[i] == CURVE_LINE:
+                us = [(floor - p0) / p1] if p1 else []
+            elif env.kind[i] == CURVE_ARC:
+                us = []
+                if p3 > 0.0:
+                    us.append(p1 + k * p2 / sqrt(1.0 + k * k))
+                w = p2 * p2 - (floor - p0) ** 2
+                if w >= 0.0:
+                    us += [p1 - sqrt(w), p1 + sqrt(w)]
+            else:
+                continue
+            turns += [u for u in us if env.y0[i] < u < env.y0[i + 1]]
+        return np.array(turns)
+    def _widest(self, ua, ub, k, turns):
+        """Return the greatest E(u) + k u for u from ua to ub, arrays, see
+        _turns().
+        """
+        inside = (turns >= ua[:, np.newaxis]) & (turns <= ub[:, np.newaxis])
+        u = np.column_stack([ua, ub, np.where(inside, turns,
+                                              ua[:, np.newaxis])])
+        return (self.lower.envelope.radius(u) + k * u).max(axis=1)
+    def sideOutline(self, start, end, count=65):
+        """Find the side view of a move, the tool's silhouette swept along
+        it.
+
+        start, end -- tip positions (x, y, z) of the move
+        count -- heights sampled evenly, besides where the outline turns
+
+        The silhouette is as wide as the tool's Envelope at each height,
+        necks filled in. Swept along a line it's the silhouettes at the
+        start and end joined by their common tangents, found piece by piece
+        of the Envelope: at a height each side is widest with the tool at
+        either end of the move, at a break of the Envelope or where an arc
+        is tangent to the move's slope.
+
+        Return an (n, 2) array of (s, z), s along the move's horizontal
+        direction from the start, counterclockwise. Exact at the sampled
+        heights.
+        """
+        top = self.lower.envelope.height()
+        z0 = start[2]
+        length = hypot(end[0] - start[0], end[1] - start[1])
+        dz = end[2] - z0
+        lo, hi = min(z0, z0 + dz), max(z0, z0 + dz) + top
+        # the tool at height h is at s = (h - z0 - u) k with its tip u below
+        k = length / dz if dz else 0.0
+        turns = [self._turns(k), self._turns(-k)]
+        marks = np.concatenate([z0 + t for t in turns]
+                               + [z0 + dz + t for t in turns])
+        marks = marks[(marks >= lo) & (marks <= hi)]
+        # just below each mark too, where the outline steps out
+        eps = 1e-9 * max(hi - lo, 1.0)
+        h = np.unique(np.concatenate([np.linspace(lo, hi, count), marks,
+                                      np.maximum(marks - eps, lo)]))
+        if dz == 0.0:
+            e = self.lower.envelope.radius(h - z0)
+            right = length + e
+            left = -e
+        else:
+            ua = np.clip(h - z0 - max(dz, 0.0), 0.0, top)
+            ub = np.clip(h - z0 - min(dz, 0.0), 0.0, top)
+            right = (h - z0) * k + self._widest(ua, ub, -k, turns[1])
+            left = (h - z0) * k - self._widest(ua, ub, k, turns[0])
+        return np.concatenate([np.column_stack([right, h]),
+                               np.column_stack([left, h])[::-1]])
+    def cutHeights(self, start, end, x, y):
+        """Find the lowest the tool's underside gets over points.
+
+        start, end -- tip positions (x, y, z) of the move
+        x, y -- arrays of point positions, broadcast together
+
+        Return an array of heights, inf where the tool doesn't pass over.
+        """
+        x0, y0, z0 = start
+        dx, dy, dz = [e - s for s, e in zip(start, end)]
+        length = hypot(dx, dy)
+        lower = self.lower
+        # under the start and the end of the move
+        h0 = lower.height(np.hypot(x - x0, y - y0)) + z0
+        h1 = lower.height(np.hypot(x - x0 - dx, y - y0 - dy)) + z0 + dz
+        h = np.minimum(h0, h1)
+        if length == 0.0:
+            return h
+        section = self.section(dx, dy, dz)
+        tx, ty = dx / length, dy / length
+        s = (x - x0) * tx + (y - y0) * ty
+        q = (y - y0) * tx - (x - x0) * ty
+        s, q = np.broadcast_arrays(s, q)
+        def floorAt(u, s, q):
+            # the underside where the tip is at s - u, exact, the table only
+            # picks u
+            return z0 + dz * (s - u) / length + lower.height(np.hypot(q, u))
+        # the tip at the lower end until a better position is found, and
+        # the best of the positions on the move
+        best = np.where(h1 < h0, s - length, s)
+        onMove = best
+        onFloor = np.full(h.shape, np.inf)
+        for u in section.positions(q):
+            # the tip is at s - u when the floor passes over, if that's off
+            # the move the nearest end cuts deepest
+            clipped = np.clip(u, s - length, s)
+            floor = floorAt(clipped, s, q)
+            better = floor < h
+            h = np.where(better, floor, h)
+            best = np.where(better, clipped, best)
+            better = (clipped == u) & (floor < onFloor)
+            onFloor = np.where(better, floor, onFloor)
+            onMove = np.where(better, u, onMove)
+        if section.slope == 0.0:
+            return h
+        # the table's slope is rounded, the lowest cut is only near one of
+        # them, close in on it from the best position and from the best on
+        # the move, without leaving the move, where the tool passes over
+        cut = np.isfinite(h)
+        other = cut & (onMove != best)
+        s = np.concatenate([s[cut], s[other]])
+        q = np.concatenate([q[cut], q[other]])
+        best = np.concatenate([best[cut], onMove[other]])
+        w = REFINE_WIDTH * lower.radius() / (RAMP_SAMPLES - 1)
+        a = np.maximum(best - w, s - length)
+        b = np.minimum(best + w, s)
+        c = b - GOLDEN * (b - a)
+        d = a + GOLDEN * (b - a)
+        fc = floorAt(c, s, q)
+        fd = floorAt(d, s, q)
+        for i in range(REFINE_STEPS):
+            left = fc < fd
+            a = np.where(left, a, c)
+            b = np.where(left, d, b)
+            # one of c and d is kept, the other is new
+            u = np.where(left, b - GOLDEN * (b - a), a + GOLDEN * (b - a))
+            fu = floorAt(u, s, q)
+            c, d = np.where(left, u, d), np.where(left, c, u)
+            fc, fd = np.where(left, fu, fd), np.where(left, fc, fu)
+        low = np.minimum(fc, fd)
+        n = cut.sum()
+        h[cut] = np.minimum(h[cut], low[:n])
+        h[other] = np.minimum(h[other], low[n:])
+        return h
+
+
+def toolSweep(toolClass, specs):
+    """Return the ToolSweep of a tool, in inches.
+
+    toolClass -- the ToolDef subclass of the tool
+    specs -- valid tool specs
+
+    Built once per profile and units, its MoveSections once per direction
+    class.
+    """
+    key, entry, cutter, shank = toolClass.sharedProfile(specs)
+    metric = specs.get('metric', False)
+    return entry.derived(
+        ('sweep', metric),
+        lambda: ToolSweep(LowerProfile(toolEnvelope(toolClass, specs))))
+
+
+class ZMap(object):
+    """Stock as a grid of heights.
+
+    origin -- (x, y) of the center of the first cell
+    shape -- (rows, columns), rows along y
+    cell -- cell size
+    top -- the stock's starting height
+    """
+    def __init__(self, origin, shape, cell, top=0.0):
+        self.origin = (float(origin[0]), float(origin[1]))
+        self.cell = float(cell)
+        self.z = np.empty(shape, dtype=np.float64)
+        self.z.fill(top)
+    def cut(self, sweep, start, end):
+        """Cut the stock with a move.
+
+        sweep -- the tool's ToolSweep
+        start, end -- tip positions (x, y, z)
+
+        Return the number of cells lowered.
+        """
+        r = sweep.radius()
+        ox, oy = self.origin
+        rows, cols = self.z.shape
+        c = self.cell
+        # the cells under the move's capsule
+        c0 = max(int(np.floor((min(start[0], end[0]) - r - ox) / c)), 0)
+        c1 = min(int(np.ceil((max(start[0], end[0]) + r - ox) / c)) + 1, cols)
+        r0 = max(int(np.floor((min(start[1], end[1]) - r - oy) / c)), 0)
+        r1 = min(int(np.ceil((max(start[1], end[1]) + r - oy) / c)) + 1, rows)
+        if c0 >= c1 or r0 >= r1:
+            return 0
+        x = ox + c * np.arange(c0, c1)
+        y = oy + c * np.arange(r0, r1)[:, np.newaxis]
+        heights = sweep.cutHeights(start, end, x, y)
+        z = self.z[r0:r1, c0:c1]
+        lowered = heights < z
+        z[lowered] = heights[lowered]
+        return int(lowered.sum())
+    def cutPath(self, sweep, points):
+        """Cut the stock along a polyline of tip positions.
+
+        Return the number of cells lowered, counted once per move.
+        """
+        return sum(self.cut(sweep, a, b) for a, b in zip(points[:-1],
+                                                         points[1:]))
+
+
+if __name__ == '__main__':
+    import sys
+    import json
+
+    from PyQt4.QtGui import QApplication
+
+    from mesh import profilePoints
+    from tooldefwidget import CAT2TDEF
+
+    app = QApplication(sys.argv)
+    lib = json.load(open('tools.json'))
+    depth = 0.3
+    failed = 0
+    for cat in sorted(lib):
+        for n, specs in enumerate(lib[cat]):
+            toolClass = CAT2TDEF[cat]
+            entry, inch, cutter, shank = toolClass.sharedInchProfile(specs)
+            # the profile sampled every 0.0001" or closer
+            pts = np.array(profilePoints(inch.elements(), 3600))
+            dense = [pts[-1:]]
+            for a, b in zip(pts[:-1], pts[1:]):
+                steps = int(np.hypot(*(b - a)) / 1e-4) + 1
+                s = np.arange(steps)[:, np.newaxis] / float(steps)
+                dense.append(a + (b - a) * s)
+            dense = np.concatenate(dense)
+            sweep = toolSweep(toolClass, specs)
+            r = sweep.radius()
+            # a plunge cuts the underside, the lowest point at least as wide
+            cell = r / 50.0
+            stock = ZMap((-r, -r), (101, 101), cell)
+            stock.cut(sweep, (0.0, 0.0, 0.1), (0.0, 0.0, -depth))
+            rho = np.hypot(*np.meshgrid(np.arange(101) * cell - r,
+                                        np.arange(101) * cell - r))
+            order = np.argsort(dense[:, 0])
+            lowest = np.append(
+                np.minimum.accumulate(dense[order, 1][::-1])[::-1], np.inf)
+            def expect(rho):
+                k = np.searchsorted(dense[order, 0], rho.ravel())
+                return np.minimum(lowest[k] - depth, 0.0)
+            # rounding may put a cell on either side of a step
+            z = stock.z.ravel()
+            err = np.maximum(expect(rho * (1.0 - 1e-9) - 1e-12) - z,
+                             z - expect(rho * (1.0 + 1e-9) + 1e-12)).max()
+            if err > 1e-3:
+                failed += 1
+                print 'FAIL {} plunge off by {:.3g}'.format(specs['name'],
+                                                             err)
+            if specs['name'] == '#3 CENTER DRILL':
+                print '{} plunged {}" cuts {:.4f}" deep at r=0.1"'.format(
+                    specs['name'], depth,
+                    -float(sweep.cutHeights((0.0, 0.0, 0.1),
+                                            (0.0, 0.0, -depth), 0.1, 0.0)))
+            if n:
+                continue
+            # moves against the tool at many positions along them
+            for angle in (0.0, 10.0, 45.0):
+                end = (0.5, 0.2, -0.5 * tan(radians(angle)))
+                x = np.linspace(-r, 0.5 + r, 121)
+                y = np.linspace(-r, 0.2 + r, 61)[:, np.newaxis]
+                h = sweep.cutHeights((0.0, 0.0, 0.0), end, x, y)
+                brute = np.full(h.shape, np.inf)
+                s = np.linspace(0.0, 1.0, 2001)
+                for t in s:
+                    brute = np.minimum(brute, t * end[2] + sweep.lower.height(
+                        np.hypot(x - t * end[0], y - t * end[1])))
+                both = np.isfinite(h) & np.isfinite(brute)
+                diff = h[both] - brute[both]
+                if diff.max() > RAMP_TOLERANCE:
+                    failed += 1
+                    print 'FAIL {} {:.0f} deg ramp {:.3g} shallow'.format(
+                        specs['name'], angle, diff.max())
+                # the side view, how far the tool gets outside it
+                side = sweep.sideOutline((0.0, 0.0, 0.0), end)
+                n = len(side) // 2
+                env = sweep.lower.envelope
+                u = side[:n, 1] - end[2] * s[:, np.newaxis]
+                e = np.where((u >= 0.0) & (u <= env.height()),
+                             env.radius(u), np.nan)
+                along = np.hypot(end[0], end[1]) * s[:, np.newaxis]
+                out = max((np.nanmax(along + e, axis=0) - side[:n, 0]).max(),
+                          (side[n:, 0][::-1]
+                           - np.nanmin(along - e, axis=0)).max())
+                # the cut against brute force, lowest and highest, and how
+                # far the tool gets outside the side view
+                print '{:<32} {:4.0f} deg {:9.2g} {:9.2g} {:9.2g}'.format(
+                    specs['name'], angle, diff.min(), diff.max(), out)
+    print '{} failures'.format(failed)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,292 @@
+#!/usr/bin/python -t
+# -*- coding: utf-8 -*-
+
+"""thumbnail.py
+
+Tool icons for the tool browser, rendered without a GL context.
+
+Two kinds of thumbnail are drawn from a tool's shared profile:
+ * 'profile' -- the 2D outline, both sides, filled with QPainter on a QImage
+ * 'shaded' -- a lit 3D view of the revolved mesh, rasterized with NumPy
+
+Thumbnails are rendered by a QThreadPool and saved as PNG files named by a
+hash of the tool's profileKey(), so tools with the same geometry share one
+file and a changed tool gets a new one. Files are never invalidated, bump
+THUMBNAIL_VERSION when the rendering changes.
+
+Sunday, October 18 2026
+"""
+
+import os
+import hashlib
+
+import numpy as np
+from PyQt4.QtCore import QObject, QRunnable, QThreadPool, QPointF, SIGNAL
+from PyQt4.QtGui import QImage, QPainter, QPolygonF, QColor, QPen, QBrush
+
+import matvec
+from mesh import RevolvedMesh, profilePoints
+
+# part of every cache key
+THUMBNAIL_VERSION = 1
+# cutter and shank colors, as the mesh view draws them
+CUTTER_COLOR = (0.1, 0.1, 0.7)
+SHANK_COLOR = (0.5, 0.5, 0.5)
+
+
+class ThumbnailException(Exception):
+    pass
+
+
+def thumbnailKey(kind, size, profileKey):
+    """Return the content hash a thumbnail is cached by, a hex string.
+    """
+    return hashlib.sha1(repr((THUMBNAIL_VERSION, kind, size,
+                              profileKey))).hexdigest()
+
+def _fit(points, size, margin=0.08):
+    """Return the scale and offset that fit (n, 2) points in a size x size
+    square, y up.
+    """
+    lo = points.min(axis=0)
+    hi = points.max(axis=0)
+    span = (hi - lo).max()
+    scale = size * (1.0 - 2.0 * margin) / (span if span > 0.0 else 1.0)
+    offset = size * 0.5 - (lo + hi) * 0.5 * scale
+    return scale, offset
+
+def renderProfile(parts, size):
+    """Draw a tool's profile.
+
+    parts -- [(elements, color), ...], the cutter and shank profiles, see
+             Path2d.elements()
+    size -- image width and height in pixels
+
+    Return a QImage.
+    """
+    image = QImage(size, size, QImage.Format_ARGB32_Premultiplied)
+    image.fill(0)
+    outlines = []
+    for elements, color in parts:
+        right = np.array(profilePoints(elements, 64))
+        # the right side then the left, back down
+        left = right[::-1] * (-1.0, 1.0)
+        outlines.append((np.concatenate([right, left]), color))
+    scale, offset = _fit(np.concatenate([o for o, _ in outlines]), size)
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.Antialiasing)
+    for outline, color in outlines:
+        pts = outline * scale + offset
+        poly = QPolygonF([QPointF(x, size - y) for x, y in pts.tolist()])
+        c = QColor.fromRgbF(*color)
+        painter.setBrush(QBrush(c))
+        painter.setPen(QPen(c.darker(160), 1.0))
+        painter.drawPolygon(poly)
+    painter.end()
+    return image
+
+def rasterize(vertices, normals, colors, tris, size, view):
+    """Render triangles with a z-buffer.
+
+    vertices, normals -- (n, 3) arrays
+    colors -- (n, 3) array, rgb 0.0 - 1.0
+    tris -- (m, 3) vertex indices, counter-clockwise triangles face the
+            viewer
+    size -- image width and height in pixels
+    view -- 4x4 rotation, see matvec.py, the view looks down -Z
+
+    Triangles are scan converted one at a time over their bounding boxes.
+    Normals and colors are interpolated per pixel and lit once the visible
+    surface is known.
+
+    Return a (size, size, 4) uint8 BGRA array (QImage.Format_ARGB32 on little
+    endian machines).
+    """
+    v = np.asarray(vertices, dtype=np.float64).dot(view[:3, :3])
+    n = np.asarray(normals, dtype=np.float64).dot(view[:3, :3])
+    scale, offset = _fit(v[:, :2], size)
+    sx = v[:, 0] * scale + offset[0]
+    # image rows run down
+    sy = size - (v[:, 1] * scale + offset[1])
+    sz = v[:, 2]
+    depth = np.full((size, size), -np.inf)
+    nbuf = np.zeros((size, size, 3))
+    cbuf = np.zeros((size, size, 3))
+    # pixel centers
+    px = np.arange(size) + 0.5
+    a, b, c = tris[:, 0], tris[:, 1], tris[:, 2]
+    # twice the signed screen area, y is flipped so front faces are < 0
+    area = ((sx[b] - sx[a]) * (sy[c] - sy[a])
+            - (sx[c] - sx[a]) * (sy[b] - sy[a]))
+    front = area < 0.0
+    x0 = np.clip(np.floor(np.minimum(np.minimum(sx[a], sx[b]), sx[c])),
+                 0, size).astype(int)
+    x1 = np.clip(np.ceil(np.maximum(np.maximum(sx[a], sx[b]), sx[c])),
+                 0, size).astype(int)
+    y0 = np.clip(np.floor(np.minimum(np.minimum(sy[a], sy[b]), sy[c])),
+                 0, size).astype(int)
+    y1 = np.clip(np.ceil(np.maximum(np.maximum(sy[a], sy[b]), sy[c])),
+                 0, size).astype(int)
+    for t in np.nonzero(front & (x1 > x0) & (y1 > y0))[0].tolist():
+        i, j, k = tris[t]
+        gx, gy = np.meshgrid(px[x0[t]:x1[t]], px[y0[t]:y1[t]])
+        # barycentric weights of i, j and k
+        w0 = ((sx[j] - gx) * (sy[k] - gy) - (sx[k] - gx) * (sy[j] - gy)) \
+            / area[t]
+        w1 = ((sx[k] - gx) * (sy[i] - gy) - (sx[i] - gx) * (sy[k] - gy)) \
+            / area[t]
+        w2 = 1.0 - w0 - w1
+        inside = (w0 >= 0.0) & (w1 >= 0.0) & (w2 >= 0.0)
+        if not inside.any():
+            continue
+        z = w0 * sz[i] + w1 * sz[j] + w2 * sz[k]
+        block = (slice(y0[t], y1[t]), slice(x0[t], x1[t]))
+        closer = inside & (z > depth[block])
+        if not closer.any():
+            continue
+        depth[block][closer] = z[closer]
+        w = np.stack([w0[closer], w1[closer], w2[closer]], axis=-1)
+        nbuf[block][closer] = w.dot(n[[i, j, k]])
+        cbuf[block][closer] = w.dot(colors[[i, j, k]])
+    covered = np.isfinite(depth)
+    nn = nbuf[covered]
+    nn /= np.maximum(np.sqrt((nn * nn).sum(-1)), 1e-12)[:, np.newaxis]
+    # a light over the viewer's left shoulder, ambient and a little spec
+    light = np.array([-0.4, 0.5, 1.0])
+    light /= np.sqrt(light.dot(light))
+    half = light + (0.0, 0.0, 1.0)
+    half /= np.sqrt(half.dot(half))
+    diffuse = np.maximum(nn.dot(light), 0.0)
+    spec = np.maximum(nn.dot(half), 0.0) ** 32 * (diffuse > 0.0)
+    rgb = cbuf[covered] * (0.25 + 0.75 * diffuse)[:, np.newaxis] \
+        + 0.35 * spec[:, np.newaxis]
+    out = np.zeros((size, size, 4), dtype=np.uint8)
+    bgr = np.clip(rgb[:, ::-1] * 255.0 + 0.5, 0, 255).astype(np.uint8)
+    out[covered] = np.column_stack([bgr, np.full(len(bgr), 255, np.uint8)])
+    return out
+
+def renderShaded(parts, size, segs=24):
+    """Draw a lit 3D view of a tool.
+
+    parts -- [(elements, joints, color), ...], the cutter and shank profiles
+             and their joint classes, see path2d.classifyJoints()
+    size -- image width and height in pixels
+    segs -- mesh segments around the axis
+
+    Return a QImage.
+    """
+    mesh = RevolvedMesh(segs=segs)
+    for elements, joints, color in parts:
+        mesh.addProfile(elements, color + (1.0,), joints=joints)
+    mesh.build()
+    tris = np.concatenate([p._indices for p in mesh._patches]) \
+        .astype(np.intp).reshape(-1, 3)
+    colors = np.array([p._color[:3] for p in mesh._patches])[mesh._vertexPatch]
+    # the tool standing up, seen from a little above and to the right
+    view = matvec.rotation(-30.0, 0.0, 1.0, 0.0) \
+        .dot(matvec.rotation(20.0, 1.0, 0.0, 0.0))
+    pixels = rasterize(mesh._vertices, mesh._normals, colors, tris, size, view)
+    image = QImage(pixels.tostring(), size, size, QImage.Format_ARGB32)
+    # the QImage doesn't own the string's buffer
+    return image.copy()
+
+
+class _ThumbnailJob(QRunnable):
+    """Load a thumbnail from the disk cache, or render and save it.
+    """
+    def __init__(self, cache, key, kind, size, parts):
+        super(_ThumbnailJob, self).__init__()
+        self._cache = cache
+        self._key = key
+        self._kind = kind
+        self._size = size
+        self._parts = parts
+    def run(self):
+        path = self._cache.cachePath(self._key)
+        image = QImage(path) if os.path.exists(path) else QImage()
+        if image.isNull():
+            if self._kind == 'profile':
+                image = renderProfile([(e, c) for e, j, c in self._parts],
+                                      self._size)
+            else:
+                image = renderShaded(self._parts, self._size)
+            self._cache.save(path, image)
+        self._cache.emit(SIGNAL('_rendered(QString, QImage)'), self._key,
+                         image)
+
+
+class ThumbnailCache(QObject):
+    """Render tool thumbnails in the background and keep them.
+
+    size -- thumbnail width and height in pixels
+    kind -- 'shaded' or 'profile'
+    cacheDir -- directory for the PNG files, ~/.machtool/thumbnails if None
+
+    request() returns a thumbnail that's ready or queues it. The
+    thumbnailReady(QString) signal is emitted, in the GUI thread, with the
+    key of each thumbnail as it's finished.
+    """
+    def __init__(self, size=48, kind='shaded', cacheDir=None, parent=None):
+        super(ThumbnailCache, self).__init__(parent)
+        if kind not in ('shaded', 'profile'):
+            raise ThumbnailException('unknown thumbnail kind: ' + kind)
+        self.size = size
+        self.kind = kind
+        self.cacheDir = cacheDir or os.path.join(os.path.expanduser('~'),
+                                                 '.machtool', 'thumbnails')
+        # key -> QImage
+        self._images = {}
+        self._pending = set()
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max(1, QThreadPool.globalInstance()
+                                         .maxThreadCount() - 1))
+        self.connect(self, SIGNAL('_rendered(QString, QImage)'),
+                     self._rendered)
+    def cachePath(self, key):
+        return os.path.join(self.cacheDir, key[:2], key + '.png')
+    def save(self, path, image):
+        """Write image to path, atomically. Failures are ignored, the
+        thumbnail is rendered again next session.
+        """
+        try:
+            d = os.path.dirname(path)
+            if not os.path.isdir(d):
+                os.makedirs(d)
+            tmp = '{}.{}.tmp'.format(path, os.getpid())
+            if image.save(tmp, 'PNG'):
+                os.rename(tmp, path)
+        except (IOError, OSError):
+            pass
+    def request(self, toolClass, specs):
+        """Find the thumbnail of a tool.
+
+        toolClass -- the ToolDef subclass of the tool
+        specs -- valid tool specs
+
+        Return (key, QImage or None). If None, the thumbnail is queued and
+        thumbnailReady(key) will be emitted when it's done.
+        """
+        key, entry, cutter, shank = toolClass.sharedProfile(specs)
+        key = thumbnailKey(self.kind, self.size, key)
+        image = self._images.get(key)
+        if image is not None or key in self._pending:
+            return key, image
+        # the shared profile is read here, in the GUI thread, so the jobs
+        # never touch the profile cache
+        elements = entry.path2d.elements()
+        joints = entry.path2d.joints()
+        parts = [(elements[slice(*cutter)], joints[slice(*cutter)],
+                  CUTTER_COLOR),
+                 (elements[slice(*shank)], joints[slice(*shank)],
+                  SHANK_COLOR)]
+        self._pending.add(key)
+        self._pool.start(_ThumbnailJob(self, key, self.kind, self.size,
+                                       parts))
+        return key, None
+    def image(self, key):
+        return self._images.get(key)
+    def _rendered(self, key, image):
+        key = str(key)
+        self._pending.discard(key)
+        self._images[key] = image
+        self.emit(SIGNAL('thumbnailReady(QString)'), key)
@@ -40,19 +40,33 @@ The right side of the profile can be retrieved with profile(). It will return
 the elements of a Path2d. Each profile will start and end on the centerline.
 
 shankProfile() cutterProfile() will retrieve their respective profiles.
+cutterArrays() and shankArrays() return the same geometry as NumPy array
+views.
 
 Note: QPainterPath has a similar list of the elements but arcs are stored
       as cubic approximations.
 
-Note: ToolDef._profile is always stored in inches. If the tool is metric, the
-      values are converted.
+Note: ToolDef._profile is stored in the tool's units. profile() and the
+      methods above always return inches. The inch profile is converted once
+      per profile change (see inchProfile()), repeated calls return the same
+      lists and arrays, which must not be modified.
+
+Profiles are built by each subclass's _buildProfile() and shared through
+profilecache.profileCache. Tools of the same profile family with the same
+geometry specs share one Path2d and QPainterPath, no matter their name or
+units. profileEntry() returns the shared entry, use its derived() method to
+cache anything computed from the profile.
 
 Tool Validity
 =============
-Each tool must have the following two methods:
+Each tool class declares a SpecSchema (see specschema.py) in its schema class
+attribute. Subclasses extend their base class's schema with their own specs
+and the cross-spec constraints that keep the geometry valid. The schema is
+used by:
  * _checkSpecs
  * checkGeometry
-See their ToolDef doc strings for usage.
+See their ToolDef doc strings for usage. ToolBrowserView uses the schema to
+check every tool of a category in one batch when a library is read.
 
 Tools Currently Defined
 =======================
@@ -101,19 +115,21 @@ from math import degrees, radians, tan, sqrt, atan2, fabs, sin, cos
 from copy import copy
 from operator import lt, le, eq, ne, ge, gt
 
+import numpy as np
+
 from PyQt4.QtCore import *
 from PyQt4.QtGui import *
 from PyQt4.QtCore import Qt as qt
 
-from dimension import TextLabel, LinearDim, RadiusDim, AngleDim
+from dimension import TextLabel, Dimension, LinearDim, RadiusDim, AngleDim
 from arc import Arc
 from path2d import Path2d
+from profilecache import ProfileEntry, profileCache
+from specschema import SpecSchema, Spec, Constraint
+from spatialindex import profileEntries
 
 from strutil import *
 
-# mirror about the centerline for left side of paths
-mirTx = QTransform().scale(-1.0, 1.0)
-
 
 class CommentLabel(TextLabel):
     """A graphical representation of a tools comment string.
@@ -130,9 +146,12 @@ class ToolDefException(Exception):
 class ToolDef(QGraphicsPathItem):
     # TODO: better centerline Qt's default is too tight
     centerlinePen = QPen(QBrush(QColor(128, 128, 128)), 0, qt.DashDotLine)
+    schema = SpecSchema([Spec('name', (str, unicode)),
+                         Spec('metric', (bool,)),
+                         Spec('oal', tests=[[gt, 0.0]])])
     def __init__(self, specs):
         super(ToolDef, self).__init__()
-        self._checkSpecs(specs)       # call subclasses method
+        self._checkSpecs(specs)       # uses the subclass schema
         pen = QPen(QColor(0, 0, 255))
         pen.setWidth(2)         # 2 pixels wide
         pen.setCosmetic(True)   # don't scale line width
@@ -140,8 +159,15 @@ class ToolDef(QGraphicsPathItem):
         self.commentText = CommentLabel()
         self.commentText.font.setBold(True)
         self.commentText.setToolTip("name")
-        # The right side of the profile. A Path2d instance
+        # The right side of the profile. A Path2d instance shared with every
+        # tool that has the same profileKey()
         self._profile = None
+        # The ProfileEntry _profile came from
+        self._entry = None
+        # _profile in inches, see inchProfile()
+        self._inch = None
+        # path().boundingRect(), cached with the profile
+        self._boundingRect = QRectF()
         # Describes the shank dia in relation to the cutter dia.
         # * -1 shank < dia
         # *  0 shank == dia
@@ -151,42 +177,51 @@ class ToolDef(QGraphicsPathItem):
         self.prepareGeometryChange()
         self._updateProfile()
         self.dirty = False
-    def _convertProfToInch(self, profile):
-        result = []
-        for e in profile:
-            if len(e) == 2:
-                x, y = e
-                result.append((x / 25.4, y / 25.4))
-            else:
-                (ex, ey), (cx, cy), d = e
-                result.append(((ex / 25.4, ey / 25.4),
-                               (cx / 25.4, cy / 25.4),
-                               d))
-        return result
-    def profile(self):
-        """Return the profile definition list.
+    def inchProfile(self):
+        """Return the InchProfile of the current profile and units.
 
-        If the tool is metric, convert the defintion to inch first.
+        It's built the first time it's asked for and shared by every tool
+        with the same profile and units.
         """
-        p = self._profile.elements()
-        if self.isMetric():
-            return self._convertProfToInch(p)
-        else:
-            return p
+        if self._inch is None:
+            self._inch = self._entry.inchProfile(self.isMetric())
+        return self._inch
+    def profile(self):
+        """Return the profile definition list, in inches.
+        """
+        return self.inchProfile().elements()
+    def _cutterRange(self):
+        """Return (start, stop) of the cutter elements in the profile.
+        """
+        return (None, -3) if self._shankStep > 0 else (None, -2)
+    def _shankRange(self):
+        """Return (start, stop) of the shank elements in the profile.
+        """
+        return (-4, None) if self._shankStep > 0 else (-3, None)
     def cutterProfile(self):
         """Return the profile defintion of all geometry except the shank.
         """
-        if self._shankStep > 0:
-            return self.profile()[:-3]
-        else:
-            return self.profile()[:-2]
+        return self.inchProfile().part(*self._cutterRange())
     def shankProfile(self):
         """Return the profile definition of the shank.
         """
-        if self._shankStep > 0:
-            return self.profile()[-4:]
-        else:
-            return self.profile()[-3:]
+        return self.inchProfile().part(*self._shankRange())
+    def cutterArrays(self):
+        """Return (points, centers, kinds) views of cutterProfile().
+        """
+        return self.inchProfile().arrays(*self._cutterRange())
+    def shankArrays(self):
+        """Return (points, centers, kinds) views of shankProfile().
+        """
+        return self.inchProfile().arrays(*self._shankRange())
+    def cutterJoints(self):
+        """Return the JOINT_* class of each element of cutterProfile().
+        """
+        return self.inchProfile().joints(*self._cutterRange())
+    def shankJoints(self):
+        """Return the JOINT_* class of each element of shankProfile().
+        """
+        return self.inchProfile().joints(*self._shankRange())
     def paint(self, painter, option, widget):
         """Draw a centerline.
         """
@@ -207,78 +242,102 @@ class ToolDef(QGraphicsPathItem):
         Return a string. The base class returns 'dia'.
         """
         return 'dia'
-    def setDirty(self, bDirty=True):
-        self.dirty = bDirty
-    def _checkSpec(self, specs, specName, t1=None, t2=None, t3=None,
-                   enums=None, noneOk=False):
-        """Check a single tool spec.
+    @classmethod
+    def profileFamily(cls):
+        """Return the name of the class that defines this tool's profile.
+
+        Tool classes that only differ in name (SpotDrillDef and DrillDef)
+        build the same shape from the same specs. This is used to compare
+        tools across categories.
+        """
+        for c in cls.__mro__:
+            if '_buildProfile' in c.__dict__ and c is not ToolDef:
+                return c.__name__
+        return cls.__name__
+    def profileKey(self):
+        """Return the key this tool's profile is cached by.
+
+        The key is the profile family and the sorted geometry specs. The
+        name and metric flag don't change the shape, so they're left out.
+        """
+        return (self.profileFamily(),
+                tuple(sorted((k, v) for k, v in self.specs.iteritems()
+                             if k not in ('name', 'metric'))))
+    def profileEntry(self):
+        """Return the shared ProfileEntry of the current profile.
+        """
+        return self._entry
+    @classmethod
+    def sharedProfile(cls, specs):
+        """Find the profile of a tool without creating the tool.
+
+        specs -- valid tool specs
 
-        specs -- specs dict
-        specName -- string key name
-        t1, t2, t3 -- [cmpfn, value] or None. All given must return True.
-        enums -- list of values, the spec's value must occur in the list
-        noneOk -- bool, the spec can be None (but not missing)
+        The QGraphicsItem is never constructed, only the specs and the
+        profile building methods are used. For thumbnails and exports of
+        library tools.
 
-        cmpfn must be a binary predicate. The spec's value will be placed on
-        the LHS. tN's value will be palced on the RHS.
+        Return (profileKey(), ProfileEntry, cutter (start, stop),
+        shank (start, stop)).
+        """
+        tool = cls.__new__(cls)
+        tool.specs = specs
+        tool._shankStep = 0
+        key = tool.profileKey()
+        entry = profileCache.get(key, tool._buildProfile)
+        tool._shankStep = entry.shankStep
+        return key, entry, tool._cutterRange(), tool._shankRange()
+    @classmethod
+    def sharedInchProfile(cls, specs):
+        """Find the inch profile of a tool without creating the tool, see
+        sharedProfile().
 
-        Raise ToolDefException if the spec is invalid, else return None.
+        Return (ProfileEntry, InchProfile, cutter (start, stop), shank
+        (start, stop)). The InchProfile is the one inchProfile() of a tool
+        with these specs returns.
+        """
+        key, entry, cutter, shank = cls.sharedProfile(specs)
+        return (entry, entry.inchProfile(specs.get('metric', False)), cutter,
+                shank)
+    def _updateProfile(self):
+        """Find the profile in the cache, or build it, and show it.
 
-        Note: This fn is called indirectly from __init__(). It only makes sure
-        the spec is present and has a valid value. Use checkGeometry() to
-        ensure valid geometry will be created.
+        Every subclass has a _buildProfile() returning the ProfileEntry of
+        the current specs. It must not modify the tool, the entry is shared
+        by every tool with the same profileKey().
         """
-        def raiseCmpFail(fn, x, val):
-            raise ToolDefException('{} spec test failed: {}({}, {})' \
-                                       .format(repr(specName), fn, x,
-                                               val))
-        if not specs.has_key(specName):
-            raise ToolDefException('{} is missing from the tool definition'\
-                                       .format(repr(specName)))
-        x = specs[specName]
-        if x is None:
-            if noneOk:
-                return
-            else:
-                raise ToolDefException("{} may not be None" \
-                                           .format(repr(specName)))
-        if t1:
-            fn, val = t1
-            if not fn(x, val):
-                raiseCmpFail(fn, x, val)
-        if t2:
-            fn, val = t2
-            if not fn(x, val):
-                raiseCmpFail(fn, x, val)
-        if t3:
-            fn, val = t3
-            if not fn(x, val):
-                raiseCmpFail(fn, x, val)
-        if enums:
-            if e not in enums:
-                raise ToolDefException('{} must be one of {}, not {}' \
-                                           .format(repr(specName), enums,
-                                                   x))
+        entry = profileCache.get(self.profileKey(), self._buildProfile)
+        self._entry = entry
+        self._inch = None
+        self._profile = entry.path2d
+        self._shankStep = entry.shankStep
+        self._boundingRect = entry.derived('boundingRect',
+                                           entry.painterPath.boundingRect)
+        self.setPath(entry.painterPath)
+    def setDirty(self, bDirty=True):
+        self.dirty = bDirty
     def _checkSpecs(self, specs):
         """Check if all key/val pairs are present and valid.
 
-        Raise ToolDefException if not. This should be called only from
-        __init__(). This base class only checks if the 'name', 'metric', and
-        'oal' specs are present and have acceptable values.. Each subclass
-        should call this base class method and validate its remaining specs.
+        Raise ToolDefException with the first error if not. This should be
+        called only from __init__(). Only the individual specs in the class's
+        schema are checked, not the geometry constraints.
         """
-        self._checkSpec(specs, 'name', [isinstance, (str, unicode)])
-        self._checkSpec(specs, 'metric', [isinstance, bool])
-        self._checkSpec(specs, 'oal', [isinstance, (float, int)], [gt, 0.0])
+        errors = self.schema.validateSpecs(specs)
+        if errors:
+            raise ToolDefException(str(errors[0]))
     def checkGeometry(self, specs={}):
         """Find if the specs define valid geometry.
 
         specs -- the specs that were changed
 
-        This is called by the DimEdit validator. Return True if ok, False if
-        not. This base class returns True.
+        This is called by the DimEdit validator. Return True if the current
+        specs updated with the changed specs pass every test and constraint
+        in the class's schema, False if not.
         """
-        return True
+        d = copy(self.specs)
+        d.update(specs)
+        return not self.schema.validate(d)
     def _tipLength(self, includedAngle, dia):
         """Return the tip length.
 
@@ -305,11 +364,14 @@ class ToolDef(QGraphicsPathItem):
                 self._updateProfile()
                 break
         self._updateDims()
+        scene = self.scene()
+        if hasattr(scene, 'indexTool'):
+            scene.indexTool(self)
     # TODO: The default sceneBoundingRect() will not work because the pen is
     #       cosmetic with a width of 2. Probably still not correct, but it
     #       works ok for now.
     def sceneBoundingRect(self):
-        return self.path().boundingRect()
+        return QRectF(self._boundingRect)
     def isMetric(self):
         return self.specs.get('metric', False)
     def isDirty(self):
@@ -323,7 +385,43 @@ class ToolDef(QGraphicsPathItem):
         if scene:
             scene.addItem(self.commentText)
         else:
+            if hasattr(self.scene(), 'unindexTool'):
+                self.scene().unindexTool(self)
             self.scene().removeItem(self.commentText)
+    def labels(self):
+        """Return the name label and every dimension label.
+        """
+        return [self.commentText] + [v.dimText
+                                     for v in self.__dict__.itervalues()
+                                     if isinstance(v, Dimension)]
+    def indexEntries(self):
+        """Describe the tool for the scene's SpatialIndex.
+
+        Return a list of (key, bbox, data):
+         * profile segments, both sides -- key ('segment', id(self), side, i),
+           data (self, segment) where side is 'right' or 'left'. See
+           spatialindex.profileEntries().
+         * labels -- key ('label', id(label)), data the label item
+        The segments are cached with the profile.
+        """
+        def segments():
+            right = self._profile
+            left = right.transformed([[-1.0, 0.0], [0.0, 1.0]])
+            return [(side, profileEntries(path))
+                    for side, path in (('right', right), ('left', left))]
+        entries = []
+        for side, segs in self._entry.derived('indexSegments', segments):
+            for (i,), bbox, seg in segs:
+                entries.append((('segment', id(self), side, i), bbox,
+                                (self, seg)))
+        for label in self.labels():
+            if label.scene() is None:
+                continue
+            r = label.sceneBoundingRect().normalized()
+            entries.append((('label', id(label)),
+                            (r.left(), r.top(), r.right(), r.bottom()),
+                            label))
+        return entries
     def itemChange(self, change, value):
         if change == self.ItemSceneChange:
             self.sceneChange(value.toPyObject())
@@ -386,6 +484,13 @@ class DrillDef(ToolDef):
       angle        (tip angle included)
       metric       True/False
     """
+    schema = ToolDef.schema.extend(
+        [Spec('shankDia', tests=[[gt, 0.0]]),
+         Spec('dia', tests=[[gt, 0.0]]),
+         Spec('fluteLength', tests=[[gt, 0.0]]),
+         Spec('angle', tests=[[gt, 30.0], [le, 180.0]])],
+        [Constraint('fluteLength must be < oal', ['fluteLength', 'oal'],
+                    lambda c: c['fluteLength'] < c['oal'])])
     def __init__(self, specs):
         super(DrillDef, self).__init__(specs)
         self.angleDim = AngleDim()
@@ -412,23 +517,7 @@ class DrillDef(ToolDef):
             self.scene().removeItem(self.fluteLenDim)
             self.scene().removeItem(self.oalDim)
             self.scene().removeItem(self.angleDim)
-    def _checkSpecs(self, specs):
-        super(DrillDef, self)._checkSpecs(specs)
-        self._checkSpec(specs, 'shankDia', [gt, 0.0])
-        self._checkSpec(specs, 'dia', [gt, 0.0])
-        self._checkSpec(specs, 'fluteLength', [gt, 0.0])
-        self._checkSpec(specs, 'angle', [gt, 30.0], [le, 180.0])
-    def checkGeometry(self, specs={}):
-        d = copy(self.specs)
-        d.update(specs)
-        # angle [30, 180]
-        if not 30.0 <= d['angle'] <= 180.0:
-            return False
-        # fluteLength < oal
-        if d['fluteLength'] >= d['oal']:
-            return False
-        return True
-    def _updateProfile(self):
+    def _buildProfile(self):
         sdia = self.specs['shankDia']
         srad = sdia / 2.0
         dia = self.specs['dia']
@@ -443,23 +532,21 @@ class DrillDef(ToolDef):
         p4 = (srad, tiplen + flen)
         p5 = (srad, tiplen + oal)
         p6 = (0, tiplen + oal)
-        self._shankStep = cmp(sdia, dia)
+        shankStep = cmp(sdia, dia)
         # geom path
         path2d = Path2d(p1)
         path2d.lineTo(*p2)
         path2d.lineTo(*p3)
-        if self._shankStep:
+        if shankStep:
             path2d.lineTo(*p4)
         path2d.lineTo(*p5)
         path2d.lineTo(*p6)
-        self._profile = path2d
         # painter path
-        pp = path2d.toQPainterPath()
-        pp.addPath(mirTx.map(pp))
+        pp = path2d.toQPainterPath(mirror=True)
         # diagonal line to show flute
         pp.moveTo(-p2[0], p2[1])
         pp.lineTo(p3[0], p3[1])
-        self.setPath(pp)
+        return ProfileEntry(path2d, pp, shankStep)
     def _updateDims(self):
         oal = self.specs['oal']
         flen = self.specs['fluteLength']
@@ -577,6 +664,15 @@ class CenterDrillDef(ToolDef):
       tipLength    (not including the tip)
       metric       True/False
     """
+    schema = ToolDef.schema.extend(
+        [Spec('tipDia', tests=[[gt, 0.0]]),
+         Spec('tipLength', tests=[[gt, 0.0]]),
+         Spec('bodyDia', tests=[[gt, 0.0]])],
+        # the oal must be longer than the point, tip and bell
+        [Constraint('oal is too short', ['tipDia', 'tipLength', 'bodyDia',
+                                         'oal'],
+                    lambda c: c['oal'] > CenterDrillDef._minOAL(
+                        c['tipDia'], c['tipLength'], c['bodyDia']))])
     def __init__(self, specs):
         super(CenterDrillDef, self).__init__(specs)
         self.oalDim = LinearDim()
@@ -587,17 +683,21 @@ class CenterDrillDef(ToolDef):
             scene.addItem(self.oalDim)
         else:
             self.scene().removeItem(self.oalDim)
-    def checkGeometry(self, specs={}):
-        d = copy(self.specs)
-        d.update(specs)
-        # oal too short
-        if d['oal'] <= self.minOAL:
-            return False
-        return True
+    @staticmethod
+    def _minOAL(tipDia, tipLength, bodyDia):
+        """Return the length of the point, tip and bell.
+
+        The arguments may be floats or arrays.
+        """
+        tipRadius = tipDia * 0.5
+        pointLength = np.tan(np.radians(90.0 - 118.0 * 0.5)) * tipRadius
+        bellLength = np.tan(np.radians(90.0 - 30.0)) \
+            * (bodyDia * 0.5 - tipRadius)
+        return pointLength + tipLength + bellLength
     @staticmethod
     def getSortKey():
         return 'tipDia'
-    def _updateProfile(self):
+    def _buildProfile(self):
         tipRadius = self.specs['tipDia'] / 2.0
         tipLength = self.specs['tipLength']
         brad = self.specs['bodyDia'] / 2.0
@@ -618,12 +718,8 @@ class CenterDrillDef(ToolDef):
         path2d.lineTo(*p4)
         path2d.lineTo(*p5)
         path2d.lineTo(*p6)
-        pp = path2d.toQPainterPath()
-        pp.addPath(mirTx.map(pp))
-        self.setPath(pp)
-        self._profile = path2d
-        # for dim validation
-        self.minOAL = p4[1]
+        pp = path2d.toQPainterPath(mirror=True)
+        return ProfileEntry(path2d, pp)
     def _updateDims(self):
         metric = self.specs['metric']
         oal = self.specs['oal']
@@ -667,6 +763,12 @@ class EndMillDef(ToolDef):
       oal
       metric       True/False
     """
+    schema = ToolDef.schema.extend(
+        [Spec('shankDia', tests=[[gt, 0.0]]),
+         Spec('dia', tests=[[gt, 0.0]]),
+         Spec('fluteLength', tests=[[gt, 0.0]])],
+        [Constraint('fluteLength must be < oal', ['fluteLength', 'oal'],
+                    lambda c: c['fluteLength'] < c['oal'])])
     def __init__(self, specs):
         super(EndMillDef, self).__init__(specs)
         self.diaDim = LinearDim()
@@ -689,19 +791,7 @@ class EndMillDef(ToolDef):
             self.scene().removeItem(self.shankDiaDim)
             self.scene().removeItem(self.fluteLenDim)
             self.scene().removeItem(self.oalDim)
-    def _checkSpecs(self, specs):
-        super(EndMillDef, self)._checkSpecs(specs)
-        self._checkSpec(specs, 'shankDia', [gt, 0.0])
-        self._checkSpec(specs, 'dia', [gt, 0.0])
-        self._checkSpec(specs, 'fluteLength', [gt, 0.0])
-    def checkGeometry(self, specs={}):
-        d = copy(self.specs)
-        d.update(specs)
-        # flute length < oal
-        if d['fluteLength'] >= d['oal']:
-            return False
-        return True
-    def _updateProfile(self):
+    def _buildProfile(self):
         """Create the tool's silhouette for display.
 
         Return a tuple of parameters used by _updateDims().
@@ -718,22 +808,19 @@ class EndMillDef(ToolDef):
         p4 = (srad, flen)
         p5 = (srad, oal)
         p6 = (0.0, oal)
-        self._shankStep = cmp(sdia, dia)
+        shankStep = cmp(sdia, dia)
         path2d = Path2d(p1)
         path2d.lineTo(*p2)
         path2d.lineTo(*p3)
-        if self._shankStep:
+        if shankStep:
             path2d.lineTo(*p4)
         path2d.lineTo(*p5)
         path2d.lineTo(*p6)
-        pp = path2d.toQPainterPath()
-        pp.addPath(mirTx.map(pp))
+        pp = path2d.toQPainterPath(mirror=True)
         # # diagonal line to show flute
         pp.moveTo(-p2[0], p2[1])
         pp.lineTo(*p3)
-        self.setPath(pp)
-        self._profile = path2d
-        # return p1, p2, p3, p4, p5, p6, dia, sdia, srad, oal, flen
+        return ProfileEntry(path2d, pp, shankStep)
     def _updateDims(self):
         """Attempt to intelligently position the dimensions and name label.
         """
@@ -824,6 +911,15 @@ class TaperEndMillDef(ToolDef):
       angle        (half angle to vertical)
       metric       True/False
     """
+    schema = ToolDef.schema.extend(
+        [Spec('shankDia', tests=[[gt, 0.0]]),
+         Spec('dia', tests=[[gt, 0.0]]),
+         Spec('fluteLength', tests=[[gt, 0.0]]),
+         Spec('angle', tests=[[ge, 0.0]])],
+        [Constraint('fluteLength must be < oal', ['fluteLength', 'oal'],
+                    lambda c: c['fluteLength'] < c['oal']),
+         Constraint('angle must be >= 0.01 and <= 60.0', ['angle'],
+                    lambda c: (c['angle'] >= 0.01) & (c['angle'] <= 60.0))])
     def __init__(self, specs):
         super(TaperEndMillDef, self).__init__(specs)
         self.diaDim = LinearDim()
@@ -850,24 +946,7 @@ class TaperEndMillDef(ToolDef):
             self.scene().removeItem(self.fluteLenDim)
             self.scene().removeItem(self.oalDim)
             self.scene().removeItem(self.angleDim)
-    def _checkSpecs(self, specs):
-        super(TaperEndMillDef, self)._checkSpecs(specs)
-        self._checkSpec(specs, 'shankDia', [gt, 0.0])
-        self._checkSpec(specs, 'dia', [gt, 0.0])
-        self._checkSpec(specs, 'fluteLength', [gt, 0.0])
-        self._checkSpec(specs, 'angle', [ge, 0.0])
-    def checkGeometry(self, specs={}):
-        d = copy(self.specs)
-        d.update(specs)
-        # flute length < oal
-        if d['fluteLength'] >= d['oal']:
-            return False
-        # angle >= 90
-        a = d['angle']
-        if a < 0.01 or a > 60.0:
-            return False
-        return True
-    def _updateProfile(self):
+    def _buildProfile(self):
         """Create the tool's silhouette for display.
 
         Return a tuple of parameters used by _updateDims().
@@ -885,22 +964,19 @@ class TaperEndMillDef(ToolDef):
         p4 = (srad, flen)
         p5 = (srad, oal)
         p6 = (0.0, oal)
-        self._shankStep = cmp(srad, p3[0])
+        shankStep = cmp(srad, p3[0])
         path2d = Path2d(p1)
         path2d.lineTo(*p2)
         path2d.lineTo(*p3)
-        if self._shankStep:
+        if shankStep:
             path2d.lineTo(*p4)
         path2d.lineTo(*p5)
         path2d.lineTo(*p6)
-        pp = path2d.toQPainterPath()
-        pp.addPath(mirTx.map(pp))
+        pp = path2d.toQPainterPath(mirror=True)
         # diagonal line to show flute
         pp.moveTo(-p2[0], p2[1])
         pp.lineTo(*p3)
-        self.setPath(pp)
-        self._profile = path2d
-        # return p1, p2, p3, p4, p5, p6, dia, sdia, srad, oal, flen, a
+        return ProfileEntry(path2d, pp, shankStep)
     def _updateDims(self):
         """Attempt to intelligently position the dimensions and name label.
         """
@@ -1013,7 +1089,7 @@ class TaperBallMillDef(TaperEndMillDef):
         super(TaperBallMillDef, self).__init__(specs)
         self.diaDim = RadiusDim()
         self.diaDim.setToolTip("dia")
-    def _updateProfile(self):
+    def _buildProfile(self):
         """Create the tool's silhouette for display.
 
         Return a tuple of parameters used by _updateDims().
@@ -1036,21 +1112,19 @@ class TaperBallMillDef(TaperEndMillDef):
         p4 = (srad, flen)
         p5 = (srad, oal)
         p6 = (0.0, oal)
-        self._shankStep = cmp(srad, p3X)
+        shankStep = cmp(srad, p3X)
         path2d = Path2d(p1)
         path2d.arcTo(p2[0], p2[1], 0.0, frad, 'cclw')
         path2d.lineTo(*p3)
-        if self._shankStep:
+        if shankStep:
             path2d.lineTo(*p4)
         path2d.lineTo(*p5)
         path2d.lineTo(*p6)        
-        pp = path2d.toQPainterPath()
-        pp.addPath(mirTx.map(pp))
+        pp = path2d.toQPainterPath(mirror=True)
         # flute line
         pp.moveTo(*p1)
         pp.lineTo(*p3)
-        self.setPath(pp)
-        self._profile = path2d
+        return ProfileEntry(path2d, pp, shankStep)
     def _updateDims(self):
         """Attempt to intelligently position the dimensions and name label.
         """
@@ -1069,8 +1143,7 @@ class TaperBallMillDef(TaperEndMillDef):
         # flute diameter dimension (actually a RadiusDim)
         tr = self.diaDim.dimText.sceneBoundingRect()
         labelP = QPointF(-p2[0] - tr.width(), tr.height() * -1.0)
-        arc = Arc.fromAngles(180.0 + a, -a, frad)
-        arc.center(QPointF(p1[0], frad))
+        arc = Arc.fromAngles(180.0 + a, -a, frad, center=(p1[0], frad))
         self.diaDim.config({'value': dia,
                             'pos': labelP,
                             'arc': arc,
@@ -1168,7 +1241,7 @@ class BallMillDef(EndMillDef):
       oal
       metric       True/False
     """
-    def _updateProfile(self):
+    def _buildProfile(self):
         sdia = self.specs['shankDia']
         srad = sdia * 0.5
         dia = self.specs['dia']
@@ -1181,21 +1254,19 @@ class BallMillDef(EndMillDef):
         p4 = (srad, flen)
         p5 = (srad, oal)
         p6 = (0.0, oal)
-        self._shankStep = cmp(sdia, dia)
+        shankStep = cmp(sdia, dia)
         path2d = Path2d(p1)
         path2d.arcTo(p2[0], p2[1], 0.0, frad, 'cclw')
         path2d.lineTo(*p3)
-        if self._shankStep:
+        if shankStep:
             path2d.lineTo(*p4)
         path2d.lineTo(*p5)
         path2d.lineTo(*p6)
-        pp = path2d.toQPainterPath()
-        pp.addPath(mirTx.map(pp))
+        pp = path2d.toQPainterPath(mirror=True)
         # flute line
         pp.moveTo(0.0, 0.0)
         pp.lineTo(*p3)
-        self.setPath(pp)
-        self._profile = path2d
+        return ProfileEntry(path2d, pp, shankStep)
     def _updateDims(self):
         """Attempt to intelligently position the dimensions and name label.
         """
@@ -1283,6 +1354,12 @@ class BullMillDef(EndMillDef):
       radius       corner
       metric       True/False
     """
+    schema = EndMillDef.schema.extend(
+        [Spec('radius', tests=[[gt, 0.0]])],
+        [Constraint('radius * 2 must be < dia', ['radius', 'dia'],
+                    lambda c: c['radius'] * 2.0 < c['dia']),
+         Constraint('radius must be < fluteLength', ['radius', 'fluteLength'],
+                    lambda c: c['radius'] < c['fluteLength'])])
     def __init__(self, specs):
         super(BullMillDef, self).__init__(specs)
         self.radiusDim = RadiusDim()
@@ -1293,22 +1370,7 @@ class BullMillDef(EndMillDef):
             scene.addItem(self.radiusDim)
         else:
             self.scene().removeItem(self.radiusDim)
-    def _checkSpecs(self, specs):
-        super(BullMillDef, self)._checkSpecs(specs)
-        self._checkSpec(specs, 'radius', [gt, 0.0])
-    def checkGeometry(self, specs={}):
-        if not super(BullMillDef, self).checkGeometry(specs):
-            return False
-        d = copy(self.specs)
-        d.update(specs)
-        # radius * 2 < dia
-        if not d['radius'] * 2.0 < d['dia']:
-            return False
-        # radius < flute length
-        if not d['radius'] < d['fluteLength']:
-            return False
-        return True
-    def _updateProfile(self):
+    def _buildProfile(self):
         sdia = self.specs['shankDia']
         srad = sdia * 0.5
         dia = self.specs['dia']
@@ -1323,22 +1385,20 @@ class BullMillDef(EndMillDef):
         p5 = [srad, flen]
         p6 = [srad, oal]
         p7 = [0, oal]
-        self._shankStep = cmp(sdia, dia)
+        shankStep = cmp(sdia, dia)
         path2d = Path2d(p1)
         path2d.lineTo(*p2)
         path2d.arcTo(frad, r, p2[0], p3[1], 'cclw')
         path2d.lineTo(*p4)
-        if self._shankStep:
+        if shankStep:
             path2d.lineTo(*p5)
         path2d.lineTo(*p6)
         path2d.lineTo(*p7)
-        pp = path2d.toQPainterPath()
-        pp.addPath(mirTx.map(pp))
+        pp = path2d.toQPainterPath(mirror=True)
         # flute line
         pp.moveTo(-frad + r, 0.0)
         pp.lineTo(*p4)
-        self.setPath(pp)
-        self._profile = path2d
+        return ProfileEntry(path2d, pp, shankStep)
     def _updateDims(self):
         """Attempt to intelligently position the dimensions and name label.
         """
@@ -1414,10 +1474,7 @@ class BullMillDef(EndMillDef):
                             'force': 'vertical'})
         # corner radius dimension
         tr = self.radiusDim.dimText.sceneBoundingRect()
-        arc = Arc({'center': QPointF(p2[0], p3[1]),
-                   'radius': radius,
-                   'start': 270.0,
-                   'span': 90.0})
+        arc = Arc((p2[0], p3[1]), radius, 270.0, 90.0)
         labelP = QPointF(-p3[0] - tr.width() * .6, (p3[1] + p4[1]) * .5)
         self.radiusDim.config({'value': radius,
                                'pos': labelP,
@@ -1442,6 +1499,19 @@ class WoodruffMillDef(ToolDef):
       oal
       metric       True/False
     """
+    # TODO: need to include the relief radius when checking
+    #       oal > flute len
+    schema = ToolDef.schema.extend(
+        [Spec('shankDia', tests=[[gt, 0.0]]),
+         Spec('neckDia', tests=[[gt, 0.0]]),
+         Spec('dia', tests=[[gt, 0.0]]),
+         Spec('fluteLength', tests=[[gt, 0.0]])],
+        [Constraint('fluteLength must be < oal', ['fluteLength', 'oal'],
+                    lambda c: c['fluteLength'] < c['oal']),
+         Constraint('neckDia must be <= shankDia', ['neckDia', 'shankDia'],
+                    lambda c: c['neckDia'] <= c['shankDia']),
+         Constraint('neckDia must be < dia', ['neckDia', 'dia'],
+                    lambda c: c['neckDia'] < c['dia'])])
     def __init__(self, specs):
         super(WoodruffMillDef, self).__init__(specs)
         self.shankDiaDim = LinearDim()
@@ -1468,28 +1538,7 @@ class WoodruffMillDef(ToolDef):
             self.scene().removeItem(self.diaDim)
             self.scene().removeItem(self.fluteLenDim)
             self.scene().removeItem(self.oalDim)
-    def _checkSpecs(self, specs):
-        super(WoodruffMillDef, self)._checkSpecs(specs)
-        self._checkSpec(specs, 'shankDia', [gt, 0.0])
-        self._checkSpec(specs, 'neckDia', [gt, 0.0])
-        self._checkSpec(specs, 'dia', [gt, 0.0])
-        self._checkSpec(specs, 'fluteLength', [gt, 0.0])
-    def checkGeometry(self, specs={}):
-        # TODO: need to include the relief radius when checking
-        #       oal > flute len
-        d = copy(self.specs)
-        d.update(specs)
-        # flute length < oal
-        if not d['fluteLength'] < d['oal']:
-            return False
-        # shank dia >= neck dia
-        if not d['neckDia'] <= d['shankDia']:
-            return False
-        # neck dia < dia
-        if not d['neckDia'] < d['dia']:
-            return False
-        return True
-    def _updateProfile(self):
+    def _buildProfile(self):
         sdia = self.specs['shankDia']
         srad = sdia * 0.5
         ndia = self.specs['neckDia']
@@ -1513,22 +1562,20 @@ class WoodruffMillDef(ToolDef):
         p5 = (rect.center().x() - arcX, rect.center().y() + arcY)
         p6 = (srad, oal)
         p7 = (0, oal)
-        self._shankStep = cmp(sdia, ndia)
+        shankStep = cmp(sdia, ndia)
         path2d = Path2d(p1)
         path2d.lineTo(*p2)
         path2d.lineTo(*p3)
         path2d.lineTo(*p4)
-        if self._shankStep:
+        if shankStep:
             path2d.arcTo(p5[0], p5[1], p4[0] + reliefRadius, p4[1], 'clw')
         path2d.lineTo(*p6)
         path2d.lineTo(*p7)
-        pp = path2d.toQPainterPath()
-        pp.addPath(mirTx.map(pp))
+        pp = path2d.toQPainterPath(mirror=True)
         # flute line
         pp.moveTo(-p2[0], p2[1])
         pp.lineTo(p3[0], p3[1])
-        self.setPath(pp)
-        self._profile = path2d
+        return ProfileEntry(path2d, pp, shankStep)
     def _updateDims(self):
         metric = self.specs['metric']
         dia = self.specs['dia']
@@ -1614,6 +1661,22 @@ class RadiusMillDef(ToolDef):
       oal
       metric
     """
+    schema = ToolDef.schema.extend(
+        [Spec('shankDia', tests=[[gt, 0.0]]),
+         Spec('bodyDia', tests=[[gt, 0.0]]),
+         Spec('tipDia', tests=[[gt, 0.0]]),
+         Spec('bodyLength', tests=[[gt, 0.0]]),
+         Spec('radius', tests=[[gt, 0.0]])],
+        # flat checks body dia, tip dia, and radius
+        [Constraint('bodyDia must be >= tipDia + radius * 2',
+                    ['bodyDia', 'tipDia', 'radius'],
+                    lambda c: RadiusMillDef._flat(c) >= 0.0),
+         Constraint('bodyLength must be > radius + flat',
+                    ['bodyLength', 'bodyDia', 'tipDia', 'radius'],
+                    lambda c: c['bodyLength'] > c['radius']
+                    + RadiusMillDef._flat(c)),
+         Constraint('bodyLength must be < oal', ['bodyLength', 'oal'],
+                    lambda c: c['bodyLength'] < c['oal'])])
     def __init__(self, specs):
         super(RadiusMillDef, self).__init__(specs)
         self.shankDiaDim = LinearDim()
@@ -1647,28 +1710,14 @@ class RadiusMillDef(ToolDef):
             self.scene().removeItem(self.bodyLengthDim)
             self.scene().removeItem(self.radiusDim)
             self.scene().removeItem(self.oalDim)
-    def _checkSpecs(self, specs):
-        super(RadiusMillDef, self)._checkSpecs(specs)
-        self._checkSpec(specs, 'shankDia', [gt, 0.0])
-        self._checkSpec(specs, 'bodyDia', [gt, 0.0])
-        self._checkSpec(specs, 'tipDia', [gt, 0.0])
-        self._checkSpec(specs, 'bodyLength', [gt, 0.0])
-        self._checkSpec(specs, 'radius', [gt, 0.0])
-    def checkGeometry(self, specs={}):
-        d = copy(self.specs)
-        d.update(specs)
-        # will check body dia, tip dia, and radius
-        flat = d['bodyDia'] - d['tipDia'] - d['radius'] * 2.0
-        if flat < 0.0:
-            return False
-        # body length > radius + flat
-        if not d['bodyLength'] > d['radius'] + flat:
-            return False
-        # body length < oal
-        if not d['bodyLength'] < d['oal']:
-            return False
-        return True
-    def _updateProfile(self):
+    @staticmethod
+    def _flat(c):
+        """Return the width of the flat between the tip and the radius.
+
+        c -- dict of specs (floats or arrays)
+        """
+        return c['bodyDia'] - c['tipDia'] - c['radius'] * 2.0
+    def _buildProfile(self):
         sdia = self.specs['shankDia']
         srad = sdia * 0.5
         bdia = self.specs['bodyDia']
@@ -1688,21 +1737,19 @@ class RadiusMillDef(ToolDef):
         p7 = (srad, blen)
         p8 = (srad, oal)
         p9 = (0.0, oal)
-        self._shankStep = cmp(sdia, bdia)
+        shankStep = cmp(sdia, bdia)
         path2d = Path2d(p1)
         path2d.lineTo(*p2)
         path2d.lineTo(*p3)
         path2d.arcTo(p4[0], p4[1], p3[0] + r, p3[1], 'clw')
         path2d.lineTo(*p5)
         path2d.lineTo(*p6)
-        if self._shankStep:
+        if shankStep:
             path2d.lineTo(*p7)
         path2d.lineTo(*p8)
         path2d.lineTo(*p9)
-        pp = path2d.toQPainterPath()
-        pp.addPath(mirTx.map(pp))
-        self.setPath(pp)
-        self._profile = path2d
+        pp = path2d.toQPainterPath(mirror=True)
+        return ProfileEntry(path2d, pp, shankStep)
     def _updateDims(self):
         metric = self.specs['metric']
         sdia = self.specs['shankDia']
@@ -1778,10 +1825,7 @@ class RadiusMillDef(ToolDef):
                             'force': 'vertical'})
         # corner radius dimension
         tr = self.radiusDim.dimText.sceneBoundingRect()
-        arc = Arc({'center': QPointF(p4[0], p3[1]),
-                   'radius': radius,
-                   'start': 90.0,
-                   'span': 90.0})
+        arc = Arc((p4[0], p3[1]), radius, 90.0, 90.0)
         labelP = QPointF(-p6[0] - tr.width() * .6, (p6[1] + p5[1]) * .5)
         self.radiusDim.config({'value': radius,
                                'pos': labelP,
@@ -1804,33 +1848,24 @@ class DovetailMillDef(EndMillDef):
       angle
       metric       True/False
     """
+    # TODO: incorporate the neck in fluteLength < oal
+    # TODO: angle vs dia vs flute length
+    schema = EndMillDef.schema.extend([Spec('angle', tests=[[gt, 0.0]])])
     def __init__(self, specs):
         super(DovetailMillDef, self).__init__(specs)
         self.angleDim = AngleDim()
         self.angleDim.setToolTip("angle")
-    def cutterProfile(self):
-        return self.profile()[:4]
-    def shankProfile(self):
-        return self.profile()[-5:]
+    def _cutterRange(self):
+        return (None, 4)
+    def _shankRange(self):
+        return (-5, None)
     def sceneChange(self, scene):
         super(DovetailMillDef, self).sceneChange(scene)
         if scene:
             scene.addItem(self.angleDim)
         else:
             self.scene().removeItem(self.angleDim)
-    def _checkSpecs(self, specs):
-        super(DovetailMillDef, self)._checkSpecs(specs)
-        self._checkSpec(specs, 'angle', [gt, 0.0])
-    def checkGeometry(self, specs={}):
-        d = copy(self.specs)
-        d.update(specs)
-        # flute length < oal
-        # TODO: incorporate the neck
-        if d['fluteLength'] >= d['oal']:
-            return False
-        # TODO: angle vs dia vs flute length
-        return True
-    def _updateProfile(self):
+    def _buildProfile(self):
         """Create the tool's silhouette for display.
 
         Return a tuple of parameters used by _updateDims().
@@ -1859,13 +1894,11 @@ class DovetailMillDef(EndMillDef):
         path2d.lineTo(*p6)
         path2d.lineTo(*p7)
         path2d.lineTo(*p8)
-        pp = path2d.toQPainterPath()
-        pp.addPath(mirTx.map(pp))
+        pp = path2d.toQPainterPath(mirror=True)
         # diagonal line to show flute
         pp.moveTo(-p2[0], p2[1])
         pp.lineTo(*p3)
-        self.setPath(pp)
-        self._profile = path2d
+        return ProfileEntry(path2d, pp)
     def _updateDims(self):
         """Attempt to intelligently position the dimensions and name label.
         """
@@ -3,11 +3,19 @@
 
 """tooldefscene.py
 
+The scene keeps a SpatialIndex (see spatialindex.py) of each tool's profile
+segments and labels, in scene coordinates. Tools update their entries when
+their geometry or dimensions change, so hit testing never scans every item.
+The view uses it to highlight the segment under the cursor.
+
 Thursday, August  8 2013
 """
 
 from PyQt4.QtCore import QRectF, QRect
-from PyQt4.QtGui import QGraphicsScene
+from PyQt4.QtGui import QGraphicsScene, QGraphicsPathItem, QPainterPath, \
+    QPen, QColor
+
+from spatialindex import SpatialIndex, segmentDistance
 
 
 class ToolDefScene(QGraphicsScene):
@@ -15,8 +23,88 @@ class ToolDefScene(QGraphicsScene):
         super(ToolDefScene, self).__init__(QRectF(-5000, -5000, 10000, 10000),
                                            parent)
         self.pixelSize = 0.0
+        self.index = SpatialIndex()
+        # id(tool) -> set of the tool's index keys
+        self._toolKeys = {}
+        # drawn over the segment under the cursor, see highlightSegment()
+        self.highlight = QGraphicsPathItem()
+        pen = QPen(QColor(255, 128, 0), 3)
+        pen.setCosmetic(True)
+        self.highlight.setPen(pen)
+        self.highlight.setZValue(1)
+        self.highlight.hide()
+        self.addItem(self.highlight)
+        self._highlightTool = None
     def pixelsToScene(self, n):
         """Return the length of n pixels in scene coordinates.
         """
         view = self.views()[0]
         return view.mapToScene(QRect(0, 0, n, n)).boundingRect().width()
+    def indexTool(self, tool):
+        """Bring the tool's index entries up to date.
+
+        tool -- ToolDef
+
+        Only entries that were added, removed or moved are touched.
+        """
+        keys = set()
+        for key, bbox, data in tool.indexEntries():
+            keys.add(key)
+            self.index.insert(key, bbox, data)
+        for key in self._toolKeys.get(id(tool), set()) - keys:
+            self.index.delete(key)
+        self._toolKeys[id(tool)] = keys
+        if tool is self._highlightTool:
+            self.highlightSegment()
+    def unindexTool(self, tool):
+        """Remove the tool's index entries.
+        """
+        for key in self._toolKeys.pop(id(tool), ()):
+            self.index.delete(key)
+        if tool is self._highlightTool:
+            self.highlightSegment()
+    def nearestSegment(self, x, y, maxDist=None):
+        """Find the profile segment closest to a scene point.
+
+        maxDist -- ignore segments farther than this, None for no limit
+
+        Return (distance, tool, segment) or None. segment is as described in
+        spatialindex.profileEntries().
+        """
+        found = self.index.nearest(x, y, 1, maxDist,
+                                   lambda d, x, y: segmentDistance(d[1], x, y),
+                                   lambda k, d: k[0] == 'segment')
+        if not found:
+            return None
+        dist, _, (tool, seg) = found[0]
+        return dist, tool, seg
+    def labelAt(self, x, y):
+        """Return the label item under a scene point, or None.
+        """
+        for key, item in self.index.window((x, y, x, y)):
+            if key[0] == 'label':
+                return item
+        return None
+    def highlightSegment(self, tool=None, seg=None):
+        """Draw over one of a tool's profile segments.
+
+        tool -- ToolDef, None clears the highlight
+        seg -- segment as described in spatialindex.profileEntries()
+        """
+        self._highlightTool = tool
+        if tool is None:
+            self.highlight.hide()
+            return
+        p = QPainterPath()
+        if seg[0] == 'line':
+            _, x1, y1, x2, y2 = seg
+            p.moveTo(x1, y1)
+            p.lineTo(x2, y2)
+        else:
+            _, cx, cy, r, start, span = seg
+            # negative height so positive angles sweep cclw, see Path2d
+            rect = QRectF(cx - r, cy + r, r * 2, -r * 2)
+            p.arcMoveTo(rect, start)
+            p.arcTo(rect, start, span)
+        self.highlight.setPath(p)
+        self.highlight.show()
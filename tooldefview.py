@@ -23,6 +23,8 @@ class ToolDefView(QGraphicsView):
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         self.setScene(scene)
+        # highlight the profile segment under the cursor
+        self.setMouseTracking(True)
         src = self.sceneRect().center()
         # Cartesian coord sys w/origin at the center of the scene rect
         self.setTransform(QTransform().scale(1, -1) \
@@ -52,7 +54,7 @@ class ToolDefView(QGraphicsView):
         while True:
             r = QRectF()
             for item in items:
-                if not item.parentItem():
+                if not item.parentItem() and item.isVisible():
                     r = r.united(item.sceneBoundingRect())
             self.fitInView(r, qt.KeepAspectRatio)
             pps = self.updatePixelSize()
@@ -100,7 +102,8 @@ class ToolDefView(QGraphicsView):
         """
         # other buttons do nothing
         if e.button() == qt.LeftButton:
-            item = self.itemAt(e.pos())
+            sp = self.mapToScene(e.pos())
+            item = self.scene().labelAt(sp.x(), sp.y())
             self.commentBox.hide()
             self.dimBox.hide()
             if item and isinstance(item, (DimLabel, CommentLabel)):
@@ -114,6 +117,30 @@ class ToolDefView(QGraphicsView):
                 box.show()
                 self.posEditBox(box)
                 box.setFocus()
+    def segmentAt(self, pos, pixels=5):
+        """Find the profile segment under a view position.
+
+        pos -- QPoint, view coordinates
+        pixels -- pick distance
+
+        Return (distance, tool, segment) or None, see
+        ToolDefScene.nearestSegment().
+        """
+        sp = self.mapToScene(pos)
+        return self.scene().nearestSegment(sp.x(), sp.y(),
+                                           self.scene().pixelsToScene(pixels))
+    def mouseMoveEvent(self, e):
+        """Highlight the profile segment under the cursor.
+        """
+        found = self.segmentAt(e.pos())
+        if found:
+            self.scene().highlightSegment(found[1], found[2])
+        else:
+            self.scene().highlightSegment()
+        super(ToolDefView, self).mouseMoveEvent(e)
+    def leaveEvent(self, e):
+        self.scene().highlightSegment()
+        super(ToolDefView, self).leaveEvent(e)
     def keyPressEvent(self, e):
         # eat it
         pass
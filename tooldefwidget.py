@@ -9,6 +9,8 @@ Thursday, August  8 2013
 import os
 import re
 import json
+import hashlib
+from copy import copy
 
 from PyQt4.QtCore import *
 from PyQt4.QtGui import *
@@ -17,6 +19,11 @@ from PyQt4.QtCore import Qt as qt
 from tooldefscene import ToolDefScene
 from tooldefview import ToolDefView
 from tooldef import *
+from journal import SpecJournal, SpecJournalException
+from dedupe import ToolIndex
+from dedupedialog import DedupeDialog
+from strutil import toInch
+from thumbnail import ThumbnailCache
 
 # ToolDef class to tool category
 TDEF2CAT = {DrillDef: 'Twist Drill',
@@ -41,6 +48,13 @@ class TreeToolItem(QTreeWidgetItem):
     def __init__(self, *args):
         super(TreeToolItem, self).__init__(*args)
         self._sortData = {}
+        # the tool's specs dict in ToolBrowserView.toolMap, None for
+        # categories
+        self.specs = None
+        # False if the specs failed validation
+        self.valid = True
+        # key of the thumbnail shown or requested, see ThumbnailCache
+        self.thumbnailKey = None
     def __lt__(self, other):
         if (not isinstance(other, TreeToolItem)):
             return super(TreeToolItem, self).__lt__(other)
@@ -76,6 +90,19 @@ class ToolBrowserView(QTreeWidget):
         self.libFileName = None
         # data read from JSON tool lib
         self.toolMap = {}
+        # geometry index of every tool in toolMap
+        self.index = ToolIndex()
+        # tool icons, requested for the rows in view only
+        self.thumbnails = ThumbnailCache(parent=self)
+        self.setIconSize(QSize(self.thumbnails.size, self.thumbnails.size))
+        # thumbnail key -> items waiting for it
+        self._thumbnailItems = {}
+        self.connect(self.thumbnails, SIGNAL('thumbnailReady(QString)'),
+                     self._thumbnailReady)
+        self.connect(self.verticalScrollBar(), SIGNAL('valueChanged(int)'),
+                     self.requestVisibleThumbnails)
+        self.connect(self, SIGNAL('itemExpanded(QTreeWidgetItem*)'),
+                     self.requestVisibleThumbnails)
         self.readToolLib("./tools.json")
     def isDirty(self):
         return self.dirty
@@ -93,6 +120,44 @@ class ToolBrowserView(QTreeWidget):
                     return [category, toolSpecs]
     def sizeHint(self):
         return QSize(300, 900)
+    def showEvent(self, e):
+        super(ToolBrowserView, self).showEvent(e)
+        self.requestVisibleThumbnails()
+    def resizeEvent(self, e):
+        super(ToolBrowserView, self).resizeEvent(e)
+        self.requestVisibleThumbnails()
+    def requestVisibleThumbnails(self, *args):
+        """Set or request the icon of each tool row in view.
+        """
+        if not self.isVisible():
+            return
+        height = self.viewport().height()
+        item = self.itemAt(QPoint(1, 1))
+        while item is not None and self.visualItemRect(item).top() < height:
+            if item.specs is not None and item.valid and \
+                    item.thumbnailKey is None:
+                self._requestThumbnail(item)
+            item = self.itemBelow(item)
+    def _requestThumbnail(self, item):
+        category = unicode(item.parent().text(0))
+        key, image = self.thumbnails.request(CAT2TDEF[category], item.specs)
+        item.thumbnailKey = key
+        if image is not None:
+            item.setIcon(0, QIcon(QPixmap.fromImage(image)))
+        else:
+            self._thumbnailItems.setdefault(key, []).append(item)
+    def _thumbnailReady(self, key):
+        key = str(key)
+        image = self.thumbnails.image(key)
+        icon = QIcon(QPixmap.fromImage(image))
+        for item in self._thumbnailItems.pop(key, []):
+            if item.thumbnailKey == key:
+                item.setIcon(0, icon)
+    def _clearThumbnail(self, item):
+        """Forget an item's icon, it's requested again when in view.
+        """
+        item.setIcon(0, QIcon())
+        item.thumbnailKey = None
     def openToolLib(self):
         """Show an open file dialog. Load the library selected.
         """
@@ -121,16 +186,119 @@ class ToolBrowserView(QTreeWidget):
         self.toolMap = json.load(f)
         f.close()
         self.clear()
+        self._thumbnailItems = {}
+        self.index = ToolIndex()
+        # [category, name, error message]
+        invalid = []
         for k, v in self.toolMap.iteritems():
             catItem = TreeToolItem([k], 2000)
-            for m in v:
-                item = TreeToolItem(catItem, [m['name']], 3000)
-                sortVal = m[CAT2TDEF[k].getSortKey()]
-                # convert metric to inch for tree sorting
-                item.setSortData(0,
-                                 sortVal / 25.4 if m['metric'] else sortVal)
+            # check the whole category at once, one message per tool
+            errors = {}
+            for e in CAT2TDEF[k].schema.validateBatch(v):
+                errors.setdefault(e.index, str(e))
+            for i, m in enumerate(v):
+                item = self._addToolItem(catItem, k, m)
+                if i in errors:
+                    item.valid = False
+                    item.setForeground(0, QBrush(QColor(192, 0, 0)))
+                    item.setToolTip(0, errors[i])
+                    invalid.append([k, m.get('name'), errors[i]])
+                else:
+                    self.index.add(k, m, CAT2TDEF[k].profileFamily())
             self.addTopLevelItem(catItem)
         self.dirty = False
+        self.requestVisibleThumbnails()
+        if invalid:
+            QMessageBox.warning(self,
+                                'machtool',
+                                u'{} invalid tool(s) in {}:\n\n{}'.format(
+                    len(invalid), fileName,
+                    u'\n'.join(u'{} / {}: {}'.format(*x)
+                                for x in invalid[:20])))
+    def _addToolItem(self, catItem, category, specs):
+        """Add a tree item for the tool.
+
+        Return the new TreeToolItem.
+        """
+        item = TreeToolItem(catItem, [unicode(specs.get('name'))], 3000)
+        item.specs = specs
+        sortVal = specs.get(CAT2TDEF[category].getSortKey())
+        if isinstance(sortVal, (int, float)):
+            # convert metric to inch for tree sorting
+            item.setSortData(0, toInch(sortVal, specs.get('metric')))
+        return item
+    def _categoryItem(self, category):
+        """Return the top level item of the category, or None.
+        """
+        for i in range(self.topLevelItemCount()):
+            item = self.topLevelItem(i)
+            if unicode(item.text(0)) == category:
+                return item
+        return None
+    def findDuplicates(self, tol=0.0001, angTol=0.01):
+        """Find exact and near duplicate tools in the library.
+
+        tol -- length tolerance in inches
+        angTol -- angle tolerance in degrees
+
+        Return (index, groups), see ToolIndex.duplicates().
+        """
+        index = self.index
+        if tol != index.tol or angTol != index.angTol:
+            index = ToolIndex(tol, angTol)
+            for i in range(self.topLevelItemCount()):
+                catItem = self.topLevelItem(i)
+                category = unicode(catItem.text(0))
+                family = CAT2TDEF[category].profileFamily()
+                for j in range(catItem.childCount()):
+                    item = catItem.child(j)
+                    # the same tools as self.index, invalid ones left out
+                    if item.valid:
+                        index.add(category, item.specs, family)
+        return index, index.duplicates()
+    def similarTools(self, category, specs, exclude=None):
+        """Find library tools with the same name or geometry as specs.
+
+        category -- the category specs will be added to
+        specs -- tool specs dict
+        exclude -- a specs dict in the library to ignore, or None
+
+        Return a list of [category, specs].
+        """
+        found = []
+        family = CAT2TDEF[category].profileFamily()
+        for toolId, _ in self.index.nearMatches(specs, family):
+            cat, other = self.index.tool(toolId)
+            if other is not exclude:
+                found.append([cat, other])
+        seen = set(id(other) for _, other in found)
+        for cat, tools in self.toolMap.iteritems():
+            for other in tools:
+                if (other['name'] == specs['name'] and other is not exclude
+                    and id(other) not in seen):
+                    found.append([cat, other])
+        return found
+    def removeTool(self, category, specs):
+        """Remove the tool from the library.
+
+        category -- the tool's category
+        specs -- the tool's specs dict in toolMap
+        """
+        tools = self.toolMap[category]
+        for i, other in enumerate(tools):
+            if other is specs:
+                del tools[i]
+                break
+        toolId = self.index.find(specs)
+        if toolId is not None:
+            self.index.remove(toolId)
+        catItem = self._categoryItem(category)
+        if catItem:
+            for i in range(catItem.childCount()):
+                if catItem.child(i).specs is specs:
+                    catItem.takeChild(i)
+                    break
+        self.dirty = True
     def writeToolLib(self, fileName=None):
         """Write the current library to a file.
 
@@ -149,7 +317,22 @@ class ToolBrowserView(QTreeWidget):
         curItem = self.currentItem()
         newToolName = toolDef.name()
         catItem = curItem.parent()
-        if self.currentItem().text(0) == newToolName:
+        category = unicode(catItem.text(0))
+        overwrite = self.currentItem().text(0) == newToolName
+        # warn about tools with the same name or geometry anywhere in the lib
+        similar = self.similarTools(category, toolDef.specs,
+                                    curItem.specs if overwrite else None)
+        if similar:
+            names = u'\n'.join(u'{} / {}'.format(cat, specs['name'])
+                                for cat, specs in similar)
+            result = QMessageBox.question(self,
+                                          'machtool',
+                                          u'Similar tools already exist:\n\n'
+                                          u'{}\n\nSave anyway?'.format(names),
+                                          QMessageBox.Yes | QMessageBox.No)
+            if result == QMessageBox.No:
+                return False
+        if overwrite:
             result = QMessageBox.question(self,
                                           'machtool',
                                           '"{}" already exists, overwrite?' \
@@ -159,18 +342,30 @@ class ToolBrowserView(QTreeWidget):
                 return False
             # Update the existing tool. Just need to update toolMap since the
             # tree just holds the comment string (which hasn't changed).
-            for tool in self.toolMap[unicode(catItem.text(0))]:
+            for tool in self.toolMap[category]:
                 if tool['name'] == newToolName:
                     tool.update(toolDef.specs)
+                    # re-index the new geometry
+                    toolId = self.index.find(tool)
+                    if toolId is not None:
+                        self.index.remove(toolId)
+                    self.index.add(category, tool, toolDef.profileFamily())
                     break
+            # the geometry may have changed
+            curItem.valid = True
+            self._clearThumbnail(curItem)
+            self.requestVisibleThumbnails()
             self.dirty = True
             return True
         # add a new tool
+        specs = copy(toolDef.specs)
         # add to the tree view
-        newItem = QTreeWidgetItem(catItem, [newToolName], 3000)
+        newItem = self._addToolItem(catItem, category, specs)
         catItem.addChild(newItem)
         # add to the tool map
-        self.toolMap[unicode(catItem.text(0))].append(toolDef.specs)
+        self.toolMap[category].append(specs)
+        self.index.add(category, specs, toolDef.profileFamily())
+        self.requestVisibleThumbnails()
         self.dirty = True
         return True
 
@@ -190,11 +385,29 @@ class ToolDefWidget(QWidget):
       A QTreeView to display all available tools. When a tool is clicked, the
       tool def view is shown with that tool loaded. If Escape is pressed, the
       tool def view is shown with no change.
+    Undo/Redo
+      Ctrl+Z and Ctrl+Shift+Z step through the current tool's edits.
     """
+    # maximum number of edits kept per tool
+    journalSize = 200
     def __init__(self, parent=None):
         super(ToolDefWidget, self).__init__(parent)
         # the active tool def
         self.toolDef = None
+        # Spec edits of the active tool. Set journalDir to a directory to
+        # keep each tool's journal there between sessions.
+        self.journalDir = None
+        self.journal = SpecJournal(self.journalSize)
+        self.undoAction = QAction("Undo", self)
+        self.undoAction.setShortcut(QKeySequence.Undo)
+        self.undoAction.setShortcutContext(qt.WidgetWithChildrenShortcut)
+        self.connect(self.undoAction, SIGNAL('triggered()'), self.undo)
+        self.addAction(self.undoAction)
+        self.redoAction = QAction("Redo", self)
+        self.redoAction.setShortcut(QKeySequence.Redo)
+        self.redoAction.setShortcutContext(qt.WidgetWithChildrenShortcut)
+        self.connect(self.redoAction, SIGNAL('triggered()'), self.redo)
+        self.addAction(self.redoAction)
         # library load/save layout
         libSaveLayout = QHBoxLayout()
         self.openLibButton = QPushButton("Open Lib", self)
@@ -205,7 +418,11 @@ class ToolDefWidget(QWidget):
         self.connect(self.saveLibButton, SIGNAL("clicked()"),
                      self.saveToolLib)
         libSaveLayout.addWidget(self.saveLibButton)
-        libSaveLayout.insertStretch(2, 1)
+        self.dedupeButton = QPushButton("Duplicates", self)
+        self.connect(self.dedupeButton, SIGNAL("clicked()"),
+                     self.showDedupeDialog)
+        libSaveLayout.addWidget(self.dedupeButton)
+        libSaveLayout.insertStretch(3, 1)
         # tool load/save metric layout
         toolSaveLayout = QHBoxLayout()
         self.loadToolButton = QPushButton("Load Tool", self)
@@ -256,13 +473,50 @@ class ToolDefWidget(QWidget):
         if not item.parent():
             return              # category clicked
         category, specs = self.toolBrowser.getToolData(item)
+        try:
+            toolDef = CAT2TDEF[category](specs)
+        except ToolDefException, e:
+            QMessageBox.warning(self, 'machtool', str(e))
+            return
         if self.toolDef:
             self.tdefScene.removeItem(self.toolDef)
-        self.toolDef = CAT2TDEF[category](specs)
+        self.toolDef = toolDef
         self.tdefScene.addItem(self.toolDef)
         self.toolDef.config(specs)
+        self.journal = self._openJournal(category, specs)
         self.showToolDefView()
         self.emit(SIGNAL('toolLoaded()'))
+    def _openJournal(self, category, specs):
+        """Return the journal of a library tool.
+
+        category -- the tool's category
+        specs -- the tool's specs as loaded
+
+        With a journalDir, each tool has its own file, named for its category
+        and name. A journal left there is continued if it still ends at
+        specs, else a new one replaces it. A file that can't be read is
+        replaced too, and if the directory can't be made the journal is kept
+        in memory only.
+        """
+        if not self.journalDir:
+            return SpecJournal(self.journalSize)
+        key = hashlib.sha1(json.dumps([category, specs.get('name')]))
+        fileName = os.path.join(self.journalDir,
+                                'journal-{}.json'.format(key.hexdigest()))
+        if os.path.exists(fileName):
+            try:
+                journal = SpecJournal.load(fileName,
+                                           maxEntries=self.journalSize)
+                if journal.matches(specs):
+                    return journal
+            except (IOError, ValueError, SpecJournalException):
+                pass
+        elif not os.path.isdir(self.journalDir):
+            try:
+                os.makedirs(self.journalDir)
+            except OSError:
+                return SpecJournal(self.journalSize)
+        return SpecJournal(self.journalSize, fileName)
     def showToolBrowserView(self):
         """Replace the ToolDefView with the ToolBrowserView
         
@@ -282,6 +536,7 @@ class ToolDefWidget(QWidget):
                 return
         self.openLibButton.show()
         self.saveLibButton.show()
+        self.dedupeButton.show()
         self.saveLibButton.setEnabled(self.toolBrowser.isDirty())
         self.metricCheckBox.hide()
         self.loadToolButton.hide()
@@ -303,6 +558,7 @@ class ToolDefWidget(QWidget):
         self.metricCheckBox.setEnabled(True)
         self.openLibButton.hide()
         self.saveLibButton.hide()
+        self.dedupeButton.hide()
         self.metricCheckBox.show()
         self.loadToolButton.show()
         self.saveToolButton.show()
@@ -313,8 +569,17 @@ class ToolDefWidget(QWidget):
         self.tdefView.show()
         self.tdefView.setFocus()
         self.metricCheckBox.setChecked(self.toolDef.isMetric())
+    def configTool(self, specs, record=True):
+        """Apply the specs to the current tool.
+
+        specs -- dict, the changed specs
+        record -- if True, add the change to the undo journal
+        """
+        if record:
+            self.journal.record(self.toolDef.specs, specs)
+        self.toolDef.config(specs)
     def onMetricToggle(self, state):
-        self.toolDef.config({'metric': state})
+        self.configTool({'metric': state})
         self.tdefView.fitAll()
         self.saveToolButton.setEnabled(self.toolDef.isDirty())
     def onEditBoxReturn(self, box):
@@ -323,11 +588,42 @@ class ToolDefWidget(QWidget):
         box -- the EditBox the user just updated
         """
         box.hide()
-        self.toolDef.config({str(box.item.toolTip()): box.textValue()})
+        self.configTool({str(box.item.toolTip()): box.textValue()})
         self.tdefView.setFocus()
         self.tdefView.fitAll()
         self.saveToolButton.setEnabled(self.toolDef.isDirty())
         self.emit(SIGNAL('toolModified()'))
+    def _applyJournalSpecs(self, specs):
+        """Apply specs returned by the journal's undo() or redo().
+
+        All steps have already been merged, so the tool is re-profiled and
+        the mesh rebuilt at most once.
+        """
+        if not specs:
+            return
+        self.tdefView.dimBox.hide()
+        self.tdefView.commentBox.hide()
+        self.configTool(specs, record=False)
+        # don't record the toggle again
+        self.metricCheckBox.blockSignals(True)
+        self.metricCheckBox.setChecked(self.toolDef.isMetric())
+        self.metricCheckBox.blockSignals(False)
+        self.tdefView.fitAll()
+        self.saveToolButton.setEnabled(self.toolDef.isDirty())
+        self.emit(SIGNAL('toolModified()'))
+    def undo(self, count=1):
+        """Step back count edits of the current tool.
+
+        Does nothing unless the tool is shown, the shortcut also reaches
+        the tool browser and the journal must stay in step with the tool.
+        """
+        if self.toolDef and self.tdefView.isVisible():
+            self._applyJournalSpecs(self.journal.undo(count))
+    def redo(self, count=1):
+        """Step forward count edits of the current tool, see undo().
+        """
+        if self.toolDef and self.tdefView.isVisible():
+            self._applyJournalSpecs(self.journal.redo(count))
     def saveCurrentTool(self):
         result = self.toolBrowser.addTool(self.toolDef)
         if result:
@@ -350,5 +646,11 @@ class ToolDefWidget(QWidget):
     def saveToolLib(self):
         self.toolBrowser.writeToolLib()
         self.saveToolButton.setEnabled(False)
+    def showDedupeDialog(self):
+        """Find duplicate tools and let the user merge them.
+        """
+        dialog = DedupeDialog(self.toolBrowser, self)
+        dialog.exec_()
+        self.saveLibButton.setEnabled(self.toolBrowser.isDirty())
     def minimumSizeHint(self):
         return QSize(300, 300)